@@ -0,0 +1,87 @@
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'interface'))
+
+from geo_coords import coords_analysis
+from geopy.distance import geodesic
+import pandas as pd
+import numpy as np
+import argparse
+import time
+
+def help_texts():
+    '''
+    Textos de ajuda do argparser.
+
+    Args:
+        None
+
+    Returns:
+        texts (dict): Dicionário com as informações de ajuda de cada parâmetro do argparser.
+    '''
+
+    texts = {
+        'text_description': '(str) Compara a distância geodésica por par (geopy) com a versão vetorizada.',
+        'src_path_help': '(str) Caminho do arquivo .csv com os vãos das linhas.',
+        'repeat_help': '(int) Quantidade de repetições da versão vetorizada.'
+    }
+
+    return texts
+
+def geopy_distances(geo_conversor, lat1, lon1, lat2, lon2):
+    '''
+    Distâncias e zonas UTM calculadas par a par, como na implementação original com o geopy.
+
+    Args:
+        geo_conversor (coords_analysis): Módulos de manipulação de coordenadas.
+        lat1, lon1, lat2, lon2 (array): Coordenadas das extremidades dos vãos.
+
+    Returns:
+        distances (array): Distâncias em metros de cada vão.
+        same_zone (array): Indica se os pontos de cada vão pertencem a uma mesma zona UTM.
+    '''
+
+    distances, same_zone = list(), list()
+    for coords in zip(lat1, lon1, lat2, lon2):
+        distances.append(geodesic(coords[:2], coords[2:]).meters)
+        zone1 = geo_conversor.get_utm_zone(latitude = coords[0], longitude = coords[1])
+        zone2 = geo_conversor.get_utm_zone(latitude = coords[2], longitude = coords[3])
+        same_zone.append(zone1 == zone2)
+
+    return np.array(distances), np.array(same_zone)
+
+def main():
+
+    texts = help_texts()
+    parser = argparse.ArgumentParser(texts['text_description'])
+    parser.add_argument('--src_path', type = str, help = texts['src_path_help'], default = 'data/cleaned-tables/vao_linhas.csv')
+    parser.add_argument('--repeat', type = int, help = texts['repeat_help'], default = 10)
+    args = parser.parse_args()
+
+    # Apenas vãos com as duas extremidades georreferenciadas
+    df = pd.read_csv(args.src_path)
+    columns = ['NUM_LATITUDE_ESTRUTURA_INI', 'NUM_LONGITUDE_ESTRUTURA_INI', 'NUM_LATITUDE_ESTRUTURA_FIM', 'NUM_LONGITUDE_ESTRUTURA_FIM']
+    df = df.dropna(subset = columns)
+    lat1, lon1, lat2, lon2 = (df[column].to_numpy(dtype = 'float64') for column in columns)
+
+    geo_conversor = coords_analysis()
+
+    start = time.perf_counter()
+    reference, reference_zone = geopy_distances(geo_conversor, lat1, lon1, lat2, lon2)
+    time_geopy = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        distances, same_zone = geo_conversor.geodesic_distance_batch(lat1, lon1, lat2, lon2)
+    time_batch = (time.perf_counter() - start) / args.repeat
+
+    print(f'Vãos avaliados: {len(df)}')
+    print(f'geopy por par: {time_geopy:.3f} s')
+    print(f'Vetorizado: {time_batch * 1000:.2f} ms')
+    print(f'Aceleração: {time_geopy / time_batch:.0f}x')
+    print(f'Maior diferença de distância: {np.nanmax(np.abs(distances - reference)):.2e} m')
+    print(f'Zonas UTM divergentes: {int(np.sum(same_zone != reference_zone))}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,374 @@
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'interface'))
+
+from line_dataset import make_dataset, reorganize_csv, utm_dxf_doc
+from elevation import elevation_provider
+from data_manipulation import render_data
+from table_cache import table_cache
+from table_store import table_store
+import pandas as pd
+import numpy as np
+import subprocess
+import statistics
+import traceback
+import datetime
+import platform
+import argparse
+import exports
+import paths
+import json
+import time
+
+# Etapas medidas para cada conjunto de linhas, na ordem em que são executadas na interface
+line_stages = ['separate_conj_data', 'make_dataset', 'reorganize_csv', 'export_kml', 'export_dxf', 'export_xlsx',
+               'longitudinal_profile_csv']
+
+def help_texts():
+    '''
+    Textos de ajuda do argparser.
+
+    Args:
+        None
+
+    Returns:
+        texts (dict): Dicionário com as informações de ajuda de cada parâmetro do argparser.
+    '''
+
+    texts = {
+        'text_description': '(str) Mede o tempo de cada etapa do processamento das linhas com as tabelas tratadas.',
+        'config_help': '(str) Caminho do arquivo .yaml de configuração da interface.',
+        'output_help': '(str) Arquivo .json com os resultados.',
+        'repeat_help': '(int) Quantidade de repetições das etapas nas linhas menor, mediana e maior.',
+        'skip_all_help': '(bool) Não executa a passada por todos os conjuntos de linhas.',
+        'missing_altitudes_help': '(bool) Descarta as altitudes das tabelas, para que o perfil consulte todas as estruturas na fonte simulada.',
+        'baseline_help': '(str) Resultado .json anterior para comparação. Termina com erro caso alguma etapa fique mais lenta que a tolerância.',
+        'tolerance_help': '(float) Aumento relativo de tempo aceito em relação à referência, ex.: 0.25 para 25%%.'
+    }
+
+    return texts
+
+class stub_elevation(elevation_provider):
+    '''
+    Fonte de altitudes sem acesso à rede, para que as medições não dependam da API nem dos arquivos do DEM.
+    Retorna uma superfície suave e determinística das coordenadas e conta os pontos consultados.
+    '''
+
+    def __init__(self):
+        '''
+        Construtor da classe.
+
+        Args:
+            None
+
+        Returns:
+            None
+        '''
+
+        self.calls = 0
+        self.points = 0
+
+    def get_altitudes(self, latitudes, longitudes):
+        '''
+        Retorna as altitudes simuladas de um conjunto de pontos.
+
+        Args:
+            latitudes (array): Coordenadas de latitude.
+            longitudes (array): Coordenadas de longitude.
+
+        Returns:
+            altitudes (array): Altitudes simuladas em metros.
+        '''
+
+        latitudes = np.asarray(latitudes, dtype = 'float64')
+        longitudes = np.asarray(longitudes, dtype = 'float64')
+        self.calls += 1
+        self.points += len(latitudes)
+
+        return 800.0 + 50.0 * np.sin(latitudes * 50.0) + 30.0 * np.cos(longitudes * 50.0)
+
+def timed(function, repeat = 1):
+    '''
+    Executa uma função algumas vezes e mede o tempo de cada execução.
+
+    Args:
+        function (function): Função sem argumentos.
+        repeat (int): Quantidade de execuções.
+
+    Returns:
+        result (object): Retorno da última execução.
+        timing (dict): Tempos em segundos: `min`, `median`, `max` e `runs` quantidade de execuções.
+    '''
+
+    times = list()
+    for _ in range(max(repeat, 1)):
+        start = time.perf_counter()
+        result = function()
+        times.append(time.perf_counter() - start)
+
+    return result, {'min': min(times), 'median': statistics.median(times), 'max': max(times), 'runs': len(times)}
+
+def git_commit():
+    '''
+    Retorna o commit atual do repositório, para identificar a versão medida.
+
+    Args:
+        None
+
+    Returns:
+        commit (str): Hash do commit, `None` caso não seja possível obter.
+    '''
+
+    try:
+        output = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output = True, text = True, timeout = 10)
+        return output.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def line_sizes(store, df_paths, columns_names):
+    '''
+    Quantidade de vãos de cada conjunto de linhas.
+
+    Args:
+        store (table_store): Tabelas carregadas em memória.
+        df_paths (dict): Dicionário com os caminhos das tabelas.
+        columns_names (dict): Dicionário com o nome das colunas de referência.
+
+    Returns:
+        sizes (dataframe): Nome (`label`), código SAP (`code`) e quantidade de vãos (`spans`) de cada conjunto,
+        apenas conjuntos com vãos, em ordem crescente de vãos.
+    '''
+
+    lines = store.load_table(df_paths['df_path_lines'])
+    spans = store.load_table(df_paths['df_path_conexions'])
+    counts = spans[columns_names['column_name_towers']].astype(str).value_counts()
+
+    sizes = pd.DataFrame({'label': lines[columns_names['column_name_lines']].astype(str),
+                          'code': lines[columns_names['column_sap_lines']].astype(str)})
+    sizes['spans'] = sizes['code'].map(counts).fillna(0).astype(int)
+    sizes = sizes[sizes['spans'] > 0].drop_duplicates(subset = 'label')
+
+    return sizes.sort_values(by = ['spans', 'label'], kind = 'stable').reset_index(drop = True)
+
+def run_line(data_modules, df_paths, columns_names, label, repeat = 1, missing_altitudes = False):
+    '''
+    Executa e mede as etapas de um conjunto de linhas.
+
+    Args:
+        data_modules (render_data): Módulos de dados com a fonte de altitudes simulada.
+        df_paths (dict): Dicionário com os caminhos das tabelas.
+        columns_names (dict): Dicionário com o nome das colunas de referência.
+        label (str): Nome do conjunto de linhas.
+        repeat (int): Quantidade de repetições de cada etapa.
+        missing_altitudes (bool): Descarta as altitudes antes do perfil longitudinal.
+
+    Returns:
+        stages (dict): Tempos de cada etapa, ver `timed`.
+        info (dict): Tamanho do conjunto: `towers`, `spans` e `profile_points`.
+    '''
+
+    stages = dict()
+
+    (values_towers, coords, values_conexions), stages['separate_conj_data'] = timed(
+        lambda: data_modules.separate_conj_data(df_paths = df_paths, columns_names = columns_names, label = label), repeat)
+    (dataframe, _), stages['make_dataset'] = timed(lambda: make_dataset(label, values_towers, values_conexions, coords), repeat)
+    _, stages['reorganize_csv'] = timed(lambda: reorganize_csv(dataframe), repeat)
+
+    _, stages['export_kml'] = timed(lambda: exports.kml_bytes(coords, data_modules.span_geometry(values_conexions, coords)), repeat)
+    _, stages['export_dxf'] = timed(lambda: exports.dxf_bytes(utm_dxf_doc(dataframe)), repeat)
+    _, stages['export_xlsx'] = timed(lambda: exports.xlsx_bytes(dataframe), repeat)
+
+    profile_input = dataframe
+    if missing_altitudes:
+        profile_input = dataframe.assign(EST1_ALT_ORT = np.nan, EST2_ALT_ORT = np.nan)
+    profile_df, stages['longitudinal_profile_csv'] = timed(lambda: data_modules.longitudinal_profile_csv(profile_input), repeat)
+
+    info = {'towers': len(values_towers), 'spans': len(values_conexions), 'profile_points': len(profile_df)}
+
+    return stages, info
+
+def run_load(config_path, df_paths, repeat = 1):
+    '''
+    Mede a carga das tabelas em um armazenamento novo, a partir do cache colunar e diretamente dos arquivos .csv.
+
+    Args:
+        config_path (str): Caminho do arquivo .yaml de configuração.
+        df_paths (dict): Dicionário com os caminhos das tabelas.
+        repeat (int): Quantidade de repetições.
+
+    Returns:
+        stages (dict): Tempos de `load_parquet` e `load_csv`, ver `timed`.
+    '''
+
+    index_columns = paths.return_index_columns(yaml_file = config_path)
+    cache = table_cache(cache_dir = paths.return_cache_dir(yaml_file = config_path))
+
+    # Garante o cache colunar atualizado antes da medição
+    table_store(index_columns = index_columns, cache = cache).preload(df_paths)
+
+    stages = dict()
+    _, stages['load_parquet'] = timed(lambda: table_store(index_columns = index_columns, cache = cache).preload(df_paths), repeat)
+    _, stages['load_csv'] = timed(lambda: table_store(index_columns = index_columns).preload(df_paths), repeat)
+
+    return stages
+
+def run_all_lines(data_modules, df_paths, columns_names, labels, missing_altitudes = False):
+    '''
+    Executa uma vez as etapas de todos os conjuntos de linhas e soma os tempos de cada etapa.
+
+    Args:
+        data_modules (render_data): Módulos de dados com a fonte de altitudes simulada.
+        df_paths (dict): Dicionário com os caminhos das tabelas.
+        columns_names (dict): Dicionário com o nome das colunas de referência.
+        labels (list): Nomes dos conjuntos de linhas.
+        missing_altitudes (bool): Descarta as altitudes antes do perfil longitudinal.
+
+    Returns:
+        result (dict): `lines` quantidade de conjuntos processados, `stages` tempo total de cada etapa,
+        `total` tempo total, `spans` vãos processados e `errors` conjuntos com erro.
+    '''
+
+    totals = dict.fromkeys(line_stages, 0.0)
+    spans, errors = 0, dict()
+    start = time.perf_counter()
+
+    for label in labels:
+        try:
+            stages, info = run_line(data_modules, df_paths, columns_names, label, missing_altitudes = missing_altitudes)
+        except Exception as e:
+            errors[label] = f'{type(e).__name__}: {e}'
+            continue
+
+        spans += info['spans']
+        for stage, timing in stages.items():
+            totals[stage] += timing['min']
+
+    return {'lines': len(labels) - len(errors), 'stages': totals, 'total': time.perf_counter() - start,
+            'spans': spans, 'errors': errors}
+
+def compare(results, baseline, tolerance):
+    '''
+    Compara os tempos medidos com um resultado anterior.
+
+    Args:
+        results (dict): Resultados atuais.
+        baseline (dict): Resultados de referência, no mesmo formato.
+        tolerance (float): Aumento relativo de tempo aceito.
+
+    Returns:
+        regressions (list): Etapas mais lentas que a tolerância: `case`, `stage`, `baseline`, `current` e `ratio`.
+    '''
+
+    pairs = [('load', stage, results['load'][stage]['median'], baseline.get('load', dict()).get(stage, dict()).get('median'))
+             for stage in results['load']]
+
+    for case, entry in results['lines'].items():
+        reference = baseline.get('lines', dict()).get(case)
+        # Só compara o mesmo conjunto de linhas
+        if reference is None or reference['label'] != entry['label']:
+            continue
+        for stage, timing in entry['stages'].items():
+            pairs.append((case, stage, timing['median'], reference['stages'].get(stage, dict()).get('median')))
+
+    if 'all_lines' in results and 'all_lines' in baseline:
+        for stage, total in results['all_lines']['stages'].items():
+            pairs.append(('all_lines', stage, total, baseline['all_lines']['stages'].get(stage)))
+
+    regressions = list()
+    for case, stage, current, reference in pairs:
+        if reference and current > reference * (1 + tolerance):
+            regressions.append({'case': case, 'stage': stage, 'baseline': reference, 'current': current,
+                                'ratio': current / reference})
+
+    return regressions
+
+def main():
+
+    # Obtém os campos de texto com informações de ajuda
+    texts = help_texts()
+    # Adiciona uma descrição do comando
+    parser = argparse.ArgumentParser(texts['text_description'])
+
+    # Define os parâmetros de entrada
+    parser.add_argument('--config', type = str, help = texts['config_help'], default = 'interface/config.yaml')
+    parser.add_argument('--output', type = str, help = texts['output_help'], default = 'benchmarks/results/line_stages.json')
+    parser.add_argument('--repeat', type = int, help = texts['repeat_help'], default = 5)
+    parser.add_argument('--skip_all', action = 'store_true', help = texts['skip_all_help'])
+    parser.add_argument('--missing_altitudes', action = 'store_true', help = texts['missing_altitudes_help'])
+    parser.add_argument('--baseline', type = str, help = texts['baseline_help'], default = None)
+    parser.add_argument('--tolerance', type = float, help = texts['tolerance_help'], default = 0.25)
+
+    # Atribuí a args os dados coletados da linhas de comando
+    args = parser.parse_args()
+
+    df_paths = paths.return_data_paths(yaml_file = args.config)
+    columns_names = paths.return_columns_ref(yaml_file = args.config)
+    cache = table_cache(cache_dir = paths.return_cache_dir(yaml_file = args.config))
+
+    results = {'meta': {'timestamp': datetime.datetime.now().isoformat(timespec = 'seconds'), 'commit': git_commit(),
+                        'data_version': cache.data_version(df_paths), 'python': platform.python_version(),
+                        'pandas': pd.__version__, 'numpy': np.__version__, 'platform': platform.platform(),
+                        'cpus': os.cpu_count(), 'repeat': args.repeat, 'missing_altitudes': args.missing_altitudes}}
+
+    results['load'] = run_load(args.config, df_paths, repeat = args.repeat)
+
+    store = table_store(index_columns = paths.return_index_columns(yaml_file = args.config), cache = cache)
+    store.preload(df_paths)
+    elevation = stub_elevation()
+    data_modules = render_data(store = store, elevation = elevation)
+
+    # Conjuntos de linhas menor, mediano e maior em quantidade de vãos
+    sizes = line_sizes(store, df_paths, columns_names)
+    cases = {'smallest': 0, 'median': len(sizes) // 2, 'largest': len(sizes) - 1}
+
+    results['lines'] = dict()
+    for case, position in cases.items():
+        label = sizes.at[position, 'label']
+        try:
+            stages, info = run_line(data_modules, df_paths, columns_names, label, repeat = args.repeat,
+                                    missing_altitudes = args.missing_altitudes)
+        except Exception:
+            print(f'Erro ao medir o conjunto {label}:\n{traceback.format_exc()}')
+            continue
+        results['lines'][case] = {'label': label, **info, 'stages': stages}
+
+    if not args.skip_all:
+        results['all_lines'] = run_all_lines(data_modules, df_paths, columns_names, sizes['label'].tolist(),
+                                             missing_altitudes = args.missing_altitudes)
+
+    results['meta']['elevation_points'] = elevation.points
+
+    folder = os.path.dirname(args.output)
+    if folder:
+        os.makedirs(folder, exist_ok = True)
+    with open(args.output, 'w') as file:
+        json.dump(results, file, indent = 2, ensure_ascii = False)
+
+    # Resumo das medições
+    for stage, timing in results['load'].items():
+        print(f"{stage:<26} {timing['median'] * 1000:>10.1f} ms")
+    for case, entry in results['lines'].items():
+        print(f"\n{case}: {entry['label']} ({entry['spans']} vãos)")
+        for stage, timing in entry['stages'].items():
+            print(f"  {stage:<24} {timing['median'] * 1000:>10.1f} ms")
+    if 'all_lines' in results:
+        all_lines = results['all_lines']
+        print(f"\nTodos os conjuntos: {all_lines['lines']} linhas, {all_lines['spans']} vãos, {all_lines['total']:.1f} s")
+        for stage, total in all_lines['stages'].items():
+            print(f'  {stage:<24} {total:>10.2f} s')
+        for label, error in all_lines['errors'].items():
+            print(f'  Erro em {label}: {error}')
+    print(f'\nResultados salvos em {args.output}.')
+
+    if args.baseline is not None:
+        with open(args.baseline, 'r') as file:
+            regressions = compare(results, json.load(file), args.tolerance)
+        for item in regressions:
+            print(f"Regressão em {item['case']}/{item['stage']}: {item['baseline'] * 1000:.1f} ms -> "
+                  f"{item['current'] * 1000:.1f} ms ({item['ratio']:.2f}x)")
+        if regressions:
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,173 @@
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
+import numpy as np
 import unicodedata
+import datetime
+import tempfile
+import sqlite3
+import csv
 import os
 
+# Tipos aceitos no mapa de tipos das colunas da concatenação
+dtype_names = {'str': 'string', 'float': 'float64', 'int': 'Int64'}
+
+def read_csv_blocks(file_path, columns, sep = ';', encoding = 'utf-8-sig', dtypes = None, chunksize = 50000):
+    '''
+    Lê um arquivo .csv em blocos e os converte para texto no formato de saída da concatenação.
+    Executado nos processos do pool de `data_analysis.concatenate_csv_stream`.
+
+    Args:
+        file_path (str): Caminho do arquivo .csv.
+        columns (list): Ordem das colunas no arquivo de saída.
+        sep (str): Separador dos campos.
+        encoding (str): Codificação do arquivo.
+        dtypes (dict): Mapa de coluna para tipo (`str`, `float` ou `int`). Colunas fora do mapa são lidas como texto.
+        chunksize (int): Quantidade de linhas por bloco.
+
+    Returns:
+        blocks (list): Blocos de texto, sem cabeçalho, prontos para escrita.
+        rows (int): Quantidade de linhas lidas.
+        invalid (dict): Quantidade de valores que não puderam ser convertidos, por coluna.
+    '''
+
+    dtypes = dtypes or dict()
+    blocks, rows, invalid = list(), 0, dict()
+
+    # Todas as colunas são lidas como texto, sem inferência de tipos entre arquivos ou blocos
+    reader = pd.read_csv(file_path, sep = sep, encoding = encoding, dtype = str, keep_default_na = False,
+                         chunksize = chunksize)
+    for chunk in reader:
+        chunk = chunk[columns]
+
+        for column, dtype in dtypes.items():
+            if dtype == 'str' or column not in chunk.columns:
+                continue
+            values = chunk[column].str.strip()
+            converted = pd.to_numeric(values.where(values != ''), errors = 'coerce')
+            if dtype == 'int':
+                # Valores fracionários não podem ser convertidos para inteiro e são contados como inválidos
+                converted = converted.where(converted.isna() | (converted % 1 == 0))
+            errors = int((converted.isna() & (values != '')).sum())
+            if errors:
+                invalid[column] = invalid.get(column, 0) + errors
+            chunk[column] = converted.astype(dtype_names[dtype])
+
+        blocks.append(chunk.to_csv(sep = sep, header = False, index = False, lineterminator = '\n'))
+        rows += len(chunk)
+
+    return blocks, rows, invalid
+
+class row_hash_set:
+    '''
+    Conjunto dos hashes de linhas já vistas, usado na remoção de duplicatas em blocos. Os hashes ficam em
+    memória até um limite e, a partir dele, são transferidos para um banco SQLite temporário em disco.
+    '''
+
+    def __init__(self, max_memory_entries = 5000000, spill_dir = None):
+        '''
+        Construtor da classe.
+
+        Args:
+            max_memory_entries (int): Quantidade máxima de hashes mantidos em memória.
+            spill_dir (str): Pasta do banco temporário. Caso não seja informada, usa a pasta temporária do sistema.
+
+        Returns:
+            None
+        '''
+
+        self.max_memory_entries = max_memory_entries
+        self.spill_dir = spill_dir
+        self.memory = set()
+        self.connection = None
+        self.spilled = 0
+
+    def spill(self):
+        '''
+        Transfere os hashes em memória para o banco em disco.
+
+        Args:
+            None
+
+        Returns:
+            None
+        '''
+
+        if self.connection is None:
+            handle, self.db_path = tempfile.mkstemp(suffix = '.sqlite', dir = self.spill_dir)
+            os.close(handle)
+            self.connection = sqlite3.connect(self.db_path)
+            self.connection.execute('CREATE TABLE seen (hash INTEGER PRIMARY KEY) WITHOUT ROWID')
+
+        self.connection.executemany('INSERT OR IGNORE INTO seen VALUES (?)', ((value,) for value in self.memory))
+        self.connection.commit()
+        self.spilled += len(self.memory)
+        self.memory.clear()
+
+    def in_disk(self, hashes):
+        '''
+        Verifica quais hashes já foram transferidos para o disco.
+
+        Args:
+            hashes (list): Hashes a verificar.
+
+        Returns:
+            found (set): Hashes encontrados no banco.
+        '''
+
+        found = set()
+        if self.connection is None:
+            return found
+
+        for start in range(0, len(hashes), 500):
+            batch = hashes[start:start + 500]
+            query = f"SELECT hash FROM seen WHERE hash IN ({','.join('?' * len(batch))})"
+            found.update(row[0] for row in self.connection.execute(query, batch))
+
+        return found
+
+    def add_new(self, hashes):
+        '''
+        Registra os hashes de um bloco e indica quais aparecem pela primeira vez.
+
+        Args:
+            hashes (array): Hashes das linhas do bloco, na ordem das linhas.
+
+        Returns:
+            is_new (array): Máscara booleana com as linhas ainda não vistas.
+        '''
+
+        # Duplicatas dentro do próprio bloco
+        hashes = np.asarray(hashes).view('int64')
+        is_new = ~pd.Series(hashes).duplicated(keep = 'first').to_numpy()
+
+        candidates = [int(value) for value in hashes[is_new]]
+        seen = {value for value in candidates if value in self.memory} | self.in_disk(candidates)
+        if seen:
+            is_new &= ~np.isin(hashes, list(seen))
+
+        self.memory.update(int(value) for value in hashes[is_new])
+        if len(self.memory) > self.max_memory_entries:
+            self.spill()
+
+        return is_new
+
+    def close(self):
+        '''
+        Descarta os hashes e remove o banco temporário.
+
+        Args:
+            None
+
+        Returns:
+            None
+        '''
+
+        self.memory.clear()
+        if self.connection is not None:
+            self.connection.close()
+            os.remove(self.db_path)
+            self.connection = None
+
 class data_analysis:
     '''
     Funções utilitárias para realizar uma série de tratamentos nos dataframes.
@@ -46,6 +212,374 @@ class data_analysis:
 
         return full_df
     
+    def read_header(self, file_path, sep = ';', encoding = 'utf-8-sig'):
+        '''
+        Lê apenas o cabeçalho de um arquivo .csv.
+
+        Args:
+            file_path (str): Caminho do arquivo .csv.
+            sep (str): Separador dos campos.
+            encoding (str): Codificação do arquivo.
+
+        Returns:
+            columns (list): Nomes das colunas.
+        '''
+
+        with open(file_path, 'r', encoding = encoding, newline = '') as file:
+            return next(csv.reader(file, delimiter = sep), list())
+
+    def validate_headers(self, files, sep = ';', encoding = 'utf-8-sig'):
+        '''
+        Compara o cabeçalho de cada arquivo com o do primeiro arquivo da lista.
+
+        Args:
+            files (list): Caminhos dos arquivos .csv.
+            sep (str): Separador dos campos.
+            encoding (str): Codificação dos arquivos.
+
+        Returns:
+            columns (list): Colunas de referência.
+            accepted (list): Arquivos com as mesmas colunas, mesmo que em outra ordem.
+            mismatches (list): Lista de dicionários `file`, `missing` e `extra` dos arquivos com colunas diferentes.
+        '''
+
+        columns = self.read_header(files[0], sep = sep, encoding = encoding) if files else list()
+        accepted, mismatches = list(), list()
+
+        for file_path in files:
+            header = self.read_header(file_path, sep = sep, encoding = encoding)
+            missing = [column for column in columns if column not in header]
+            extra = [column for column in header if column not in columns]
+
+            if missing or extra:
+                mismatches.append({'file': file_path, 'missing': missing, 'extra': extra})
+            else:
+                accepted.append(file_path)
+
+        return columns, accepted, mismatches
+
+    def concatenate_csv_stream(self, src_path, dst_path, sep = ';', encoding = 'utf-8-sig', dtypes = None,
+                               workers = None, chunksize = 50000, strict = False):
+        '''
+        Concatena os arquivos .csv de um diretório diretamente no arquivo de destino. Os arquivos são lidos
+        em paralelo e em blocos, os cabeçalhos são validados e a saída é escrita na ordem dos nomes dos arquivos,
+        sem manter a tabela completa em memória.
+
+        Args:
+            src_path (str): Caminho de destino onde estão localizados os arquivos .csv.
+            dst_path (str): Caminho com o nome do arquivo .csv concatenado.
+            sep (str): Separador dos campos, mantido no arquivo de saída.
+            encoding (str): Codificação dos arquivos de entrada e de saída.
+            dtypes (dict): Mapa de coluna para tipo (`str`, `float` ou `int`). As demais colunas são mantidas como texto.
+            workers (int): Quantidade de processos de leitura. Caso não seja informado, usa a quantidade de CPUs.
+            chunksize (int): Quantidade de linhas lidas por bloco.
+            strict (bool): Interrompe a concatenação caso algum cabeçalho seja diferente, em vez de ignorar o arquivo.
+
+        Returns:
+            report (dict): Relatório com `files` arquivos concatenados, `rows` linhas escritas, `mismatches` arquivos
+            ignorados por cabeçalho diferente e `invalid` valores não convertidos pelo mapa de tipos, por coluna.
+        '''
+
+        files = sorted(os.path.join(src_path, f) for f in os.listdir(src_path) if f.endswith('.csv'))
+        columns, accepted, mismatches = self.validate_headers(files, sep = sep, encoding = encoding)
+
+        if mismatches and strict:
+            raise ValueError(f'Cabeçalhos diferentes em {len(mismatches)} arquivo(s): '
+                             f'{", ".join(os.path.basename(item["file"]) for item in mismatches)}.')
+
+        dtypes = dtypes or dict()
+        unknown = [dtype for dtype in dtypes.values() if dtype not in dtype_names]
+        if unknown:
+            raise ValueError(f'Tipos desconhecidos no mapa de tipos: {", ".join(unknown)}.')
+
+        workers = max(1, min(workers or os.cpu_count(), len(accepted) or 1))
+        report = {'files': len(accepted), 'rows': 0, 'mismatches': mismatches, 'invalid': dict()}
+
+        def write(file, result):
+            blocks, rows, invalid = result
+            file.writelines(blocks)
+            report['rows'] += rows
+            for column, errors in invalid.items():
+                report['invalid'][column] = report['invalid'].get(column, 0) + errors
+
+        # Escreve em arquivo temporário para não expor uma tabela incompleta
+        tmp_path = f'{dst_path}.tmp'
+        try:
+            with open(tmp_path, 'w', encoding = encoding, newline = '') as file:
+                file.write(sep.join(columns) + '\n')
+
+                args = (columns, sep, encoding, dtypes, chunksize)
+                if workers == 1:
+                    for file_path in accepted:
+                        write(file, read_csv_blocks(file_path, *args))
+                else:
+                    # Janela de leituras em andamento, limitando a memória aos arquivos ainda não escritos
+                    with ProcessPoolExecutor(max_workers = workers) as executor:
+                        pending = list()
+                        for file_path in accepted:
+                            pending.append(executor.submit(read_csv_blocks, file_path, *args))
+                            if len(pending) >= 2 * workers:
+                                write(file, pending.pop(0).result())
+                        for future in pending:
+                            write(file, future.result())
+        except BaseException:
+            # Uma falha não deixa o arquivo temporário incompleto para trás
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        os.replace(tmp_path, dst_path)
+
+        return report
+
+    def edit_csv_stream(self, src_path, dst_path, drop_duplicates = False, dedup_keys = None, drop_columns = None,
+                        sanitize_column_names = False, chunksize = 50000, max_memory_hashes = 5000000, infer_types = False):
+        '''
+        Trata um arquivo .csv em uma única passagem, em blocos: as colunas descartadas não são lidas (`usecols`),
+        os nomes dos atributos são normalizados uma única vez e a saída é escrita a cada bloco. As duplicatas são
+        identificadas pelo hash de cada linha, mantendo a memória constante para qualquer tamanho de arquivo.
+        Com `infer_types`, uma passagem anterior identifica os tipos das colunas e os valores são escritos no mesmo
+        formato do tratamento em memória (`csv_to_df` e `df_to_csv`), ex.: `152.0` em colunas numéricas com valores faltantes.
+
+        Args:
+            src_path (str): Caminho onde está localizado o arquivo .csv (separado por `;`).
+            dst_path (str): Caminho com o nome do arquivo .csv tratado.
+            drop_duplicates (bool): Elimina linhas duplicadas, mantendo a primeira ocorrência.
+            dedup_keys (list): Colunas que identificam uma duplicata. Caso não seja informado, compara a linha inteira.
+            drop_columns (list): Colunas a serem eliminadas.
+            sanitize_column_names (bool): Normaliza o nome dos atributos.
+            chunksize (int): Quantidade de linhas por bloco.
+            max_memory_hashes (int): Quantidade de hashes de linhas mantidos em memória antes de usar o disco.
+            infer_types (bool): Escreve os valores com os tipos inferidos pelo pandas, em vez do texto original.
+
+        Returns:
+            report (dict): Relatório com `rows_in` linhas lidas, `rows_out` linhas escritas, `duplicates` linhas
+            duplicadas removidas, `dropped` colunas eliminadas e `columns` colunas do arquivo tratado.
+        '''
+
+        header = self.read_header(src_path)
+        drop_columns = list(drop_columns or list())
+        missing = [column for column in drop_columns + list(dedup_keys or list()) if column not in header]
+        if missing:
+            raise ValueError(f'Colunas não encontradas no arquivo: {", ".join(missing)}.')
+
+        # Colunas escritas e colunas lidas (as chaves de duplicata podem ser colunas descartadas)
+        kept = [column for column in header if column not in drop_columns]
+        keys = list(dedup_keys) if dedup_keys else list(header)
+        read = [column for column in header if column in kept or (drop_duplicates and column in keys)]
+
+        # Nomes finais calculados uma única vez
+        names = [self.sanitize_name(column) for column in kept] if sanitize_column_names else kept
+
+        # Tipos inferidos em todo o arquivo, para que a leitura em blocos não dependa do conteúdo de cada bloco
+        options = {'dtype': str, 'keep_default_na': False}
+        if infer_types:
+            options = {'dtype': self.infer_csv_types(src_path, usecols = read, chunksize = chunksize), 'na_values': ['']}
+
+        hashes = row_hash_set(max_memory_entries = max_memory_hashes) if drop_duplicates else None
+        report = {'rows_in': 0, 'rows_out': 0, 'duplicates': 0, 'dropped': drop_columns, 'columns': names}
+
+        # Escreve em arquivo temporário para não expor uma tabela incompleta
+        tmp_path = f'{dst_path}.tmp'
+        try:
+            with open(tmp_path, 'w', encoding = 'utf-8', newline = '') as file:
+                csv.writer(file, lineterminator = '\n').writerow(names)
+
+                reader = pd.read_csv(src_path, sep = ';', encoding = 'utf-8-sig', usecols = read, chunksize = chunksize, **options)
+                for chunk in reader:
+                    report['rows_in'] += len(chunk)
+
+                    if hashes is not None:
+                        is_new = hashes.add_new(pd.util.hash_pandas_object(chunk[keys], index = False).to_numpy())
+                        report['duplicates'] += int((~is_new).sum())
+                        chunk = chunk[is_new]
+
+                    chunk = chunk[kept]
+                    chunk.to_csv(file, header = False, index = False, lineterminator = '\n')
+                    report['rows_out'] += len(chunk)
+        except BaseException:
+            # Uma falha não deixa o arquivo temporário incompleto para trás
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        finally:
+            if hashes is not None:
+                hashes.close()
+
+        os.replace(tmp_path, dst_path)
+
+        return report
+
+    def infer_csv_types(self, src_path, usecols = None, chunksize = 50000):
+        '''
+        Infere o tipo de cada coluna de um arquivo .csv como o pandas faria ao ler o arquivo inteiro, combinando
+        os tipos inferidos em cada bloco: texto em algum bloco resulta em texto, números com algum valor
+        decimal ou faltante resultam em `float64`.
+
+        Args:
+            src_path (str): Caminho onde está localizado o arquivo .csv (separado por `;`).
+            usecols (list): Colunas consideradas. Caso não seja informado, todas as colunas.
+            chunksize (int): Quantidade de linhas por bloco.
+
+        Returns:
+            dtypes (dict): Dicionário da coluna para `int64`, `float64`, `bool` ou `str`.
+        '''
+
+        kinds = dict()
+        reader = pd.read_csv(src_path, sep = ';', encoding = 'utf-8-sig', usecols = usecols, na_values = [''], chunksize = chunksize)
+        for chunk in reader:
+            for column in chunk.columns:
+                kinds.setdefault(column, set()).add(chunk[column].dtype.kind)
+
+        dtypes = dict()
+        for column, kind in kinds.items():
+            if kind <= {'i'}:
+                dtypes[column] = 'int64'
+            elif kind <= {'i', 'f'}:
+                dtypes[column] = 'float64'
+            elif kind == {'b'}:
+                dtypes[column] = 'bool'
+            else:
+                dtypes[column] = str
+
+        return dtypes
+
+    def row_keys(self, dataframe, key):
+        '''
+        Retorna a chave de cada linha para a comparação entre versões de uma tabela. Chaves numéricas são
+        normalizadas pelo valor e linhas sem valor na coluna chave são identificadas pelo hash do seu conteúdo.
+
+        Args:
+            dataframe (dataframe): Tabela lida como texto.
+            key (str): Coluna chave, ex.: `OBJECTID`, `COD_ESTRUTURA_SAP` ou `COD_VAO_SAP`.
+
+        Returns:
+            keys (series): Chave de cada linha.
+        '''
+
+        keys = dataframe[key].astype(str)
+
+        # Chaves numéricas iguais com formatação diferente (ex.: `1605037` e `1605037.0`) são a mesma chave
+        numeric = pd.to_numeric(keys, errors = 'coerce')
+        numeric = numeric[numeric.notna() & np.isfinite(numeric)]
+        if not numeric.empty:
+            keys = keys.copy()
+            keys[numeric.index] = [str(int(value)) if value.is_integer() else repr(value) for value in numeric.astype('float64')]
+
+        empty = keys.str.strip() == ''
+        if empty.any():
+            hashes = pd.util.hash_pandas_object(dataframe[empty], index = False).astype(str)
+            keys = keys.where(~empty, '#' + hashes)
+
+        duplicated = keys[keys.duplicated()]
+        if not duplicated.empty:
+            raise ValueError(f'Chave "{key}" repetida: {", ".join(duplicated.unique()[:10])}.')
+
+        return keys
+
+    def diff_tables(self, current, new, key, line_column = 'COD_LT_SAP'):
+        '''
+        Compara duas versões de uma tabela pela coluna chave.
+
+        Args:
+            current (dataframe): Tabela atual, lida como texto.
+            new (dataframe): Nova exportação no mesmo formato, lida como texto.
+            key (str): Coluna chave.
+            line_column (str): Coluna com o código do conjunto de linhas de cada registro.
+
+        Returns:
+            changes (dataframe): Uma linha por alteração: `change` (`insert`, `update` ou `delete`), `key`,
+            `line` códigos dos conjuntos de linhas afetados e `columns` colunas alteradas.
+        '''
+
+        if list(current.columns) != list(new.columns):
+            raise ValueError('As colunas da nova exportação são diferentes das colunas da tabela atual.')
+
+        current = current.set_axis(self.row_keys(current, key), axis = 0)
+        new = new.set_axis(self.row_keys(new, key), axis = 0)
+
+        inserted = new.index.difference(current.index, sort = False)
+        deleted = current.index.difference(new.index, sort = False)
+        common = current.index.intersection(new.index, sort = False)
+
+        # Linhas em comum com conteúdo diferente
+        old_rows, new_rows = current.loc[common], new.loc[common]
+        differs = old_rows.ne(new_rows)
+        # Valores numéricos iguais com formatação diferente (ex.: `152` e `152.0`) não são alterações
+        for column in differs.columns[differs.any(axis = 0).to_numpy()]:
+            old_values = pd.to_numeric(old_rows[column], errors = 'coerce')
+            new_values = pd.to_numeric(new_rows[column], errors = 'coerce')
+            differs[column] &= ~(old_values == new_values)
+        updated = common[differs.any(axis = 1).to_numpy()]
+
+        changes = list()
+        for value in inserted:
+            changes.append({'change': 'insert', 'key': value, 'line': new.at[value, line_column], 'columns': ''})
+        for value in updated:
+            lines = sorted({old_rows.at[value, line_column], new_rows.at[value, line_column]})
+            columns = list(differs.columns[differs.loc[value].to_numpy()])
+            changes.append({'change': 'update', 'key': value, 'line': '|'.join(lines), 'columns': '|'.join(columns)})
+        for value in deleted:
+            changes.append({'change': 'delete', 'key': value, 'line': current.at[value, line_column], 'columns': ''})
+
+        return pd.DataFrame(changes, columns = ['change', 'key', 'line', 'columns'])
+
+    def incremental_update(self, current_path, new_path, key, change_log_path = None, line_column = 'COD_LT_SAP', apply = True):
+        '''
+        Atualiza uma tabela tratada a partir de uma nova exportação, aplicando apenas as inclusões, alterações
+        e exclusões. A ordem das linhas existentes é mantida e as novas linhas são adicionadas ao final.
+
+        Args:
+            current_path (str): Caminho da tabela tratada atual (.csv), sobrescrita com as alterações.
+            new_path (str): Caminho da nova exportação já tratada, com as mesmas colunas.
+            key (str): Coluna chave, ex.: `OBJECTID`, `COD_ESTRUTURA_SAP` ou `COD_VAO_SAP`.
+            change_log_path (str): Arquivo .csv onde as alterações são acrescentadas. Caso não seja informado, não registra.
+            line_column (str): Coluna com o código do conjunto de linhas de cada registro.
+            apply (bool): Aplica as alterações. Caso seja falso, apenas compara as tabelas.
+
+        Returns:
+            summary (dict): Resumo com `inserts`, `updates` e `deletes` quantidades de alterações, `lines` códigos dos
+            conjuntos de linhas afetados e `changes` dataframe com as alterações.
+        '''
+
+        current = pd.read_csv(current_path, dtype = str, keep_default_na = False)
+        new = pd.read_csv(new_path, dtype = str, keep_default_na = False)
+
+        changes = self.diff_tables(current, new, key, line_column = line_column)
+        counts = changes['change'].value_counts()
+        lines = sorted({line for value in changes['line'] for line in value.split('|') if line})
+        summary = {'inserts': int(counts.get('insert', 0)), 'updates': int(counts.get('update', 0)),
+                   'deletes': int(counts.get('delete', 0)), 'lines': lines, 'changes': changes}
+
+        if changes.empty or not apply:
+            return summary
+
+        # Aplica as alterações sobre a tabela atual
+        current_keys, new_keys = self.row_keys(current, key), self.row_keys(new, key)
+        new_rows = new.set_axis(new_keys, axis = 0)
+        removed = set(changes.loc[changes['change'] == 'delete', 'key'])
+        updated = list(changes.loc[changes['change'] == 'update', 'key'])
+        inserted = list(changes.loc[changes['change'] == 'insert', 'key'])
+
+        result = current.set_axis(current_keys, axis = 0)
+        result = result[~result.index.isin(removed)]
+        result.loc[updated] = new_rows.loc[updated]
+        result = pd.concat([result, new_rows.loc[inserted]])
+
+        # Escreve em arquivo temporário para não expor uma tabela incompleta
+        tmp_path = f'{current_path}.tmp'
+        result.to_csv(tmp_path, index = False, lineterminator = '\n')
+        os.replace(tmp_path, current_path)
+
+        if change_log_path is not None:
+            log = changes.assign(table = os.path.basename(current_path), timestamp = datetime.datetime.now().isoformat(timespec = 'seconds'))
+            log = log[['timestamp', 'table', 'change', 'key', 'line', 'columns']]
+            write_header = not os.path.exists(change_log_path)
+            os.makedirs(os.path.dirname(change_log_path) or '.', exist_ok = True)
+            log.to_csv(change_log_path, mode = 'a', header = write_header, index = False, lineterminator = '\n')
+
+        return summary
+
     def csv_to_df(self, src_path):
         '''
         Converte um arquivo .csv para um dataframe do Pandas.
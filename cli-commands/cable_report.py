@@ -0,0 +1,103 @@
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'interface'))
+
+from data_manipulation import render_data
+from line_dataset import make_dataset
+from table_cache import table_cache
+from table_store import table_store
+import cable_analysis
+import pandas as pd
+import argparse
+import paths
+
+def help_texts():
+    '''
+    Textos de ajuda do argparser.
+
+    Chaves de acesso: `text_description`, `config_help`, `dst_path_help`, `model_help` e `with_dataset_help`.
+
+    Args:
+        None
+
+    Returns:
+        texts (dict): Dicionário com as informações de ajuda de cada parâmetro do argparser.
+    '''
+
+    texts = {
+        'text_description': '(str) Calcula em lote a flecha e a distância ao solo dos cabos de toda a rede e sinaliza as violações.',
+        'config_help': '(str) Caminho do arquivo .yaml de configuração da interface.',
+        'dst_path_help': '(str) Pasta de destino das tabelas geradas.',
+        'model_help': '(str) Curva do cabo: catenary ou parabola. Padrão: `cable_model` da configuração.',
+        'with_dataset_help': '(bool) Gera também a tabela de vãos de cada conjunto de linhas (make_dataset) com o resumo dos cabos.'
+    }
+
+    return texts
+
+def main():
+
+    # Obtém os campos de texto com informações de ajuda
+    texts = help_texts()
+    # Adiciona uma descrição do comando
+    parser = argparse.ArgumentParser(texts['text_description'])
+
+    # Define os parâmetros de entrada
+    parser.add_argument('--config', type = str, help = texts['config_help'], default = 'interface/config.yaml')
+    parser.add_argument('--dst_path', type = str, help = texts['dst_path_help'], default = 'out_data')
+    parser.add_argument('--model', type = str, choices = ['catenary', 'parabola'], help = texts['model_help'], default = None)
+    parser.add_argument('--with_dataset', action = 'store_true', help = texts['with_dataset_help'])
+
+    # Atribuí a args os dados coletados da linhas de comando
+    args = parser.parse_args()
+
+    df_paths = paths.return_data_paths(yaml_file = args.config)
+    columns_names = paths.return_columns_ref(yaml_file = args.config)
+    cable_config = paths.return_cable_config(yaml_file = args.config)
+    cache = table_cache(cache_dir = paths.return_cache_dir(yaml_file = args.config))
+    store = table_store(index_columns = paths.return_index_columns(yaml_file = args.config), cache = cache)
+
+    # Todos os cabos da rede analisados de uma vez
+    lines = store.load_table(df_paths['df_path_lines'])
+    voltages = cable_analysis.line_voltages(lines, code_column = columns_names['column_sap_lines'])
+    cables = cable_analysis.load_cables(cable_config['cables_dir'])
+    results = cable_analysis.analyze_cables(cables, voltages, model = args.model or cable_config['model'],
+                                            clearance_base = cable_config['clearance_base'], kv_factor = cable_config['kv_factor'])
+    spans = cable_analysis.span_summary(results)
+
+    os.makedirs(args.dst_path, exist_ok = True)
+    results.to_csv(os.path.join(args.dst_path, 'cabos-analise.csv'), index = False)
+    spans.to_csv(os.path.join(args.dst_path, 'cabos-vaos.csv'), index = False)
+
+    fits = results['AJUSTE'].value_counts()
+    print(f"Cabos analisados: {len(results)} (ajuste completo: {fits.get('completo', 0)}, simétrico: {fits.get('simetrico', 0)}, "
+          f"inválido: {fits.get('invalido', 0)}), vãos: {len(spans)}.")
+
+    # Violações por conjunto de linhas
+    violations = results[results['VIOLACAO']].groupby('COD_LT_SAP').size().sort_values(ascending = False)
+    print(f'Cabos abaixo da distância mínima ao solo: {int(violations.sum())}')
+    for code, count in violations.items():
+        print(f'    {code}: {count}')
+
+    if args.with_dataset:
+        # Tabela de vãos de cada conjunto de linhas com o resumo dos cabos
+        data_modules = render_data(store = store)
+        tables = list()
+        for label in data_modules.extract_csv_attributes(csv_path = df_paths['df_path_lines'], column_name = columns_names['column_name_lines']):
+            try:
+                values_towers, coords, values_conexions = data_modules.separate_conj_data(df_paths = df_paths, columns_names = columns_names,
+                                                                                          label = label)
+                dataframe, _ = make_dataset(label, values_towers, values_conexions, coords)
+            except Exception as e:
+                print(f'Erro ao montar a tabela de vãos de {label}: {e}')
+                continue
+            tables.append(cable_analysis.join_spans(dataframe, spans))
+
+        dataset = pd.concat(tables, ignore_index = True)
+        dataset.to_csv(os.path.join(args.dst_path, 'vaos-cabos.csv'), index = False)
+        print(f"Vãos das tabelas dos conjuntos: {len(dataset)}, com cabos cadastrados: {int(dataset['CABOS'].notna().sum())}.")
+
+    print(f'Tabelas geradas em {args.dst_path}.')
+
+if __name__ == '__main__':
+    main()
@@ -5,8 +5,9 @@ def help_texts():
     '''
     Textos de ajuda do argparser.
 
-    Chaves de acesso: `text_description`, `dst_path_help`, `src_path_help` e `filename_help`.
-    
+    Chaves de acesso: `text_description`, `dst_path_help`, `src_path_help`, `filename_help`, `workers_help`,
+    `chunksize_help`, `sep_help`, `encoding_help`, `dtypes_help`, `strict_help` e `in_memory_help`.
+
     Args:
         None
 
@@ -18,11 +19,38 @@ def help_texts():
         'text_description': '(str) Concatena arquivos csv em um único arquivo.',
         'src_path_help': '(str) Caminho onde está localizado os arquivos .csv das torres.',
         'dst_path_help': '(str) Caminho de destino a ser salvo o dataframe concatenado .csv.',
-        'filename_help': '(str) Nome do arquivo .csv com os dataframes concatenados, extensão deve ser declarada.'
+        'filename_help': '(str) Nome do arquivo .csv com os dataframes concatenados, extensão deve ser declarada.',
+        'workers_help': '(int) Quantidade de processos de leitura em paralelo. Padrão: quantidade de CPUs.',
+        'chunksize_help': '(int) Quantidade de linhas lidas e escritas por bloco.',
+        'sep_help': '(str) Separador dos campos dos arquivos, mantido no arquivo concatenado.',
+        'encoding_help': '(str) Codificação dos arquivos de entrada e de saída.',
+        'dtypes_help': '(list) Mapa de tipos no formato COLUNA=tipo (str, float ou int). As demais colunas são mantidas como texto.',
+        'strict_help': '(bool) Interrompe a concatenação se algum arquivo tiver cabeçalho diferente, em vez de ignorá-lo.',
+        'in_memory_help': '(bool) Usa a concatenação original, com todos os arquivos carregados em memória.'
     }
 
     return texts
 
+def parse_dtypes(items):
+    '''
+    Converte a lista `COLUNA=tipo` da linha de comando para um dicionário.
+
+    Args:
+        items (list): Lista de textos no formato `COLUNA=tipo`.
+
+    Returns:
+        dtypes (dict): Mapa de coluna para tipo.
+    '''
+
+    dtypes = dict()
+    for item in items or list():
+        column, _, dtype = item.rpartition('=')
+        if not column:
+            raise ValueError(f'Tipo "{item}" fora do formato COLUNA=tipo.')
+        dtypes[column] = dtype
+
+    return dtypes
+
 def main():
 
     # Obtém os campos de texto com informações de ajuda
@@ -34,6 +62,13 @@ def main():
     parser.add_argument('--src_path', type = str, help = texts['src_path_help'], required = True)
     parser.add_argument('--dst_path', type = str, help = texts['dst_path_help'], default = '')
     parser.add_argument('--filename', type = str, help = texts['filename_help'], default = 'output.csv')
+    parser.add_argument('--workers', type = int, help = texts['workers_help'], default = None)
+    parser.add_argument('--chunksize', type = int, help = texts['chunksize_help'], default = 50000)
+    parser.add_argument('--sep', type = str, help = texts['sep_help'], default = ';')
+    parser.add_argument('--encoding', type = str, help = texts['encoding_help'], default = 'utf-8-sig')
+    parser.add_argument('--dtypes', type = str, nargs = '+', help = texts['dtypes_help'], default = None)
+    parser.add_argument('--strict', action = 'store_true', help = texts['strict_help'])
+    parser.add_argument('--in_memory', action = 'store_true', help = texts['in_memory_help'])
 
     # Atribuí a args os dados coletados da linhas de comando
     args = parser.parse_args()
@@ -41,9 +76,24 @@ def main():
     # Concatena um diretório de arquivos .csv em um arquivo único
     try:
         data = data_analysis()
-        dataframe = data.concatenate_csv(args.src_path)
         full_path = args.dst_path + args.filename
-        data.df_to_csv(dataframe, dst_path = full_path)
+
+        if args.in_memory:
+            dataframe = data.concatenate_csv(args.src_path)
+            data.df_to_csv(dataframe, dst_path = full_path)
+        else:
+            report = data.concatenate_csv_stream(args.src_path, dst_path = full_path, sep = args.sep, encoding = args.encoding,
+                                                 dtypes = parse_dtypes(args.dtypes), workers = args.workers,
+                                                 chunksize = args.chunksize, strict = args.strict)
+
+            print(f"Arquivos concatenados: {report['files']}, linhas escritas: {report['rows']}.")
+            # Arquivos ignorados por cabeçalho diferente
+            for mismatch in report['mismatches']:
+                print(f"Cabeçalho diferente, arquivo ignorado: {mismatch['file']}")
+                print(f"    colunas faltantes: {mismatch['missing']}\n    colunas extras: {mismatch['extra']}")
+            # Valores que não correspondem ao mapa de tipos
+            for column, errors in report['invalid'].items():
+                print(f'Valores não convertidos na coluna {column}: {errors}')
 
         print(f'Tabela gerada com sucesso em {full_path}.')
     except Exception as e:
@@ -51,4 +101,4 @@ def main():
         print(f'Erro gerado\n: {e}')
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
@@ -21,7 +21,11 @@ def help_texts():
         'filename_help': '(str) Nome do arquivo .csv onde o dataframe tratado será salvo.',
         'drop_duplicates_help': '(bool) Elimina linhas duplicadas do dataframe.',
         'sanitize_column_names_help': '(str) Normaliza adequadamente o nome dos atributos do dataframe.',
-        'drop_columns_help': '(list) Elimina colunas delimitadas do dataframe.'
+        'drop_columns_help': '(list) Elimina colunas delimitadas do dataframe.',
+        'dedup_keys_help': '(list) Colunas que identificam uma linha duplicada. Padrão: a linha inteira.',
+        'chunksize_help': '(int) Quantidade de linhas lidas e escritas por bloco.',
+        'max_memory_hashes_help': '(int) Quantidade de hashes de linhas mantidos em memória antes de usar o disco.',
+        'in_memory_help': '(bool) Usa o tratamento original, com a tabela inteira carregada em memória.'
     }
 
     return texts
@@ -40,12 +44,34 @@ def main():
     parser.add_argument('--drop_duplicates', type = bool, help = texts['drop_duplicates_help'], default = False)
     parser.add_argument('--sanitize_column_names', type = bool, help = texts['sanitize_column_names_help'], default = False)
     parser.add_argument('--drop_columns', type = str, help = texts['drop_columns_help'], nargs = '+')
+    parser.add_argument('--dedup_keys', type = str, help = texts['dedup_keys_help'], nargs = '+')
+    parser.add_argument('--chunksize', type = int, help = texts['chunksize_help'], default = 50000)
+    parser.add_argument('--max_memory_hashes', type = int, help = texts['max_memory_hashes_help'], default = 5000000)
+    parser.add_argument('--in_memory', action = 'store_true', help = texts['in_memory_help'])
 
     # Atribuí a args os dados coletados da linhas de comando
     args = parser.parse_args()
 
     try:
         data = data_analysis()
+
+        # Tratamento em uma única passagem, em blocos
+        if not args.in_memory:
+            full_path = args.dst_path + args.filename
+            report = data.edit_csv_stream(args.src_path, dst_path = full_path, drop_duplicates = args.drop_duplicates,
+                                          dedup_keys = args.dedup_keys, drop_columns = args.drop_columns,
+                                          sanitize_column_names = args.sanitize_column_names, chunksize = args.chunksize,
+                                          max_memory_hashes = args.max_memory_hashes)
+
+            print(f"Linhas lidas: {report['rows_in']}, linhas escritas: {report['rows_out']}.")
+            if args.drop_duplicates:
+                print(f"Duplicatas removidas: {report['duplicates']}.")
+            if report['dropped']:
+                print(f"Colunas removidas: {report['dropped']}.")
+            print(f'Tabela gerada com sucesso em {full_path}.')
+
+            return
+
         dataframe = data.csv_to_df(args.src_path)
 
         # Elimina linhas duplicadas da tabela
@@ -0,0 +1,351 @@
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'interface'))
+
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from table_cache import table_cache
+from bdit_data import data_analysis
+import argparse
+import hashlib
+import shutil
+import json
+import yaml
+
+def help_texts():
+    '''
+    Textos de ajuda do argparser.
+
+    Chaves de acesso: `text_description`, `spec_help`, `workers_help`, `force_help` e `dry_run_help`.
+
+    Args:
+        None
+
+    Returns:
+        texts (dict): Dicionário com as informações de ajuda de cada parâmetro do argparser.
+    '''
+
+    texts = {
+        'text_description': '(str) Gera as tabelas tratadas e o cache colunar a partir das tabelas brutas do GEO BDIT.',
+        'spec_help': '(str) Caminho do arquivo .yaml com a especificação das tabelas.',
+        'workers_help': '(int) Quantidade de etapas executadas em paralelo. Padrão: quantidade de CPUs.',
+        'force_help': '(bool) Executa todas as etapas, mesmo as que não tiveram as entradas alteradas.',
+        'dry_run_help': '(bool) Apenas lista as etapas e se seriam executadas ou reaproveitadas.'
+    }
+
+    return texts
+
+def content_hash(paths, chunk_size = 1 << 20):
+    '''
+    Calcula o hash sha256 do conteúdo de arquivos e pastas (todos os .csv da pasta, em ordem de nome).
+
+    Args:
+        paths (list): Caminhos dos arquivos ou pastas.
+        chunk_size (int): Tamanho dos blocos de leitura em bytes.
+
+    Returns:
+        digest (str): Hash hexadecimal do conteúdo, `None` caso algum caminho não exista.
+    '''
+
+    sha = hashlib.sha256()
+    for path in paths:
+        if os.path.isdir(path):
+            files = sorted(os.path.join(path, f) for f in os.listdir(path) if f.endswith('.csv'))
+        elif os.path.exists(path):
+            files = [path]
+        else:
+            return None
+
+        for file_path in files:
+            sha.update(os.path.basename(file_path).encode('utf-8'))
+            with open(file_path, 'rb') as file:
+                for chunk in iter(lambda: file.read(chunk_size), b''):
+                    sha.update(chunk)
+
+    return sha.hexdigest()
+
+def stage_signature(stage):
+    '''
+    Assinatura de uma etapa: hash do conteúdo das entradas e dos parâmetros.
+
+    Args:
+        stage (dict): Etapa do DAG.
+
+    Returns:
+        signature (str): Assinatura da etapa, `None` caso alguma entrada não exista.
+    '''
+
+    inputs = content_hash(stage['inputs'])
+    if inputs is None:
+        return None
+
+    params = json.dumps(stage['params'], sort_keys = True)
+
+    return hashlib.sha256(f"{stage['kind']}:{inputs}:{params}".encode('utf-8')).hexdigest()
+
+def is_fresh(stage, signature, entry):
+    '''
+    Verifica se a etapa pode ser reaproveitada: mesmas entradas e parâmetros e saídas inalteradas.
+
+    Args:
+        stage (dict): Etapa do DAG.
+        signature (str): Assinatura atual da etapa.
+        entry (dict): Registro da etapa no manifesto, `None` caso não exista.
+
+    Returns:
+        fresh (bool): Indica se a etapa não precisa ser executada.
+    '''
+
+    if entry is None or signature is None or entry['signature'] != signature:
+        return False
+
+    return all(content_hash([path]) == entry['outputs'].get(path) for path in stage['outputs'])
+
+def publish_files(pairs):
+    '''
+    Copia os arquivos tratados para a pasta de destino. Todas as cópias são feitas em arquivos temporários
+    e só então substituem os arquivos de destino.
+
+    Args:
+        pairs (list): Lista de tuplas (origem, destino).
+
+    Returns:
+        None
+    '''
+
+    tmp_paths = list()
+    try:
+        for src, dst in pairs:
+            os.makedirs(os.path.dirname(dst) or '.', exist_ok = True)
+            shutil.copyfile(src, f'{dst}.tmp')
+            tmp_paths.append(f'{dst}.tmp')
+    except Exception:
+        for tmp_path in tmp_paths:
+            os.remove(tmp_path)
+        raise
+
+    for src, dst in pairs:
+        os.replace(f'{dst}.tmp', dst)
+
+def execute_stage(stage, entry, force = False):
+    '''
+    Executa uma etapa do DAG, a menos que as entradas e os parâmetros sejam os mesmos da última execução.
+    Executado nos processos do pool.
+
+    Args:
+        stage (dict): Etapa do DAG: `kind` tipo, `inputs` entradas, `outputs` saídas e `params` parâmetros.
+        entry (dict): Registro da etapa no manifesto, `None` caso não exista.
+        force (bool): Executa a etapa mesmo sem alterações.
+
+    Returns:
+        status (str): `skipped` para etapa reaproveitada ou `done` para etapa executada.
+        entry (dict): Novo registro da etapa no manifesto.
+        details (str): Resumo da execução.
+    '''
+
+    signature = stage_signature(stage)
+    if not force and is_fresh(stage, signature, entry):
+        return 'skipped', entry, ''
+
+    data = data_analysis()
+    params = stage['params']
+    details = ''
+
+    for path in stage['outputs']:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok = True)
+
+    if stage['kind'] == 'concatenate':
+        report = data.concatenate_csv_stream(stage['inputs'][0], dst_path = stage['outputs'][0], strict = True, workers = 1)
+        details = f"{report['files']} arquivos, {report['rows']} linhas"
+    elif stage['kind'] == 'edit':
+        report = data.edit_csv_stream(stage['inputs'][0], dst_path = stage['outputs'][0],
+                                      drop_duplicates = params['drop_duplicates'], dedup_keys = params['dedup_keys'] or None,
+                                      drop_columns = params['drop_columns'], sanitize_column_names = params['sanitize_column_names'],
+                                      infer_types = params['infer_types'])
+        details = f"{report['rows_out']} linhas, {report['duplicates']} duplicatas removidas"
+    elif stage['kind'] == 'publish':
+        publish_files(list(zip(stage['inputs'], stage['outputs'])))
+        details = f"{len(stage['outputs'])} tabelas"
+    elif stage['kind'] == 'cache':
+        cache = table_cache(cache_dir = params['cache_dir'])
+        for csv_path in stage['inputs']:
+            cache.build(csv_path)
+        details = f"{len(stage['inputs'])} tabelas"
+    else:
+        raise ValueError(f"Etapa \"{stage['kind']}\" desconhecida.")
+
+    entry = {'signature': stage_signature(stage), 'outputs': {path: content_hash([path]) for path in stage['outputs']}}
+
+    return 'done', entry, details
+
+def build_dag(spec):
+    '''
+    Monta o DAG de etapas a partir da especificação: concatenação e tratamento por tabela, em paralelo entre
+    as tabelas, seguidos da publicação das tabelas tratadas e da construção do cache colunar.
+
+    Args:
+        spec (dict): Especificação carregada do arquivo .yaml.
+
+    Returns:
+        stages (dict): Dicionário de nome da etapa para `kind`, `deps`, `inputs`, `outputs` e `params`.
+    '''
+
+    work_dir, output_dir = spec['work_dir'], spec['output_dir']
+    stages, edited, published = dict(), list(), list()
+
+    for table, options in spec['tables'].items():
+        source, deps = options['source'], list()
+
+        # Pastas com um .csv por linha são concatenadas antes do tratamento
+        if os.path.isdir(source):
+            raw_path = os.path.join(work_dir, f'{table}-bruto.csv')
+            stages[f'{table}:concatenate'] = {'kind': 'concatenate', 'deps': list(), 'inputs': [source],
+                                              'outputs': [raw_path], 'params': dict()}
+            source, deps = raw_path, [f'{table}:concatenate']
+
+        edited_path = os.path.join(work_dir, f'{table}.csv')
+        params = {key: options.get(key, default) for key, default in
+                  [('drop_columns', list()), ('sanitize_column_names', False), ('drop_duplicates', False), ('dedup_keys', list()),
+                   ('infer_types', False)]}
+        stages[f'{table}:edit'] = {'kind': 'edit', 'deps': deps, 'inputs': [source], 'outputs': [edited_path], 'params': params}
+
+        edited.append(edited_path)
+        published.append(os.path.join(output_dir, f'{table}.csv'))
+
+    stages['publish'] = {'kind': 'publish', 'deps': [name for name in stages if name.endswith(':edit')],
+                         'inputs': edited, 'outputs': published, 'params': dict()}
+
+    cache = table_cache(cache_dir = spec['cache_dir'])
+    stages['cache'] = {'kind': 'cache', 'deps': ['publish'], 'inputs': published,
+                       'outputs': [cache.cache_path(path) for path in published], 'params': {'cache_dir': spec['cache_dir']}}
+
+    return stages
+
+def read_manifest(manifest_path):
+    '''
+    Lê o manifesto com os registros das etapas executadas.
+
+    Args:
+        manifest_path (str): Caminho do manifesto .json.
+
+    Returns:
+        manifest (dict): Dicionário de nome da etapa para o seu registro.
+    '''
+
+    try:
+        with open(manifest_path, 'r') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return dict()
+
+def write_manifest(manifest_path, manifest):
+    '''
+    Salva o manifesto de forma atômica.
+
+    Args:
+        manifest_path (str): Caminho do manifesto .json.
+        manifest (dict): Dicionário de nome da etapa para o seu registro.
+
+    Returns:
+        None
+    '''
+
+    os.makedirs(os.path.dirname(manifest_path) or '.', exist_ok = True)
+    with open(f'{manifest_path}.tmp', 'w') as file:
+        json.dump(manifest, file, indent = 2)
+    os.replace(f'{manifest_path}.tmp', manifest_path)
+
+def run_dag(stages, manifest, manifest_path, workers = None, force = False):
+    '''
+    Executa as etapas assim que as suas dependências terminam, em paralelo quando independentes.
+
+    Args:
+        stages (dict): Etapas retornadas por `build_dag`.
+        manifest (dict): Registros das etapas executadas anteriormente.
+        manifest_path (str): Caminho do manifesto, atualizado a cada etapa concluída.
+        workers (int): Quantidade de etapas executadas em paralelo.
+        force (bool): Executa todas as etapas, mesmo sem alterações.
+
+    Returns:
+        failures (dict): Dicionário de nome da etapa para a mensagem de erro, incluindo as etapas não executadas.
+    '''
+
+    done, failures, running = set(), dict(), dict()
+
+    with ProcessPoolExecutor(max_workers = workers) as executor:
+        while len(done) + len(failures) < len(stages):
+            # Etapas com dependências com falha não são executadas
+            for name, stage in stages.items():
+                if name in done or name in failures or name in running:
+                    continue
+                failed = [dep for dep in stage['deps'] if dep in failures]
+                if failed:
+                    failures[name] = f'dependência com falha: {", ".join(failed)}'
+                    print(f'[{name}] não executada, {failures[name]}')
+                elif all(dep in done for dep in stage['deps']):
+                    running[name] = executor.submit(execute_stage, stage, manifest.get(name), force)
+
+            if not running:
+                continue
+
+            finished, _ = wait(running.values(), return_when = FIRST_COMPLETED)
+            for name in [name for name, future in running.items() if future in finished]:
+                future = running.pop(name)
+                try:
+                    status, entry, details = future.result()
+                except Exception as e:
+                    failures[name] = f'{type(e).__name__}: {e}'
+                    print(f'[{name}] falhou: {failures[name]}')
+                    continue
+
+                done.add(name)
+                manifest[name] = entry
+                write_manifest(manifest_path, manifest)
+                print(f"[{name}] {'reaproveitada' if status == 'skipped' else 'executada'}{f' ({details})' if details else ''}")
+
+    return failures
+
+def main():
+
+    # Obtém os campos de texto com informações de ajuda
+    texts = help_texts()
+    # Adiciona uma descrição do comando
+    parser = argparse.ArgumentParser(texts['text_description'])
+
+    # Define os parâmetros de entrada
+    parser.add_argument('--spec', type = str, help = texts['spec_help'], default = 'cli-commands/etl_spec.yaml')
+    parser.add_argument('--workers', type = int, help = texts['workers_help'], default = None)
+    parser.add_argument('--force', action = 'store_true', help = texts['force_help'])
+    parser.add_argument('--dry_run', action = 'store_true', help = texts['dry_run_help'])
+
+    # Atribuí a args os dados coletados da linhas de comando
+    args = parser.parse_args()
+
+    with open(args.spec, 'r') as file:
+        spec = yaml.safe_load(file)
+
+    stages = build_dag(spec)
+    manifest = read_manifest(spec['manifest'])
+
+    if args.dry_run:
+        for name, stage in stages.items():
+            fresh = not args.force and is_fresh(stage, stage_signature(stage), manifest.get(name))
+            print(f"[{name}] {'reaproveitada' if fresh else 'pendente'} (depende de: {', '.join(stage['deps']) or '-'})")
+        return
+
+    failures = run_dag(stages, manifest, spec['manifest'], workers = args.workers, force = args.force)
+
+    if failures:
+        print(f'ETL concluído com {len(failures)} etapa(s) com falha: {", ".join(failures)}.')
+        # A publicação substitui todas as tabelas de uma vez: ou nenhuma foi alterada, ou todas estão atualizadas
+        if 'publish' in failures:
+            print('As tabelas tratadas não foram alteradas.')
+        else:
+            print(f"As tabelas tratadas foram publicadas em {spec['output_dir']}, mas o cache colunar não foi atualizado; "
+                  'a interface reconstrói o cache das tabelas alteradas no primeiro acesso.')
+        sys.exit(1)
+
+    print(f"ETL concluído, tabelas tratadas em {spec['output_dir']}.")
+
+if __name__ == '__main__':
+    main()
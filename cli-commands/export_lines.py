@@ -0,0 +1,312 @@
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'interface'))
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from line_dataset import make_dataset, utm_dxf_doc
+from elevation import make_elevation_provider
+from data_manipulation import render_data
+from table_cache import table_cache
+from table_store import table_store
+import pandas as pd
+import traceback
+import argparse
+import exports
+import paths
+import json
+import time
+import re
+
+# Formatos de exportação disponíveis e o nome dos arquivos gerados, iguais aos da interface
+file_names = {'csv': '{label}.csv', 'xlsx': '{label}.xlsx', 'kml': '{label}.kml',
+              'dxf': 'utm-{label}.dxf', 'profile': 'profile-{label}.csv'}
+
+# Dados carregados uma única vez em cada processo do pool
+_worker = dict()
+
+def help_texts():
+    '''
+    Textos de ajuda do argparser.
+
+    Chaves de acesso: `text_description`, `config_help`, `dst_path_help`, `lines_help`, `pattern_help`,
+    `formats_help`, `workers_help` e `force_help`.
+
+    Args:
+        None
+
+    Returns:
+        texts (dict): Dicionário com as informações de ajuda de cada parâmetro do argparser.
+    '''
+
+    texts = {
+        'text_description': '(str) Exporta em lote, sem a interface, as tabelas e projetos de todos os conjuntos de linhas.',
+        'config_help': '(str) Caminho do arquivo .yaml de configuração da interface.',
+        'dst_path_help': '(str) Pasta de destino dos arquivos exportados.',
+        'lines_help': '(list) Nomes dos conjuntos de linhas a exportar. Caso não seja informado, exporta todos.',
+        'pattern_help': '(str) Expressão regular para filtrar os nomes dos conjuntos de linhas.',
+        'formats_help': f'(list) Formatos a exportar: {", ".join(file_names)}.',
+        'workers_help': '(int) Quantidade de processos em paralelo.',
+        'force_help': '(bool) Refaz também os conjuntos já exportados com a versão atual dos dados.'
+    }
+
+    return texts
+
+def output_label(label):
+    '''
+    Rótulo usado no nome dos arquivos, sem caracteres de separação de pastas.
+
+    Args:
+        label (str): Nome do conjunto de linhas.
+
+    Returns:
+        label (str): Nome do conjunto de linhas para os arquivos.
+    '''
+
+    return label.replace('/', '')
+
+def line_files(label, formats, dst_path):
+    '''
+    Retorna os caminhos dos arquivos exportados de um conjunto de linhas.
+
+    Args:
+        label (str): Nome do conjunto de linhas.
+        formats (list): Formatos exportados.
+        dst_path (str): Pasta de destino dos arquivos.
+
+    Returns:
+        files (dict): Dicionário de formato para caminho do arquivo.
+    '''
+
+    return {fmt: os.path.join(dst_path, file_names[fmt].format(label = output_label(label))) for fmt in formats}
+
+def write_atomic(path, content):
+    '''
+    Salva um arquivo por meio de um arquivo temporário, para não deixar arquivos incompletos
+    caso a execução seja interrompida.
+
+    Args:
+        path (str): Caminho do arquivo.
+        content (bytes): Conteúdo do arquivo.
+
+    Returns:
+        None
+    '''
+
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as file:
+        file.write(content)
+    os.replace(tmp_path, path)
+
+def init_worker(config_path, workers):
+    '''
+    Carrega as tabelas e os módulos de dados em cada processo do pool.
+
+    Args:
+        config_path (str): Caminho do arquivo .yaml de configuração.
+        workers (int): Quantidade de processos, usada para dividir o limite de requisições da API de altitudes.
+
+    Returns:
+        None
+    '''
+
+    cache = table_cache(cache_dir = paths.return_cache_dir(yaml_file = config_path))
+    store = table_store(index_columns = paths.return_index_columns(yaml_file = config_path), cache = cache)
+
+    # O limite de requisições é por processo, então é dividido entre os processos do pool
+    elevation_config = paths.return_elevation_config(yaml_file = config_path)
+    elevation_config['elevation_api_rate'] = elevation_config['elevation_api_rate'] / workers
+
+    _worker['df_paths'] = paths.return_data_paths(yaml_file = config_path)
+    _worker['columns_names'] = paths.return_columns_ref(yaml_file = config_path)
+    _worker['dxf_tower_attributes'] = paths.return_dxf_tower_attributes(yaml_file = config_path)
+    _worker['data_modules'] = render_data(store = store, elevation = make_elevation_provider(elevation_config))
+    store.preload(_worker['df_paths'])
+
+def export_line(label, formats, dst_path):
+    '''
+    Gera e salva os arquivos de um conjunto de linhas. Executado nos processos do pool.
+
+    Args:
+        label (str): Nome do conjunto de linhas.
+        formats (list): Formatos a exportar.
+        dst_path (str): Pasta de destino dos arquivos.
+
+    Returns:
+        result (dict): Resultado da exportação: `label`, `status` (`ok` ou `error`), `files` arquivos salvos,
+        `integrity` integridade dos dados, `elapsed` tempo em segundos e `error` detalhes do erro.
+    '''
+
+    start = time.perf_counter()
+    result = {'label': label, 'status': 'ok', 'files': dict(), 'integrity': None, 'error': ''}
+
+    try:
+        data_modules = _worker['data_modules']
+        values_towers, coords, values_conexions = data_modules.separate_conj_data(df_paths = _worker['df_paths'],
+                                                                                  columns_names = _worker['columns_names'],
+                                                                                  label = label)
+        dataframe, df_integrity = make_dataset(label, values_towers, values_conexions, coords)
+        result['integrity'] = bool(df_integrity)
+
+        builders = {'csv': lambda: dataframe.to_csv().encode('utf-8'),
+                    'xlsx': lambda: exports.xlsx_bytes(dataframe),
+                    'kml': lambda: exports.kml_bytes(coords, data_modules.span_geometry(values_conexions, coords)),
+                    'dxf': lambda: exports.dxf_bytes(utm_dxf_doc(dataframe, attributes = _worker['dxf_tower_attributes'])),
+                    'profile': lambda: data_modules.longitudinal_profile_csv(dataframe).to_csv().encode('utf-8')}
+
+        for fmt, path in line_files(label, formats, dst_path).items():
+            # Assim como na interface, o perfil longitudinal exige os dados completos
+            if fmt == 'profile' and not df_integrity:
+                continue
+            write_atomic(path, builders[fmt]())
+            result['files'][fmt] = path
+    except Exception as e:
+        result['status'] = 'error'
+        result['error'] = f'{type(e).__name__}: {e}\n{traceback.format_exc()}'
+
+    result['elapsed'] = time.perf_counter() - start
+
+    return result
+
+def read_status(status_path):
+    '''
+    Lê o registro das exportações já concluídas.
+
+    Args:
+        status_path (str): Caminho do arquivo .json de registro.
+
+    Returns:
+        status (dict): Dicionário de conjunto de linhas para o registro da exportação.
+    '''
+
+    try:
+        with open(status_path, 'r') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return dict()
+
+def is_done(entry, version, formats):
+    '''
+    Verifica se um conjunto de linhas já foi exportado com a versão atual dos seus dados.
+
+    Args:
+        entry (dict): Registro da exportação do conjunto, `None` caso não exista.
+        version (str): Versão atual dos dados do conjunto de linhas.
+        formats (list): Formatos solicitados.
+
+    Returns:
+        done (bool): Indica se a exportação pode ser reaproveitada.
+    '''
+
+    if entry is None or entry['status'] != 'ok' or entry['version'] != version:
+        return False
+
+    return set(formats) <= set(entry['formats']) and all(os.path.exists(path) for path in entry['files'].values())
+
+def select_lines(labels, lines = None, pattern = None):
+    '''
+    Filtra os conjuntos de linhas a exportar.
+
+    Args:
+        labels (list): Nomes de todos os conjuntos de linhas.
+        lines (list): Nomes a manter. Caso não seja informado, mantém todos.
+        pattern (str): Expressão regular aplicada aos nomes. Caso não seja informada, mantém todos.
+
+    Returns:
+        labels (list): Nomes dos conjuntos de linhas selecionados.
+    '''
+
+    if lines:
+        unknown = set(lines) - set(labels)
+        if unknown:
+            raise ValueError(f'Conjuntos de linhas não encontrados: {", ".join(sorted(unknown))}.')
+        labels = [label for label in labels if label in set(lines)]
+
+    if pattern:
+        labels = [label for label in labels if re.search(pattern, label)]
+
+    return labels
+
+def main():
+
+    # Obtém os campos de texto com informações de ajuda
+    texts = help_texts()
+    # Adiciona uma descrição do comando
+    parser = argparse.ArgumentParser(texts['text_description'])
+
+    # Define os parâmetros de entrada
+    parser.add_argument('--config', type = str, help = texts['config_help'], default = 'interface/config.yaml')
+    parser.add_argument('--dst_path', type = str, help = texts['dst_path_help'], default = 'out_data')
+    parser.add_argument('--lines', type = str, nargs = '+', help = texts['lines_help'], default = None)
+    parser.add_argument('--pattern', type = str, help = texts['pattern_help'], default = None)
+    parser.add_argument('--formats', type = str, nargs = '+', choices = list(file_names), help = texts['formats_help'],
+                        default = list(file_names))
+    parser.add_argument('--workers', type = int, help = texts['workers_help'], default = os.cpu_count())
+    parser.add_argument('--force', action = 'store_true', help = texts['force_help'])
+
+    # Atribuí a args os dados coletados da linhas de comando
+    args = parser.parse_args()
+
+    df_paths = paths.return_data_paths(yaml_file = args.config)
+    columns_names = paths.return_columns_ref(yaml_file = args.config)
+    cache = table_cache(cache_dir = paths.return_cache_dir(yaml_file = args.config))
+    data_version = cache.data_version(df_paths)
+    line_versions = cache.read_line_versions()
+
+    # Conjuntos de linhas a exportar, descartando os já exportados com a versão atual dos dados
+    labels = render_data(store = table_store()).extract_csv_attributes(csv_path = df_paths['df_path_lines'],
+                                                                      column_name = columns_names['column_name_lines'])
+    try:
+        labels = select_lines(labels, lines = args.lines, pattern = args.pattern)
+    except ValueError as e:
+        parser.error(str(e))
+
+    # Versão de cada conjunto, alterada apenas para os conjuntos afetados por atualizações incrementais
+    lines = pd.read_csv(df_paths['df_path_lines'], dtype = str)
+    line_codes = dict(zip(lines[columns_names['column_name_lines']], lines[columns_names['column_sap_lines']]))
+    versions = {label: cache.line_token(data_version, line_codes.get(label), line_versions) for label in labels}
+
+    os.makedirs(args.dst_path, exist_ok = True)
+    status_path = os.path.join(args.dst_path, 'export_status.json')
+    status = read_status(status_path)
+    pending = [label for label in labels if args.force or not is_done(status.get(label), versions[label], args.formats)]
+
+    print(f'Conjuntos selecionados: {len(labels)}, já exportados: {len(labels) - len(pending)}, pendentes: {len(pending)}.')
+
+    failures = list()
+    workers = max(1, min(args.workers, len(pending)))
+    if pending:
+        with ProcessPoolExecutor(max_workers = workers, initializer = init_worker, initargs = (args.config, workers)) as executor:
+            futures = [executor.submit(export_line, label, args.formats, args.dst_path) for label in pending]
+
+            for done, future in enumerate(as_completed(futures), start = 1):
+                result = future.result()
+                print(f"[{done}/{len(pending)}] {result['label']}: {result['status']} ({result['elapsed']:.1f} s)")
+
+                if result['status'] == 'ok':
+                    # Mantém os formatos exportados anteriormente com a mesma versão dos dados
+                    entry = status.get(result['label'])
+                    version = versions[result['label']]
+                    if entry is None or entry['version'] != version:
+                        entry = {'formats': list(), 'files': dict()}
+                    status[result['label']] = {'status': 'ok', 'version': version,
+                                               'formats': sorted(set(entry['formats']) | set(args.formats)),
+                                               'files': {**entry['files'], **result['files']}, 'integrity': result['integrity']}
+                else:
+                    status.pop(result['label'], None)
+                    failures.append({'label': result['label'], 'error': result['error']})
+
+                # Registro salvo a cada conjunto, permitindo retomar uma execução interrompida
+                write_atomic(status_path, json.dumps(status, indent = 2, ensure_ascii = False).encode('utf-8'))
+
+    # Relatório das falhas por conjunto de linhas
+    failures_path = os.path.join(args.dst_path, 'export_failures.csv')
+    pd.DataFrame(failures, columns = ['label', 'error']).to_csv(failures_path, index = False)
+
+    print(f'Exportação concluída: {len(pending) - len(failures)} com sucesso, {len(failures)} com falha.')
+    if failures:
+        print(f'Relatório de falhas em {failures_path}.')
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
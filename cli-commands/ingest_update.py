@@ -0,0 +1,99 @@
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'interface'))
+
+from table_cache import table_cache
+from bdit_data import data_analysis
+import argparse
+import tempfile
+import paths
+import yaml
+
+# Tabelas com atualização incremental: caminho na configuração da interface e coluna chave padrão
+tables = {'estruturas': {'path_key': 'df_path_towers', 'key': 'COD_ESTRUTURA_SAP'},
+          'vao_linhas': {'path_key': 'df_path_conexions', 'key': 'COD_VAO_SAP'}}
+
+def help_texts():
+    '''
+    Textos de ajuda do argparser.
+
+    Chaves de acesso: `text_description`, `table_help`, `src_path_help`, `key_help`, `spec_help`, `config_help`,
+    `change_log_help` e `dry_run_help`.
+
+    Args:
+        None
+
+    Returns:
+        texts (dict): Dicionário com as informações de ajuda de cada parâmetro do argparser.
+    '''
+
+    texts = {
+        'text_description': '(str) Aplica uma nova exportação do GEO BDIT sobre a tabela tratada, apenas com as alterações.',
+        'table_help': f'(str) Tabela atualizada: {", ".join(tables)}.',
+        'src_path_help': '(str) Caminho do arquivo .csv bruto da nova exportação (separado por `;`).',
+        'key_help': '(str) Coluna chave da comparação. Padrão: COD_ESTRUTURA_SAP para estruturas e COD_VAO_SAP para vãos.',
+        'spec_help': '(str) Especificação do ETL, com o tratamento aplicado à tabela bruta.',
+        'config_help': '(str) Caminho do arquivo .yaml de configuração da interface.',
+        'change_log_help': '(str) Arquivo .csv onde as alterações são registradas.',
+        'dry_run_help': '(bool) Apenas compara as tabelas, sem aplicar as alterações.'
+    }
+
+    return texts
+
+def main():
+
+    # Obtém os campos de texto com informações de ajuda
+    texts = help_texts()
+    # Adiciona uma descrição do comando
+    parser = argparse.ArgumentParser(texts['text_description'])
+
+    # Define os parâmetros de entrada
+    parser.add_argument('--table', type = str, choices = list(tables), help = texts['table_help'], required = True)
+    parser.add_argument('--src_path', type = str, help = texts['src_path_help'], required = True)
+    parser.add_argument('--key', type = str, help = texts['key_help'], default = None)
+    parser.add_argument('--spec', type = str, help = texts['spec_help'], default = 'cli-commands/etl_spec.yaml')
+    parser.add_argument('--config', type = str, help = texts['config_help'], default = 'interface/config.yaml')
+    parser.add_argument('--change_log', type = str, help = texts['change_log_help'], default = 'data/cache/change_log.csv')
+    parser.add_argument('--dry_run', action = 'store_true', help = texts['dry_run_help'])
+
+    # Atribuí a args os dados coletados da linhas de comando
+    args = parser.parse_args()
+
+    with open(args.spec, 'r') as file:
+        options = yaml.safe_load(file)['tables'][args.table]
+
+    df_paths = paths.return_data_paths(yaml_file = args.config)
+    cache = table_cache(cache_dir = paths.return_cache_dir(yaml_file = args.config))
+    current_path = df_paths[tables[args.table]['path_key']]
+    key = args.key or tables[args.table]['key']
+
+    data = data_analysis()
+    handle, new_path = tempfile.mkstemp(suffix = '.csv')
+    os.close(handle)
+
+    try:
+        # Aplica à nova exportação o mesmo tratamento do ETL
+        data.edit_csv_stream(args.src_path, dst_path = new_path, drop_duplicates = options.get('drop_duplicates', False),
+                             dedup_keys = options.get('dedup_keys') or None, drop_columns = options.get('drop_columns'),
+                             sanitize_column_names = options.get('sanitize_column_names', False),
+                             infer_types = options.get('infer_types', False))
+
+        previous_version = cache.data_version(df_paths)
+        summary = data.incremental_update(current_path, new_path, key, change_log_path = args.change_log, apply = not args.dry_run)
+    finally:
+        os.remove(new_path)
+
+    print(f"Inclusões: {summary['inserts']}, alterações: {summary['updates']}, exclusões: {summary['deletes']}.")
+    print(f"Conjuntos de linhas afetados ({len(summary['lines'])}): {', '.join(summary['lines'])}")
+
+    if args.dry_run or summary['changes'].empty:
+        return
+
+    # Apenas os conjuntos de linhas afetados mudam de versão, invalidando os seus resultados e exportações
+    cache.build(current_path)
+    cache.bump_line_versions(previous_version, cache.data_version(df_paths), summary['lines'])
+    print(f'Tabela {current_path} atualizada e alterações registradas em {args.change_log}.')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'interface'))
+
+from export_lines import select_lines, write_atomic
+from line_dataset import make_dataset, utm_dxf_doc
+from data_manipulation import render_data
+from table_cache import table_cache
+from table_store import table_store
+import pandas as pd
+import argparse
+import exports
+import paths
+import time
+
+def help_texts():
+    '''
+    Textos de ajuda do argparser.
+
+    Chaves de acesso: `text_description`, `config_help`, `dst_path_help`, `file_name_help`, `lines_help`,
+    `pattern_help` e `attributes_help`.
+
+    Args:
+        None
+
+    Returns:
+        texts (dict): Dicionário com as informações de ajuda de cada parâmetro do argparser.
+    '''
+
+    texts = {
+        'text_description': '(str) Gera um único projeto .dxf com vários conjuntos de linhas ou toda a rede, um conjunto por camada.',
+        'config_help': '(str) Caminho do arquivo .yaml de configuração da interface.',
+        'dst_path_help': '(str) Pasta de destino do projeto gerado.',
+        'file_name_help': '(str) Nome do arquivo .dxf gerado.',
+        'lines_help': '(list) Nomes dos conjuntos de linhas incluídos. Caso não seja informado, inclui todos.',
+        'pattern_help': '(str) Expressão regular para filtrar os nomes dos conjuntos de linhas.',
+        'attributes_help': '(bool) Inclui os atributos ocultos ID, tipo e altura das estruturas, mesmo que desativados na configuração.'
+    }
+
+    return texts
+
+def main():
+
+    # Obtém os campos de texto com informações de ajuda
+    texts = help_texts()
+    # Adiciona uma descrição do comando
+    parser = argparse.ArgumentParser(texts['text_description'])
+
+    # Define os parâmetros de entrada
+    parser.add_argument('--config', type = str, help = texts['config_help'], default = 'interface/config.yaml')
+    parser.add_argument('--dst_path', type = str, help = texts['dst_path_help'], default = 'out_data')
+    parser.add_argument('--file_name', type = str, help = texts['file_name_help'], default = 'utm-rede.dxf')
+    parser.add_argument('--lines', type = str, nargs = '+', help = texts['lines_help'], default = None)
+    parser.add_argument('--pattern', type = str, help = texts['pattern_help'], default = None)
+    parser.add_argument('--attributes', action = 'store_true', help = texts['attributes_help'])
+
+    # Atribuí a args os dados coletados da linhas de comando
+    args = parser.parse_args()
+
+    df_paths = paths.return_data_paths(yaml_file = args.config)
+    columns_names = paths.return_columns_ref(yaml_file = args.config)
+    cache = table_cache(cache_dir = paths.return_cache_dir(yaml_file = args.config))
+    store = table_store(index_columns = paths.return_index_columns(yaml_file = args.config), cache = cache)
+    attributes = paths.return_dxf_tower_attributes(yaml_file = args.config) or args.attributes
+
+    data_modules = render_data(store = store)
+    labels = data_modules.extract_csv_attributes(csv_path = df_paths['df_path_lines'], column_name = columns_names['column_name_lines'])
+    try:
+        labels = select_lines(labels, lines = args.lines, pattern = args.pattern)
+    except ValueError as e:
+        parser.error(str(e))
+
+    start = time.perf_counter()
+    store.preload(df_paths)
+
+    # Tabela de vãos de cada conjunto, ordenada por conjunto; cada um vira uma camada do projeto
+    tables = list()
+    for label in labels:
+        try:
+            values_towers, coords, values_conexions = data_modules.separate_conj_data(df_paths = df_paths, columns_names = columns_names,
+                                                                                      label = label)
+            dataframe, _ = make_dataset(label, values_towers, values_conexions, coords)
+        except Exception as e:
+            print(f'Erro ao montar a tabela de vãos de {label}: {e}')
+            continue
+        tables.append(dataframe)
+
+    if not tables:
+        print('Nenhum conjunto de linhas encontrado.')
+        sys.exit(1)
+
+    dataset = pd.concat(tables, ignore_index = True)
+    content = exports.dxf_bytes(utm_dxf_doc(dataset, attributes = attributes))
+
+    os.makedirs(args.dst_path, exist_ok = True)
+    path = os.path.join(args.dst_path, args.file_name)
+    write_atomic(path, content)
+
+    print(f'Projeto com {len(tables)} conjuntos e {len(dataset)} vãos salvo em {path} '
+          f'({len(content) / 1e6:.1f} MB, {time.perf_counter() - start:.1f} s).')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,369 @@
+from geo_coords import wgs84_geod
+import pandas as pd
+import numpy as np
+import glob
+import os
+
+# Pontos medidos de cada cabo: prefixo usado na análise -> colunas de latitude, longitude, altitude do terreno
+# e distância vertical do cabo ao solo. `MED` é o meio do vão, `MIN` e `MAX` os pontos de menor e maior distância.
+cable_points = {'MED': ('NUM_ALTITUDE_PTO_MEDIO_VAO', 'NUM_LONGITUDE_PTO_MEDIO_VAO', 'NUM_ALTITUDE_ORT_CB_MED', 'VAL_DISTANCIA_PTO_MEDIO'),
+                'MIN': ('NUM_LATITUDE_PT_MI_VAO', 'NUM_LONGITUDE_PT_MI_VAO', 'NUM_ALTITUDE_ORT_CB_MI', 'VAL_DISTANCIA_PTO_MIN'),
+                'MAX': ('NUM_LATITUDE_PT_MA_VAO', 'NUM_LONGITUDE_PT_MA_VAO', 'NUM_ALTITUDE_ORT_CB_MA', 'VAL_DISTANCIA_PTO_MAX')}
+
+# Colunas de texto e colunas numéricas lidas das tabelas dos cabos (a coluna `NUM_ALTITUDE_PTO_MEDIO_VAO`
+# contém, apesar do nome, a latitude do ponto médio)
+cable_text_columns = ['COD_LT_SAP', 'COD_ESTRUTURA_INI_SAP', 'COD_ESTRUTURA_FIM_SAP']
+cable_numeric_columns = ['COD_ID_CABO', 'NUM_LATITUDE_ESTRUTURA_INI', 'NUM_LONGITUDE_ESTRUTURA_INI', 'NUM_ALTITUDE_ORT_ESTRUTURA_INI',
+                         'NUM_LATITUDE_ESTRUTURA_FIM', 'NUM_LONGITUDE_ESTRUTURA_FIM', 'NUM_ALTITUDE_ORT_ESTRUTURA_FIM'] + \
+                        [column for point in cable_points.values() for column in point]
+
+# Pontos medidos fora do vão, com distância ao solo negativa ou acima deste valor (m) são considerados erros de cadastro
+max_point_distance = 250.0
+max_point_offset = 0.05
+# Ajustes com flecha negativa ou maior que esta fração do vão são descartados como fisicamente impossíveis
+max_sag_ratio = 0.25
+
+def load_cables(cables_dir):
+    '''
+    Carrega as tabelas de cabos por conjunto de linhas (.csv separado por `;`) em uma única tabela tipada.
+
+    Args:
+        cables_dir (str): Pasta com um arquivo .csv por conjunto de linhas.
+
+    Returns:
+        cables (dataframe): Cabos de todos os conjuntos, com as colunas numéricas em `float64`.
+    '''
+
+    dtypes = {**{column: 'str' for column in cable_text_columns}, **{column: 'float64' for column in cable_numeric_columns}}
+
+    frames = list()
+    for file_path in sorted(glob.glob(os.path.join(cables_dir, '*.csv'))):
+        frames.append(pd.read_csv(file_path, sep = ';', encoding = 'utf-8-sig', usecols = list(dtypes), dtype = dtypes))
+
+    if not frames:
+        raise FileNotFoundError(f'Nenhum arquivo .csv de cabos encontrado em {cables_dir}.')
+
+    return pd.concat(frames, ignore_index = True)
+
+def line_voltages(lines, code_column = 'CODIGO_SAP_LT', voltage_column = 'TENSAO_DE_OPERACAO'):
+    '''
+    Extraí a tensão de operação de cada conjunto de linhas, ex.: `230 kv` -> 230.
+
+    Args:
+        lines (dataframe): Tabela dos conjuntos de linhas.
+        code_column (str): Coluna com o código SAP do conjunto.
+        voltage_column (str): Coluna com a tensão de operação.
+
+    Returns:
+        voltages (series): Tensão em kV por código SAP, `nan` quando não informada.
+    '''
+
+    voltages = lines[voltage_column].astype(str).str.extract(r'([\d.,]+)', expand = False)
+    voltages = pd.to_numeric(voltages.str.replace(',', '.'), errors = 'coerce')
+
+    return pd.Series(voltages.to_numpy(), index = lines[code_column].astype(str).to_numpy()).groupby(level = 0).first()
+
+def required_clearance(voltages, clearance_base = 6.0, kv_factor = 0.01):
+    '''
+    Distância mínima do cabo ao solo pela NBR 5422: `a + 0,01 (U / √3 - 50)` para tensões acima de 87 kV.
+
+    Args:
+        voltages (array): Tensões de operação em kV.
+        clearance_base (float): Distância básica `a` em metros, dependente da região atravessada.
+        kv_factor (float): Acréscimo em metros por kV acima de 50 kV fase-terra.
+
+    Returns:
+        clearances (array): Distâncias mínimas em metros.
+    '''
+
+    voltages = np.asarray(voltages, dtype = 'float64')
+    extra = np.where(voltages > 87, kv_factor * (voltages / np.sqrt(3) - 50), 0.0)
+
+    return clearance_base + np.nan_to_num(extra)
+
+def along_span(lat1, lon1, lat2, lon2, latitudes, longitudes):
+    '''
+    Posição relativa de pontos ao longo dos vãos, pela projeção sobre a corda entre as estruturas.
+
+    Args:
+        lat1, lon1, lat2, lon2 (array): Coordenadas das estruturas inicial e final de cada vão.
+        latitudes, longitudes (array): Coordenadas dos pontos, um por vão.
+
+    Returns:
+        positions (array): Posição de cada ponto, 0 na estrutura inicial e 1 na final.
+        lengths (array): Comprimento geodésico de cada vão em metros.
+    '''
+
+    _, _, lengths = wgs84_geod.inv(lon1, lat1, lon2, lat2)
+    _, _, start = wgs84_geod.inv(lon1, lat1, longitudes, latitudes)
+    _, _, end = wgs84_geod.inv(lon2, lat2, longitudes, latitudes)
+
+    with np.errstate(divide = 'ignore', invalid = 'ignore'):
+        positions = (start ** 2 - end ** 2 + lengths ** 2) / (2 * lengths ** 2)
+
+    return positions, lengths
+
+def fit_parabola(positions, altitudes, valid, ground_ini, ground_fim, lengths):
+    '''
+    Ajusta, por mínimos quadrados e para todos os cabos de uma vez, a parábola
+    `z(t) = z_ini (1 - t) + z_fim t - 4 f t (1 - t)` aos pontos medidos do cabo, onde `f` é a flecha no meio do vão.
+    Com três pontos distintos os três parâmetros são ajustados (`completo`). Caso contrário, com ao menos dois
+    pontos distintos, as fixações são supostas na mesma altura sobre o terreno das estruturas (`simetrico`).
+    Flechas negativas ou maiores que `max_sag_ratio` do vão invalidam o ajuste.
+
+    Args:
+        positions (array): Posição relativa dos pontos medidos, `(cabos, pontos)`.
+        altitudes (array): Altitude do cabo nos pontos medidos, `(cabos, pontos)`.
+        valid (array): Pontos válidos, `(cabos, pontos)`.
+        ground_ini (array): Altitude do terreno na estrutura inicial.
+        ground_fim (array): Altitude do terreno na estrutura final.
+        lengths (array): Comprimento dos vãos em metros.
+
+    Returns:
+        z_ini (array): Altitude da fixação na estrutura inicial.
+        z_fim (array): Altitude da fixação na estrutura final.
+        sag (array): Flecha no meio do vão, medida a partir da corda.
+        fit (array): Tipo de ajuste: `completo`, `simetrico` ou `invalido`.
+    '''
+
+    weights = valid.astype('float64')
+    t = np.where(valid, positions, 0.0)
+    z = np.where(valid, altitudes, 0.0)
+    shape = -4 * t * (1 - t)
+
+    # Quantidade de posições distintas (separadas por ao menos 1% do vão) entre os pontos válidos
+    ordered = np.sort(np.where(valid, positions, np.inf), axis = 1)
+    with np.errstate(invalid = 'ignore'):
+        gaps = np.diff(ordered, axis = 1)
+    distinct = np.sum(np.isfinite(ordered), axis = 1) - np.sum(np.isfinite(gaps) & (gaps < 0.01), axis = 1)
+
+    n = len(positions)
+    z_ini, z_fim, sag = np.full(n, np.nan), np.full(n, np.nan), np.full(n, np.nan)
+    fit = np.full(n, 'invalido', dtype = object)
+
+    # Ajuste completo: equações normais `A^T W A x = A^T W z` resolvidas em lote
+    design = np.stack([1 - t, t, shape], axis = 2) * weights[:, :, None]
+    normal = np.einsum('npi,npj->nij', design, design)
+    rhs = np.einsum('npi,np->ni', design, z)
+    full = (distinct >= 3) & (np.abs(np.linalg.det(normal)) > 1e-9)
+    if full.any():
+        solution = np.linalg.solve(normal[full], rhs[full][:, :, None])[:, :, 0]
+        z_ini[full], z_fim[full], sag[full] = solution.T
+        fit[full] = 'completo'
+
+    # Ajuste simétrico: `z - g_ini (1 - t) - g_fim t = h + f (-4 t (1 - t))`, com `h` altura das fixações
+    symmetric = ~full & (distinct >= 2) & np.isfinite(ground_ini) & np.isfinite(ground_fim)
+    if symmetric.any():
+        reduced = z - ground_ini[:, None] * (1 - t) - ground_fim[:, None] * t
+        design = np.stack([np.ones_like(t), shape], axis = 2) * weights[:, :, None]
+        normal = np.einsum('npi,npj->nij', design, design)[symmetric]
+        rhs = np.einsum('npi,np->ni', design, reduced * weights)[symmetric]
+        solvable = np.abs(np.linalg.det(normal)) > 1e-9
+        rows = np.flatnonzero(symmetric)[solvable]
+        solution = np.linalg.solve(normal[solvable], rhs[solvable][:, :, None])[:, :, 0]
+        z_ini[rows] = ground_ini[rows] + solution[:, 0]
+        z_fim[rows] = ground_fim[rows] + solution[:, 0]
+        sag[rows] = solution[:, 1]
+        fit[rows] = 'simetrico'
+
+    # Descarta ajustes fisicamente impossíveis, em geral pontos medidos quase coincidentes
+    with np.errstate(invalid = 'ignore'):
+        implausible = (fit != 'invalido') & ~((sag >= 0) & (sag <= max_sag_ratio * lengths))
+    z_ini[implausible], z_fim[implausible], sag[implausible] = np.nan, np.nan, np.nan
+    fit[implausible] = 'invalido'
+
+    return z_ini, z_fim, sag, fit
+
+def catenary_parameter(lengths, sags, iterations = 30):
+    '''
+    Parâmetro da catenária `C = H / w` com a mesma flecha no meio do vão, `f = C (cosh(L / 2C) - 1)`,
+    resolvido pelo método de Newton a partir da aproximação parabólica `C = L² / 8f`.
+
+    Args:
+        lengths (array): Comprimento dos vãos em metros.
+        sags (array): Flechas no meio do vão em metros.
+        iterations (int): Quantidade de iterações.
+
+    Returns:
+        parameters (array): Parâmetro da catenária em metros, `nan` para flechas não positivas.
+    '''
+
+    lengths = np.asarray(lengths, dtype = 'float64')
+    sags = np.asarray(sags, dtype = 'float64')
+    positive = sags > 0
+
+    with np.errstate(divide = 'ignore', invalid = 'ignore', over = 'ignore'):
+        parameters = np.where(positive, lengths ** 2 / (8 * sags), np.nan)
+        for _ in range(iterations):
+            u = lengths / (2 * parameters)
+            error = parameters * (np.cosh(u) - 1) - sags
+            derivative = np.cosh(u) - 1 - u * np.sinh(u)
+            parameters = parameters - error / derivative
+
+    return np.where(positive & (parameters > 0), parameters, np.nan)
+
+def cable_altitude(positions, lengths, z_ini, z_fim, sags, parameters = None):
+    '''
+    Altitude do cabo em posições relativas do vão, pela parábola ajustada ou, quando o parâmetro da
+    catenária é informado, pela catenária que passa pelas duas fixações.
+
+    Args:
+        positions (array): Posições relativas, `(cabos,)` ou `(cabos, pontos)`.
+        lengths (array): Comprimento dos vãos em metros.
+        z_ini, z_fim (array): Altitudes das fixações.
+        sags (array): Flechas no meio do vão.
+        parameters (array): Parâmetros da catenária. Caso não sejam informados, usa a parábola.
+
+    Returns:
+        altitudes (array): Altitudes do cabo, no formato de `positions`.
+    '''
+
+    positions = np.asarray(positions, dtype = 'float64')
+    expand = (lambda values: values[:, None]) if positions.ndim == 2 else (lambda values: values)
+    z_ini, z_fim, sags, lengths = expand(z_ini), expand(z_fim), expand(sags), expand(lengths)
+
+    altitudes = z_ini * (1 - positions) + z_fim * positions - 4 * sags * positions * (1 - positions)
+    if parameters is None:
+        return altitudes
+
+    # Catenária pelas fixações: vértice em `x0` tal que `z_fim - z_ini = 2C sinh(L / 2C) sinh((L/2 - x0) / C)`
+    parameters = expand(parameters)
+    with np.errstate(divide = 'ignore', invalid = 'ignore', over = 'ignore'):
+        vertex = lengths / 2 - parameters * np.arcsinh((z_fim - z_ini) / (2 * parameters * np.sinh(lengths / (2 * parameters))))
+        x = positions * lengths
+        catenary = z_ini + parameters * (np.cosh((x - vertex) / parameters) - np.cosh(vertex / parameters))
+
+    return np.where(np.isfinite(catenary), catenary, altitudes)
+
+def analyze_cables(cables, voltages = None, model = 'catenary', clearance_base = 6.0, kv_factor = 0.01):
+    '''
+    Calcula, para todos os cabos de uma vez, as fixações, a flecha, a distância ao solo no centro do vão
+    e nos pontos medidos, e sinaliza as distâncias abaixo da mínima exigida.
+
+    Args:
+        cables (dataframe): Cabos retornados por `load_cables`.
+        voltages (series): Tensão em kV por código SAP do conjunto, ver `line_voltages`. Caso não seja informada,
+        usa apenas a distância básica.
+        model (str): Curva do cabo: `catenary` ou `parabola`.
+        clearance_base (float): Distância básica da NBR 5422 em metros.
+        kv_factor (float): Acréscimo da distância mínima por kV.
+
+    Returns:
+        results (dataframe): Uma linha por cabo: `COD_LT_SAP`, `COD_ID_CABO`, `COD_ESTRUTURA_INI_SAP`, `COD_ESTRUTURA_FIM_SAP`,
+        `VAO_M` comprimento do vão, `AJUSTE` tipo de ajuste, `ALT_FIX_INI` e `ALT_FIX_FIM` altitudes das fixações, `FLECHA_M` flecha,
+        `CATENARIA_C_M` parâmetro da catenária, `POS_CABO_MIN` posição relativa do ponto mais baixo do cabo, `ALT_CABO_CENTRO` e
+        `ALT_SOLO_CENTRO` altitudes do cabo e do terreno no centro do vão, `DIST_SOLO_CENTRO` distância ao solo no centro,
+        `DIST_SOLO_MIN` menor distância ao solo entre os pontos medidos e o centro do vão, `DIST_SOLO_MIN_MEDIDA` menor
+        distância cadastrada, `RESIDUO_M` maior diferença entre a curva e os pontos medidos, `DIST_MIN_EXIGIDA` e `VIOLACAO`.
+    '''
+
+    if model not in ('catenary', 'parabola'):
+        raise ValueError(f'Modelo do cabo "{model}" desconhecido.')
+
+    column = lambda name: cables[name].to_numpy(dtype = 'float64')
+    lat1, lon1 = column('NUM_LATITUDE_ESTRUTURA_INI'), column('NUM_LONGITUDE_ESTRUTURA_INI')
+    lat2, lon2 = column('NUM_LATITUDE_ESTRUTURA_FIM'), column('NUM_LONGITUDE_ESTRUTURA_FIM')
+
+    # Pontos medidos: posição relativa, altitude do terreno e distância do cabo ao solo, `(cabos, pontos)`
+    positions, ground, distances = list(), list(), list()
+    for latitude, longitude, altitude, distance in cable_points.values():
+        position, lengths = along_span(lat1, lon1, lat2, lon2, column(latitude), column(longitude))
+        positions.append(position)
+        ground.append(column(altitude))
+        distances.append(column(distance))
+    positions, ground, distances = np.stack(positions, axis = 1), np.stack(ground, axis = 1), np.stack(distances, axis = 1)
+
+    valid = (np.isfinite(positions) & np.isfinite(ground) & np.isfinite(distances) & (lengths > 0)[:, None] &
+             (positions >= -max_point_offset) & (positions <= 1 + max_point_offset) & (distances >= 0) & (distances <= max_point_distance))
+
+    ground_ini, ground_fim = column('NUM_ALTITUDE_ORT_ESTRUTURA_INI'), column('NUM_ALTITUDE_ORT_ESTRUTURA_FIM')
+    z_ini, z_fim, sags, fit = fit_parabola(positions, ground + distances, valid, ground_ini, ground_fim, lengths)
+    parameters = catenary_parameter(lengths, sags)
+    curve_parameters = parameters if model == 'catenary' else None
+
+    # Distâncias ao solo pela curva ajustada, no centro do vão e nos pontos medidos
+    ground_center = np.where(valid[:, 0], ground[:, 0], np.nan)
+    cable_center = cable_altitude(np.full(len(cables), 0.5), lengths, z_ini, z_fim, sags, curve_parameters)
+    modeled = cable_altitude(np.where(valid, positions, 0.5), lengths, z_ini, z_fim, sags, curve_parameters)
+    residuals = np.where(valid, np.abs(modeled - (ground + distances)), np.nan)
+
+    # Ponto mais baixo da parábola, limitado ao vão
+    with np.errstate(divide = 'ignore', invalid = 'ignore'):
+        lowest = np.clip(0.5 + (z_fim - z_ini) / (8 * sags), 0, 1)
+
+    if voltages is None:
+        required = required_clearance(np.full(len(cables), np.nan), clearance_base, kv_factor)
+    else:
+        required = required_clearance(cables['COD_LT_SAP'].map(voltages).to_numpy(dtype = 'float64'), clearance_base, kv_factor)
+
+    # Menor distância ao solo entre os pontos medidos e o centro do vão pela curva ajustada, e maior resíduo do ajuste
+    center_clearance = cable_center - ground_center
+    candidates = np.column_stack([np.where(valid, distances, np.nan), center_clearance])
+    min_clearance = np.where(np.isfinite(candidates), candidates, np.inf).min(axis = 1)
+    measured = np.where(valid, distances, np.inf).min(axis = 1)
+    residual = np.where(np.isfinite(residuals), residuals, -np.inf).max(axis = 1)
+
+    results = cables[['COD_LT_SAP', 'COD_ID_CABO', 'COD_ESTRUTURA_INI_SAP', 'COD_ESTRUTURA_FIM_SAP']].copy()
+    results['COD_ID_CABO'] = results['COD_ID_CABO'].astype('Int64')
+    results['VAO_M'] = lengths
+    results['AJUSTE'] = fit
+    results['ALT_FIX_INI'] = z_ini
+    results['ALT_FIX_FIM'] = z_fim
+    results['FLECHA_M'] = sags
+    results['CATENARIA_C_M'] = parameters
+    results['POS_CABO_MIN'] = lowest
+    results['ALT_CABO_CENTRO'] = cable_center
+    results['ALT_SOLO_CENTRO'] = ground_center
+    results['DIST_SOLO_CENTRO'] = center_clearance
+    results['DIST_SOLO_MIN'] = np.where(np.isfinite(min_clearance), min_clearance, np.nan)
+    results['DIST_SOLO_MIN_MEDIDA'] = np.where(np.isfinite(measured), measured, np.nan)
+    results['RESIDUO_M'] = np.where(np.isfinite(residual), residual, np.nan)
+    results['DIST_MIN_EXIGIDA'] = required
+    results['VIOLACAO'] = (results['DIST_SOLO_MIN'] < required).to_numpy()
+
+    return results
+
+def span_summary(results):
+    '''
+    Agrupa os resultados dos cabos por vão (par de estruturas).
+
+    Args:
+        results (dataframe): Resultados retornados por `analyze_cables`.
+
+    Returns:
+        spans (dataframe): Uma linha por vão: `COD_ESTRUTURA_INI_SAP`, `COD_ESTRUTURA_FIM_SAP`, `CABOS` quantidade de cabos,
+        `FLECHA_MAX_M` maior flecha, `DIST_SOLO_CENTRO_MIN` e `DIST_SOLO_MIN` menores distâncias ao solo,
+        `DIST_MIN_EXIGIDA` e `VIOLACOES` quantidade de cabos abaixo da distância mínima.
+    '''
+
+    spans = results.groupby(['COD_ESTRUTURA_INI_SAP', 'COD_ESTRUTURA_FIM_SAP'], sort = False).agg(
+        CABOS = ('COD_ID_CABO', 'size'), FLECHA_MAX_M = ('FLECHA_M', 'max'), DIST_SOLO_CENTRO_MIN = ('DIST_SOLO_CENTRO', 'min'),
+        DIST_SOLO_MIN = ('DIST_SOLO_MIN', 'min'), DIST_MIN_EXIGIDA = ('DIST_MIN_EXIGIDA', 'max'), VIOLACOES = ('VIOLACAO', 'sum'))
+
+    return spans.reset_index()
+
+def join_spans(df, spans):
+    '''
+    Acrescenta o resumo dos cabos à tabela de vãos de `make_dataset`, pelo par de estruturas do vão
+    em qualquer um dos sentidos.
+
+    Args:
+        df (dataframe): Tabela estruturada do conjunto de linhas (`EST1_SAP`, `EST2_SAP`, ...).
+        spans (dataframe): Resumo por vão retornado por `span_summary`.
+
+    Returns:
+        df (dataframe): Tabela com as colunas do resumo dos cabos, vazias para vãos sem cabos cadastrados.
+    '''
+
+    values = [column for column in spans.columns if column not in ('COD_ESTRUTURA_INI_SAP', 'COD_ESTRUTURA_FIM_SAP')]
+    forward = spans.set_index(['COD_ESTRUTURA_INI_SAP', 'COD_ESTRUTURA_FIM_SAP'])[values]
+    backward = spans.set_index(['COD_ESTRUTURA_FIM_SAP', 'COD_ESTRUTURA_INI_SAP'])[values]
+    backward = backward[~backward.index.isin(forward.index)]
+    lookup = pd.concat([forward, backward])
+    lookup = lookup[~lookup.index.duplicated(keep = 'first')]
+
+    keys = pd.MultiIndex.from_arrays([df['EST1_SAP'], df['EST2_SAP']])
+    joined = lookup.reindex(keys)
+    joined.index = df.index
+
+    return pd.concat([df, joined], axis = 1)
@@ -1,25 +1,30 @@
-from geo_coords import coords_analysis
+from geo_coords import coords_analysis, default_elevation_provider
+from table_store import shared_store
 from math import isnan
 import pandas as pd 
-import time
+import numpy as np
 
 class render_data:
     '''
     Módulos para manipulação de dados para renderização na interface.
     '''
 
-    def __init__(self):
+    def __init__(self, store = None, elevation = None):
         '''
         Construtor da classe.
 
         Args:
-            None
+            store (table_store): Armazenamento das tabelas em memória. Caso não seja informado,
+            utiliza a instância compartilhada pelo processo.
+            elevation (elevation_provider): Fonte das altitudes ortométricas faltantes. Caso não seja 
+            informada, utiliza a fonte configurada em `config.yaml`, com o cache persistente, compartilhada pelo processo.
         
         Returns:
             None
         '''
 
-        pass
+        self.store = store if store is not None else shared_store()
+        self.elevation = elevation if elevation is not None else default_elevation_provider()
     
     def extract_csv_attributes(self, csv_path, column_name):
         '''
@@ -35,7 +40,7 @@ class render_data:
         '''
 
         try:
-            df = pd.read_csv(csv_path)
+            df = self.store.load_table(csv_path)
 
             if column_name not in df.columns:
                 raise ValueError(f'A coluna {column_name} não foi encontrado no arquivo.')
@@ -63,12 +68,7 @@ class render_data:
         '''
 
         try:
-            df = pd.read_csv(csv_path)
-
-            if column_name not in df.columns:
-                raise ValueError(f'A coluna "{column_name}" não foi encontrada no arquivo.')
-            
-            line = df[df[column_name] == search_value]
+            line = self.store.get_rows(csv_path, column_name, search_value)
 
             if line.empty:
                 raise ValueError(f"O valor '{search_value}' não foi encontrado na coluna '{column_name}'.")
@@ -97,12 +97,7 @@ class render_data:
         '''
 
         try:
-            df = pd.read_csv(csv_path)
-            
-            if column_name not in df.columns:
-                raise ValueError(f"A coluna '{column_name}' não foi encontrada no arquivo.")
-            
-            lines = df[df[column_name] == search_value]
+            lines = self.store.get_rows(csv_path, column_name, search_value)
             
             if lines.empty:
                 raise ValueError(f"O valor '{search_value}' não foi encontrado na coluna '{column_name}'.")
@@ -157,6 +152,69 @@ class render_data:
         
         return values_towers, coords, values_conexions
 
+    def span_geometry(self, values_conexions, coords):
+        '''
+        Resolve as coordenadas das extremidades de cada vão e calcula, de uma vez para todos os vãos,
+        as distâncias geodésica e UTM.
+
+        Args:
+            values_conexions (dict): Dicionário com os dados das conexões entre estruturas do conjunto.
+            coords (dict): Informações sobre as torres de transmissão.
+
+        Returns:
+            spans (list): Lista de dicionários por vão: `conexion` dados originais, `coord1` e `coord2` coordenadas
+            (lat, lon) das extremidades, `distance_latlon` distância geodésica, `distance_utm` distância UTM (geodésica
+            quando há mudança de zona) e `is_same_zone` se as extremidades pertencem a uma mesma zona UTM.
+        '''
+
+        geo_conversor = coords_analysis()
+
+        # Coordenadas das estruturas do conjunto para recompor os vãos sem coordenadas
+        towers_latlon = dict()
+        for coord in coords:
+            towers_latlon.setdefault(coord['structure'], (coord['lat'], coord['long']))
+
+        # Seleciona as coordenadas das extremidades de cada vão
+        spans = list()
+        for conexion in values_conexions:
+            coord1 = [conexion['NUM_LATITUDE_ESTRUTURA_INI'], conexion['NUM_LONGITUDE_ESTRUTURA_INI']]
+            coord2 = [conexion['NUM_LATITUDE_ESTRUTURA_FIM'], conexion['NUM_LONGITUDE_ESTRUTURA_FIM']]
+
+            # Caso não tenha as coordenadas dos vãos, recompor os dados pela coordenadas das estruturas
+            is_nan = any(isnan(item) for subcoord in [coord1, coord2] for item in subcoord)
+            if is_nan:
+                coord1 = towers_latlon.get(conexion['COD_ESTRUTURA_INI_SAP'])
+                coord2 = towers_latlon.get(conexion['COD_ESTRUTURA_FIM_SAP'])
+                if coord1 is None or coord2 is None:
+                    print(f"Erro ao renderizar: estrutura do vão {conexion['COD_VAO_SAP']} não encontrada")
+                    continue
+
+            spans.append({'conexion': conexion, 'coord1': coord1, 'coord2': coord2})
+
+        # Calcula as distâncias geodésicas e UTM de todos os vãos de uma vez
+        lat1 = np.array([span['coord1'][0] for span in spans], dtype = 'float64')
+        lon1 = np.array([span['coord1'][1] for span in spans], dtype = 'float64')
+        lat2 = np.array([span['coord2'][0] for span in spans], dtype = 'float64')
+        lon2 = np.array([span['coord2'][1] for span in spans], dtype = 'float64')
+        distances_latlon, same_zone = geo_conversor.geodesic_distance_batch(lat1, lon1, lat2, lon2)
+        utm1_x, utm1_y, _, _ = geo_conversor.get_coords_utm_batch(lat1, lon1)
+        utm2_x, utm2_y, _, _ = geo_conversor.get_coords_utm_batch(lat2, lon2)
+
+        # Adiciona a distância geodésica caso a distância por coordenadas UTM não seja válida
+        distances_utm = np.where(same_zone, np.hypot(utm2_x - utm1_x, utm2_y - utm1_y), distances_latlon)
+
+        valid_spans = list()
+        for span, distance_latlon, is_same_zone, distance_utm in zip(spans, distances_latlon, same_zone, distances_utm):
+            if isnan(distance_latlon):
+                print(f"Erro ao renderizar: coordenadas inválidas no vão {span['conexion']['COD_VAO_SAP']}")
+                continue
+
+            span.update({'distance_latlon': float(distance_latlon), 'distance_utm': float(distance_utm),
+                         'is_same_zone': bool(is_same_zone)})
+            valid_spans.append(span)
+
+        return valid_spans
+
     def compose_alt_ort(self, df):
         '''
         Adiciona altitudes ortométricas no dataframe caso sejam faltantes.
@@ -168,27 +226,31 @@ class render_data:
             df (dataframe): Dataframe com os campos de altitude ortométricas corrigidos.
         '''
 
-        data = coords_analysis()
+        df = df.copy()
 
-        def interate_alt_ort_ini(row):
-            if row['EST1_ALT_ORT'] == 0.0 or isnan(row['EST1_ALT_ORT']) == True:
-                if all([row['EST2_LAT'], row['EST2_LON']]) is not False:
-                    if all([row['EST1_LAT'], row['EST1_LON']]):
-                        time.sleep(1)
-                        row['EST1_ALT_ORT'] = data.get_altitude_ort(latitude = row['EST1_LAT'], longitude = row['EST1_LON'])
-            
-            return row
-        
-        def interate_alt_ort_fin(row):
-            if row['EST2_ALT_ORT'] == 0.0 or isnan(row['EST2_ALT_ORT']) == True:
-                if all([row['EST2_LAT'], row['EST2_LON']]):
-                    time.sleep(1)
-                    row['EST2_ALT_ORT'] = data.get_altitude_ort(latitude = row['EST2_LAT'], longitude = row['EST2_LON'])
-            
-            return row
-    
-        df = df.apply(interate_alt_ort_ini, axis = 1)
-        df = df.apply(interate_alt_ort_fin, axis = 1)
+        # Extremidades EST1 e EST2 com altitudes nulas ou faltantes e coordenadas conhecidas
+        missing = dict()
+        points = list()
+        for i in range(1, 3):
+            altitudes = pd.to_numeric(df[f'EST{i}_ALT_ORT'], errors = 'coerce')
+            latitudes = pd.to_numeric(df[f'EST{i}_LAT'], errors = 'coerce')
+            longitudes = pd.to_numeric(df[f'EST{i}_LON'], errors = 'coerce')
+
+            missing[i] = (altitudes.isna() | (altitudes == 0.0)) & latitudes.notna() & longitudes.notna()
+            points.append(pd.DataFrame({'EST_SAP': df.loc[missing[i], f'EST{i}_SAP'],
+                                        'LAT': latitudes[missing[i]], 'LON': longitudes[missing[i]]}))
+
+        # Estruturas compartilhadas entre vãos consecutivos são consultadas uma única vez
+        towers = pd.concat(points, ignore_index = True).drop_duplicates(subset = 'EST_SAP')
+        if towers.empty:
+            return df
+
+        altitudes = self.elevation.get_altitudes(towers['LAT'].to_numpy(), towers['LON'].to_numpy())
+        altitudes = pd.Series(altitudes, index = towers['EST_SAP'].to_numpy())
+
+        for i in range(1, 3):
+            df[f'EST{i}_ALT_ORT'] = pd.to_numeric(df[f'EST{i}_ALT_ORT'], errors = 'coerce')
+            df.loc[missing[i], f'EST{i}_ALT_ORT'] = df.loc[missing[i], f'EST{i}_SAP'].map(altitudes)
 
         return df
     
@@ -206,6 +268,45 @@ class render_data:
 
         return km
     
+    def profile_points(self, df, start_distance = 0.0, include_start = True):
+        '''
+        Calcula em uma única passada os pontos do perfil longitudinal de vãos ordenados: a estrutura EST2 de cada
+        vão, com a soma cumulativa de `DIS_M`, precedida da estrutura EST1 sempre que o vão inicia um novo segmento
+        (derivações e trechos desconectados concatenados por `reorganize_csv`). A estrutura inicial de um segmento
+        fica na mesma distância cumulativa do fim do segmento anterior.
+
+        Args:
+            df (dataframe): Dataframe ordenado dos vãos com as altitudes já preenchidas.
+            start_distance (float): Distância cumulativa inicial em metros.
+            include_start (bool): Inclui a estrutura EST1 do primeiro vão como primeiro ponto.
+
+        Returns:
+            profile_df (dataframe): Dataframe com os dados do perfil longitudinal.
+            end_distance (float): Distância cumulativa em metros ao final do último vão.
+        '''
+
+        ends = start_distance + np.cumsum(pd.to_numeric(df['DIS_M'], errors = 'coerce').to_numpy(dtype = 'float64'))
+        begins = np.concatenate([[start_distance], ends[:-1]])
+        est1 = df['EST1_SAP'].to_numpy()
+        est2 = df['EST2_SAP'].to_numpy()
+
+        # Um vão inicia um segmento quando não parte da estrutura final do vão anterior
+        starts = np.ones(len(df), dtype = bool)
+        starts[1:] = est1[1:] != est2[:-1]
+        starts[:1] = include_start
+
+        # Pares (EST1, EST2) de cada vão intercalados, mantendo a EST1 apenas nos inícios de segmento
+        keep = np.column_stack([starts, np.ones(len(df), dtype = bool)]).ravel()
+        stations = np.column_stack([est1, est2]).ravel()[keep]
+        altitudes = np.column_stack([pd.to_numeric(df['EST1_ALT_ORT'], errors = 'coerce').to_numpy(dtype = 'float64'),
+                                     pd.to_numeric(df['EST2_ALT_ORT'], errors = 'coerce').to_numpy(dtype = 'float64')]).ravel()[keep]
+        distances = np.column_stack([begins, ends]).ravel()[keep]
+
+        profile_df = pd.DataFrame({'EST_SAP': stations, 'ALT_ORT': altitudes, 'DIS_CUM_KM': self.meters_to_km(distances)})
+        end_distance = ends[-1] if len(ends) else start_distance
+
+        return profile_df, end_distance
+
     def longitudinal_profile_csv(self, df):
         '''
         Organiza um dataframe com os dados para plotagem do perfil longitudinal.
@@ -219,23 +320,38 @@ class render_data:
 
         # Preenche os campos de altitude ortométricas caso seja faltante
         df = self.compose_alt_ort(df)
-        
-        profile_df = pd.DataFrame(columns = ['EST_SAP', 'ALT_ORT', 'DIS_CUM_KM'])
-        sum_distance = 0
-        for index, (_, row) in enumerate(df.iterrows()):
-            if index == 0:
-                new_line = pd.DataFrame({'EST_SAP': [row['EST1_SAP']], 'ALT_ORT': [row['EST1_ALT_ORT']], 'DIS_CUM_KM': [self.meters_to_km(sum_distance)]})
-                profile_df = pd.concat([profile_df, new_line], ignore_index = True)
-                sum_distance += row['DIS_M']
-                new_line = pd.DataFrame({'EST_SAP': [row['EST2_SAP']], 'ALT_ORT': [row['EST2_ALT_ORT']], 'DIS_CUM_KM': [self.meters_to_km(sum_distance)]})
-                profile_df = pd.concat([profile_df, new_line], ignore_index = True)
-            else:
-                sum_distance += row['DIS_M']
-                new_line = pd.DataFrame({'EST_SAP': [row['EST2_SAP']], 'ALT_ORT': [row['EST2_ALT_ORT']], 'DIS_CUM_KM': [self.meters_to_km(sum_distance)]})
-                profile_df = pd.concat([profile_df, new_line], ignore_index = True)
+
+        if df.empty:
+            return pd.DataFrame(columns = ['EST_SAP', 'ALT_ORT', 'DIS_CUM_KM'])
+
+        profile_df, _ = self.profile_points(df)
         
         return profile_df
-    
 
+    def iter_longitudinal_profile(self, chunks):
+        '''
+        Gera os pontos do perfil longitudinal sob demanda, bloco a bloco, para rotas longas ou para
+        várias linhas concatenadas. A distância cumulativa continua entre os blocos e a estrutura inicial
+        de um bloco só é repetida quando ele não continua a partir da última estrutura emitida.
+
+        Args:
+            chunks (iterable): Dataframes ordenados de vãos, ex.: um por linha ou partes de uma linha.
+
+        Returns:
+            point (dict): Ponto do perfil com `EST_SAP`, `ALT_ORT` e `DIS_CUM_KM`, a cada iteração.
+        '''
+
+        distance = 0.0
+        last_station = None
+        for chunk in chunks:
+            if chunk.empty:
+                continue
+
+            # Altitudes faltantes consultadas em lote para o bloco
+            chunk = self.compose_alt_ort(chunk)
+            include_start = chunk['EST1_SAP'].iloc[0] != last_station
 
+            profile_df, distance = self.profile_points(chunk, start_distance = distance, include_start = include_start)
+            last_station = chunk['EST2_SAP'].iloc[-1]
 
+            yield from profile_df.to_dict(orient = 'records')
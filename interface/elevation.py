@@ -0,0 +1,598 @@
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from abc import ABC, abstractmethod
+from profiling import profiler
+import numpy as np
+import threading
+import requests
+import sqlite3
+import math
+import time
+import os
+
+class elevation_provider(ABC):
+    '''
+    Interface das fontes de altitude ortométrica. Cada fonte recebe vetores de coordenadas
+    e retorna um vetor de altitudes, com `nan` para os pontos que não conseguiu resolver.
+    '''
+
+    @abstractmethod
+    def get_altitudes(self, latitudes, longitudes):
+        '''
+        Retorna as altitudes ortométricas de um conjunto de pontos.
+
+        Args:
+            latitudes (array): Coordenadas de latitude.
+            longitudes (array): Coordenadas de longitude.
+
+        Returns:
+            altitudes (array): Altitudes ortométricas em metros, `nan` quando indisponível.
+        '''
+
+class rate_limiter:
+    '''
+    Limitador de requisições por balde de fichas (token bucket), seguro entre threads.
+    '''
+
+    def __init__(self, rate = 1, burst = 1):
+        '''
+        Construtor da classe.
+
+        Args:
+            rate (float): Fichas repostas por segundo, isto é, requisições por segundo permitidas.
+            burst (int): Capacidade do balde, quantidade de requisições permitidas em sequência.
+
+        Returns:
+            None
+        '''
+
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        '''
+        Aguarda até que uma ficha esteja disponível e a consome.
+
+        Args:
+            None
+
+        Returns:
+            None
+        '''
+
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+
+                wait = (1 - self.tokens) / self.rate
+
+            time.sleep(wait)
+
+class opentopodata_provider(elevation_provider):
+    '''
+    Altitudes obtidas na API do opentopodata. Os pontos repetidos são descartados e os demais enviados
+    em lotes de até `batch_size` coordenadas por requisição, respeitando o limite de requisições da API.
+    '''
+
+    def __init__(self, url = 'https://api.opentopodata.org/v1/srtm30m', batch_size = 100, rate = 1, burst = 1,
+                 max_workers = 4, timeout = 30):
+        '''
+        Construtor da classe.
+
+        Args:
+            url (str): Endereço do conjunto de dados da API.
+            batch_size (int): Quantidade máxima de coordenadas por requisição (limite da API pública: 100).
+            rate (float): Requisições por segundo permitidas (limite da API pública: 1).
+            burst (int): Requisições permitidas em sequência antes de aplicar o limite.
+            max_workers (int): Quantidade máxima de requisições simultâneas.
+            timeout (float): Tempo limite de cada requisição em segundos.
+
+        Returns:
+            None
+        '''
+
+        self.url = url
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.limiter = rate_limiter(rate = rate, burst = burst)
+
+    def request_batch(self, latitudes, longitudes):
+        '''
+        Requisita as altitudes de um lote de coordenadas.
+
+        Args:
+            latitudes (array): Coordenadas de latitude do lote.
+            longitudes (array): Coordenadas de longitude do lote.
+
+        Returns:
+            altitudes (list): Altitudes do lote, `nan` quando a API não possui o dado.
+        '''
+
+        locations = '|'.join(f'{latitude},{longitude}' for latitude, longitude in zip(latitudes, longitudes))
+
+        self.limiter.acquire()
+        response = requests.get(self.url, params = {'locations': locations}, timeout = self.timeout)
+        response.raise_for_status()
+        data = response.json()
+
+        return [np.nan if result['elevation'] is None else result['elevation'] for result in data['results']]
+
+    def get_altitudes(self, latitudes, longitudes):
+        '''
+        Retorna as altitudes ortométricas de um conjunto de pontos.
+
+        Args:
+            latitudes (array): Coordenadas de latitude.
+            longitudes (array): Coordenadas de longitude.
+
+        Returns:
+            altitudes (array): Altitudes ortométricas em metros, `nan` quando indisponível.
+        '''
+
+        points = np.column_stack([np.asarray(latitudes, dtype = 'float64'), np.asarray(longitudes, dtype = 'float64')])
+        if len(points) == 0:
+            return np.empty(0)
+
+        # Cada coordenada distinta é requisitada uma única vez
+        unique_points, inverse = np.unique(points, axis = 0, return_inverse = True)
+        chunks = [unique_points[start:start + self.batch_size] for start in range(0, len(unique_points), self.batch_size)]
+        profiler.count('http_calls', len(chunks))
+        profiler.count('http_points', len(unique_points))
+
+        with ThreadPoolExecutor(max_workers = self.max_workers) as executor:
+            results = executor.map(lambda chunk: self.request_batch(chunk[:, 0], chunk[:, 1]), chunks)
+            unique_altitudes = np.concatenate([np.asarray(result, dtype = 'float64') for result in results])
+
+        return unique_altitudes[inverse.reshape(-1)]
+
+class dem_provider(elevation_provider):
+    '''
+    Altitudes amostradas de arquivos SRTM locais (.hgt ou GeoTIFF) com interpolação bilinear.
+    Os arquivos seguem a nomenclatura dos tiles SRTM de 1 grau, ex.: `S20W044.hgt`.
+    '''
+
+    def __init__(self, dem_dir):
+        '''
+        Construtor da classe.
+
+        Args:
+            dem_dir (str): Pasta com os arquivos de elevação.
+
+        Returns:
+            None
+        '''
+
+        self.dem_dir = dem_dir
+        self.tiles = dict()
+
+    def tile_name(self, lat_floor, lon_floor):
+        '''
+        Retorna o nome do tile SRTM que contém o canto sudoeste informado.
+
+        Args:
+            lat_floor (int): Latitude inteira do canto sudoeste.
+            lon_floor (int): Longitude inteira do canto sudoeste.
+
+        Returns:
+            name (str): Nome do tile, ex.: `S20W044`.
+        '''
+
+        lat_ref = f"{'N' if lat_floor >= 0 else 'S'}{abs(lat_floor):02d}"
+        lon_ref = f"{'E' if lon_floor >= 0 else 'W'}{abs(lon_floor):03d}"
+
+        return f'{lat_ref}{lon_ref}'
+
+    def load_tile(self, lat_floor, lon_floor):
+        '''
+        Abre um tile de elevação, mantendo-o em cache. Arquivos .hgt são mapeados em memória; dos GeoTIFF são lidos
+        apenas os metadados, e as amostras são lidas por janela em `sample_tile`.
+
+        Args:
+            lat_floor (int): Latitude inteira do canto sudoeste.
+            lon_floor (int): Longitude inteira do canto sudoeste.
+
+        Returns:
+            tile (dict): Dados do tile: `data` matriz de elevação (.hgt) ou `path` caminho do GeoTIFF, `shape` dimensões
+            da matriz, `top` e `left` coordenadas da primeira amostra, `res_lat` e `res_lon` resolução em graus e
+            `nodata` valor sem dado. `None` caso não exista.
+        '''
+
+        key = (lat_floor, lon_floor)
+        if key in self.tiles:
+            return self.tiles[key]
+
+        name = self.tile_name(lat_floor, lon_floor)
+        hgt_path = os.path.join(self.dem_dir, f'{name}.hgt')
+        tif_path = os.path.join(self.dem_dir, f'{name}.tif')
+
+        tile = None
+        if os.path.exists(hgt_path):
+            # Arquivos .hgt: int16 big-endian, amostras nos vértices da grade de 1 grau
+            size = int(math.sqrt(os.path.getsize(hgt_path) // 2))
+            data = np.memmap(hgt_path, dtype = '>i2', mode = 'r', shape = (size, size))
+            tile = {'data': data, 'shape': data.shape, 'top': lat_floor + 1, 'left': lon_floor,
+                    'res_lat': 1 / (size - 1), 'res_lon': 1 / (size - 1), 'nodata': -32768}
+        elif os.path.exists(tif_path):
+            import rasterio
+
+            with rasterio.open(tif_path) as src:
+                transform = src.transform
+                # Coordenada do centro do primeiro pixel
+                tile = {'path': tif_path, 'shape': src.shape, 'top': transform.f + transform.e / 2, 'left': transform.c + transform.a / 2,
+                        'res_lat': -transform.e, 'res_lon': transform.a, 'nodata': src.nodata}
+
+        self.tiles[key] = tile
+
+        return tile
+
+    def sample_tile(self, tile, latitudes, longitudes):
+        '''
+        Interpola bilinearmente as altitudes de pontos contidos em um tile.
+
+        Args:
+            tile (dict): Tile retornado por `load_tile`.
+            latitudes (array): Coordenadas de latitude.
+            longitudes (array): Coordenadas de longitude.
+
+        Returns:
+            altitudes (array): Altitudes interpoladas, `nan` quando algum vizinho não possui dado.
+        '''
+
+        shape = tile['shape']
+        rows = (tile['top'] - latitudes) / tile['res_lat']
+        cols = (longitudes - tile['left']) / tile['res_lon']
+
+        row0 = np.clip(np.floor(rows).astype('int64'), 0, shape[0] - 2)
+        col0 = np.clip(np.floor(cols).astype('int64'), 0, shape[1] - 2)
+        frac_row = np.clip(rows - row0, 0, 1)
+        frac_col = np.clip(cols - col0, 0, 1)
+
+        if 'data' in tile:
+            data = tile['data']
+        else:
+            import rasterio
+            from rasterio.windows import Window
+
+            # GeoTIFF: lê apenas a janela que contém os pontos e os vizinhos da interpolação
+            row_min, col_min = int(row0.min()), int(col0.min())
+            window = Window(col_min, row_min, int(col0.max()) - col_min + 2, int(row0.max()) - row_min + 2)
+            with rasterio.open(tile['path']) as src:
+                data = src.read(1, window = window)
+            row0, col0 = row0 - row_min, col0 - col_min
+
+        corners = np.stack([data[row0, col0], data[row0, col0 + 1],
+                            data[row0 + 1, col0], data[row0 + 1, col0 + 1]]).astype('float64')
+        if tile['nodata'] is not None:
+            corners[corners == tile['nodata']] = np.nan
+
+        top = corners[0] * (1 - frac_col) + corners[1] * frac_col
+        bottom = corners[2] * (1 - frac_col) + corners[3] * frac_col
+
+        return top * (1 - frac_row) + bottom * frac_row
+
+    def get_altitudes(self, latitudes, longitudes):
+        '''
+        Retorna as altitudes ortométricas de um conjunto de pontos.
+
+        Args:
+            latitudes (array): Coordenadas de latitude.
+            longitudes (array): Coordenadas de longitude.
+
+        Returns:
+            altitudes (array): Altitudes ortométricas em metros, `nan` quando indisponível.
+        '''
+
+        latitudes = np.asarray(latitudes, dtype = 'float64')
+        longitudes = np.asarray(longitudes, dtype = 'float64')
+        altitudes = np.full(latitudes.shape, np.nan)
+
+        valid = np.isfinite(latitudes) & np.isfinite(longitudes)
+        lat_floor = np.zeros(latitudes.shape, dtype = 'int64')
+        lon_floor = np.zeros(latitudes.shape, dtype = 'int64')
+        lat_floor[valid] = np.floor(latitudes[valid])
+        lon_floor[valid] = np.floor(longitudes[valid])
+
+        # Amostra todos os pontos de um mesmo tile de uma vez
+        for lat_key, lon_key in set(zip(lat_floor[valid].tolist(), lon_floor[valid].tolist())):
+            tile = self.load_tile(lat_key, lon_key)
+            if tile is None:
+                continue
+            mask = valid & (lat_floor == lat_key) & (lon_floor == lon_key)
+            altitudes[mask] = self.sample_tile(tile, latitudes[mask], longitudes[mask])
+
+        return altitudes
+
+class chained_provider(elevation_provider):
+    '''
+    Consulta as fontes em ordem, enviando para a próxima apenas os pontos ainda sem altitude.
+    '''
+
+    def __init__(self, providers):
+        '''
+        Construtor da classe.
+
+        Args:
+            providers (list): Fontes de altitude em ordem de prioridade.
+
+        Returns:
+            None
+        '''
+
+        self.providers = list(providers)
+
+    def get_altitudes(self, latitudes, longitudes):
+        '''
+        Retorna as altitudes ortométricas de um conjunto de pontos.
+
+        Args:
+            latitudes (array): Coordenadas de latitude.
+            longitudes (array): Coordenadas de longitude.
+
+        Returns:
+            altitudes (array): Altitudes ortométricas em metros, `nan` quando indisponível.
+        '''
+
+        latitudes = np.asarray(latitudes, dtype = 'float64')
+        longitudes = np.asarray(longitudes, dtype = 'float64')
+        altitudes = np.full(latitudes.shape, np.nan)
+
+        for provider in self.providers:
+            missing = np.isnan(altitudes)
+            if not missing.any():
+                break
+            altitudes[missing] = provider.get_altitudes(latitudes[missing], longitudes[missing])
+
+        return altitudes
+
+class elevation_cache:
+    '''
+    Cache persistente (SQLite) de altitudes indexado por coordenadas quantizadas na resolução do DEM,
+    com limite de tamanho e descarte dos pontos menos usados recentemente (LRU).
+    '''
+
+    def __init__(self, db_path, resolution = 1 / 3600, max_entries = 1000000):
+        '''
+        Construtor da classe.
+
+        Args:
+            db_path (str): Caminho do arquivo SQLite do cache.
+            resolution (float): Resolução em graus usada na quantização das coordenadas (`default = 1 segundo de arco`).
+            max_entries (int): Quantidade máxima de pontos mantidos no cache.
+
+        Returns:
+            None
+        '''
+
+        self.db_path = db_path
+        self.resolution = resolution
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+        folder = os.path.dirname(db_path)
+        if folder:
+            os.makedirs(folder, exist_ok = True)
+
+        with closing(self.connect()) as connection, connection:
+            connection.execute('''CREATE TABLE IF NOT EXISTS altitudes (
+                                  lat_key INTEGER, lon_key INTEGER, altitude REAL, last_access REAL,
+                                  PRIMARY KEY (lat_key, lon_key)) WITHOUT ROWID''')
+            connection.execute('CREATE INDEX IF NOT EXISTS idx_last_access ON altitudes (last_access)')
+            # Quantidade de pontos salvos, atualizada a cada escrita sem contar a tabela inteira
+            self.entries = connection.execute('SELECT COUNT(*) FROM altitudes').fetchone()[0]
+
+    def connect(self):
+        '''
+        Abre uma conexão com o arquivo do cache. Usada com `closing` para fechar a conexão e como contexto
+        da transação, confirmada ao final ou desfeita em caso de erro.
+
+        Args:
+            None
+
+        Returns:
+            connection (Connection): Conexão do SQLite.
+        '''
+
+        return sqlite3.connect(self.db_path, timeout = 30)
+
+    def quantize(self, latitudes, longitudes):
+        '''
+        Converte as coordenadas para as chaves inteiras do cache.
+
+        Args:
+            latitudes (array): Coordenadas de latitude.
+            longitudes (array): Coordenadas de longitude.
+
+        Returns:
+            keys (list): Lista de tuplas `(lat_key, lon_key)`.
+        '''
+
+        lat_keys = np.round(np.asarray(latitudes, dtype = 'float64') / self.resolution).astype('int64')
+        lon_keys = np.round(np.asarray(longitudes, dtype = 'float64') / self.resolution).astype('int64')
+
+        return list(zip(lat_keys.tolist(), lon_keys.tolist()))
+
+    def get(self, latitudes, longitudes, chunk_size = 400):
+        '''
+        Busca as altitudes salvas no cache e atualiza o último acesso dos pontos encontrados.
+
+        Args:
+            latitudes (array): Coordenadas de latitude.
+            longitudes (array): Coordenadas de longitude.
+            chunk_size (int): Quantidade de pontos por consulta ao SQLite.
+
+        Returns:
+            altitudes (array): Altitudes encontradas, `nan` para os pontos fora do cache.
+        '''
+
+        keys = self.quantize(latitudes, longitudes)
+        found = dict()
+
+        with self.lock, closing(self.connect()) as connection, connection:
+            for start in range(0, len(keys), chunk_size):
+                chunk = list(set(keys[start:start + chunk_size]))
+                values = ','.join(['(?, ?)'] * len(chunk))
+                params = [item for key in chunk for item in key]
+                rows = connection.execute(f'SELECT lat_key, lon_key, altitude FROM altitudes WHERE (lat_key, lon_key) IN (VALUES {values})', params)
+                for lat_key, lon_key, altitude in rows:
+                    found[(lat_key, lon_key)] = altitude
+
+            connection.executemany('UPDATE altitudes SET last_access = ? WHERE lat_key = ? AND lon_key = ?',
+                                   [(time.time(), *key) for key in found])
+
+        altitudes = np.array([found.get(key, np.nan) for key in keys], dtype = 'float64')
+        hits = int(np.count_nonzero(~np.isnan(altitudes)))
+        self.hits += hits
+        self.misses += len(keys) - hits
+
+        return altitudes
+
+    def put(self, latitudes, longitudes, altitudes):
+        '''
+        Salva as altitudes no cache, ignorando valores faltantes, e descarta os pontos excedentes.
+
+        Args:
+            latitudes (array): Coordenadas de latitude.
+            longitudes (array): Coordenadas de longitude.
+            altitudes (array): Altitudes ortométricas dos pontos.
+
+        Returns:
+            None
+        '''
+
+        now = time.time()
+        rows = [(*key, float(altitude), now) for key, altitude in zip(self.quantize(latitudes, longitudes), altitudes)
+                if not np.isnan(altitude)]
+
+        if not rows:
+            return
+
+        with self.lock, closing(self.connect()) as connection, connection:
+            changes = connection.total_changes
+            connection.executemany('INSERT OR REPLACE INTO altitudes VALUES (?, ?, ?, ?)', rows)
+
+            # As substituições também contam como alterações, então a estimativa só cresce; a contagem exata
+            # e o descarte dos pontos acessados há mais tempo são feitos apenas quando ela passa do limite
+            self.entries += connection.total_changes - changes
+            if self.entries > self.max_entries:
+                entries = connection.execute('SELECT COUNT(*) FROM altitudes').fetchone()[0]
+                if entries > self.max_entries:
+                    connection.execute('''DELETE FROM altitudes WHERE (lat_key, lon_key) IN (
+                                          SELECT lat_key, lon_key FROM altitudes ORDER BY last_access LIMIT ?)''',
+                                       (entries - self.max_entries,))
+                    entries = self.max_entries
+                self.entries = entries
+
+    def stats(self):
+        '''
+        Retorna os contadores de uso do cache.
+
+        Args:
+            None
+
+        Returns:
+            stats (dict): Dicionário com `hits`, `misses` e `entries` (pontos salvos).
+        '''
+
+        with self.lock, closing(self.connect()) as connection:
+            entries = connection.execute('SELECT COUNT(*) FROM altitudes').fetchone()[0]
+        self.entries = entries
+
+        return {'hits': self.hits, 'misses': self.misses, 'entries': entries}
+
+class cached_provider(elevation_provider):
+    '''
+    Consulta o cache persistente antes da fonte de altitudes e salva os novos resultados.
+    '''
+
+    def __init__(self, provider, cache):
+        '''
+        Construtor da classe.
+
+        Args:
+            provider (elevation_provider): Fonte consultada para os pontos fora do cache.
+            cache (elevation_cache): Cache persistente das altitudes.
+
+        Returns:
+            None
+        '''
+
+        self.provider = provider
+        self.cache = cache
+
+    def get_altitudes(self, latitudes, longitudes):
+        '''
+        Retorna as altitudes ortométricas de um conjunto de pontos.
+
+        Args:
+            latitudes (array): Coordenadas de latitude.
+            longitudes (array): Coordenadas de longitude.
+
+        Returns:
+            altitudes (array): Altitudes ortométricas em metros, `nan` quando indisponível.
+        '''
+
+        latitudes = np.asarray(latitudes, dtype = 'float64')
+        longitudes = np.asarray(longitudes, dtype = 'float64')
+
+        valid = np.isfinite(latitudes) & np.isfinite(longitudes)
+        altitudes = np.full(latitudes.shape, np.nan)
+        if valid.any():
+            altitudes[valid] = self.cache.get(latitudes[valid], longitudes[valid])
+
+        missing = np.isnan(altitudes)
+        if missing.any():
+            altitudes[missing] = self.provider.get_altitudes(latitudes[missing], longitudes[missing])
+            self.cache.put(latitudes[missing & valid], longitudes[missing & valid], altitudes[missing & valid])
+
+        return altitudes
+
+def make_elevation_provider(config):
+    '''
+    Monta a fonte de altitudes a partir das configurações do arquivo .yaml.
+
+    Args:
+        config (dict): Configurações de elevação: `elevation_providers` lista com as fontes em ordem
+        (`dem` ou `opentopodata`), `dem_dir` pasta dos arquivos SRTM, `elevation_api_url` endereço da API,
+        `elevation_api_batch_size`, `elevation_api_rate` e `elevation_api_max_workers` coordenadas por requisição,
+        requisições por segundo e requisições simultâneas da API,
+        `elevation_cache_path` arquivo do cache persistente (opcional), `elevation_cache_resolution` resolução
+        da quantização em segundos de arco e `elevation_cache_max_entries` limite de pontos do cache.
+
+    Returns:
+        provider (elevation_provider): Fonte de altitudes configurada.
+    '''
+
+    providers = list()
+    for name in config.get('elevation_providers', ['opentopodata']):
+        if name == 'dem':
+            providers.append(dem_provider(dem_dir = config['dem_dir']))
+        elif name == 'opentopodata':
+            providers.append(opentopodata_provider(url = config['elevation_api_url'],
+                                                   batch_size = config.get('elevation_api_batch_size', 100),
+                                                   rate = config.get('elevation_api_rate', 1),
+                                                   max_workers = config.get('elevation_api_max_workers', 4)))
+        else:
+            raise ValueError(f'Fonte de altitude "{name}" desconhecida.')
+
+    provider = providers[0] if len(providers) == 1 else chained_provider(providers)
+
+    # Todas as fontes passam a consultar o cache persistente primeiro
+    if config.get('elevation_cache_path'):
+        cache = elevation_cache(db_path = config['elevation_cache_path'],
+                                resolution = config.get('elevation_cache_resolution', 1) / 3600,
+                                max_entries = config.get('elevation_cache_max_entries', 1000000))
+        provider = cached_provider(provider, cache)
+
+    return provider
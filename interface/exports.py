@@ -0,0 +1,145 @@
+from line_cache import line_cache
+from profiling import profiler
+import simplekml
+import io
+import os
+
+# Arquivos gerados sob demanda, reaproveitados por (rótulo, versão dos dados, formato)
+export_cache = line_cache(max_entries = 48)
+
+def cached_export(key, build, save_path = None):
+    '''
+    Retorna o conteúdo de um arquivo de exportação, gerando-o em memória apenas na primeira solicitação.
+
+    Args:
+        key (tuple): Chave do arquivo, ex.: `(rótulo da linha, versão dos dados, formato)`.
+        build (function): Função sem argumentos que gera o conteúdo do arquivo em bytes.
+        save_path (str): Caminho para salvar também o arquivo em disco. Caso não seja informado, não salva.
+
+    Returns:
+        content (bytes): Conteúdo do arquivo.
+    '''
+
+    def build_counted():
+        content = build()
+        profiler.count('export_bytes', len(content))
+
+        return content
+
+    content = export_cache.get_or_compute(key, build_counted)
+
+    if save_path is not None:
+        folder = os.path.dirname(save_path)
+        if folder:
+            os.makedirs(folder, exist_ok = True)
+        with open(save_path, 'wb') as file:
+            file.write(content)
+        profiler.count('bytes_written', len(content))
+
+    return content
+
+def tower_popup(coord):
+    '''
+    Texto com as informações de uma estrutura, usado no mapa e no projeto .kml.
+
+    Args:
+        coord (dict): Informações da estrutura.
+
+    Returns:
+        popup_text (str): Texto em html com as informações da estrutura.
+    '''
+
+    popup_text = f'''
+    <b>Cod. Torre</b>: {coord['structure']}<br>
+    <b>ID</b>: {coord['num_id']}<br>
+    <b>Tipo</b>: {coord['est_type']}<br>
+    <b>Altura</b>: {coord['val_alt']} <br>
+    <b>Caracter. 1</b>: {coord['character1']}<br>
+    <b>Caracter. 2</b>:  {coord['character2']}<br>
+    <b>Alt. Ortométrica</b>: {coord['alt_ort']}
+    '''
+
+    return popup_text
+
+def span_popup(span):
+    '''
+    Texto com as distâncias de um vão, usado no mapa e no projeto .kml.
+
+    Args:
+        span (dict): Vão retornado por `render_data.span_geometry`.
+
+    Returns:
+        popup_text (str): Texto em html com as distâncias do vão.
+    '''
+
+    conexion = span['conexion']
+    popup_text = f'''
+    <b>{conexion['COD_ESTRUTURA_INI_SAP']}</b> e <b>{conexion['COD_ESTRUTURA_FIM_SAP']}</b><br>
+    <b>Dist. Geodésica</b>: {round(span['distance_latlon'], 2)} m<br>
+    <b>Dist. UTM</b>: {round(span['distance_utm'], 2)} m
+    '''
+
+    return popup_text
+
+def kml_bytes(coords, spans):
+    '''
+    Gera o projeto .kml das estruturas e vãos de um conjunto de linhas.
+
+    Args:
+        coords (dict): Informações sobre as torres de transmissão.
+        spans (list): Vãos retornados por `render_data.span_geometry`.
+
+    Returns:
+        content (bytes): Conteúdo do arquivo .kml.
+    '''
+
+    kml = simplekml.Kml()
+
+    for coord in coords:
+        pnt = kml.newpoint(name = coord['num_id'], coords = [(coord['long'], coord['lat'])])  # KML usa (lon, lat)
+        pnt.description = tower_popup(coord)
+
+    for span in spans:
+        coord1, coord2 = span['coord1'], span['coord2']
+        line = kml.newlinestring(
+            coords=[
+                (coord1[1], coord1[0]),  # KML usa (lon, lat)
+                (coord2[1], coord2[0]),
+            ]
+        )
+        line.name = f"{span['conexion']['COD_ESTRUTURA_INI_SAP']} | {span['conexion']['COD_ESTRUTURA_FIM_SAP']}"
+        line.description = span_popup(span)
+
+    return kml.kml().encode('utf-8')
+
+def xlsx_bytes(df):
+    '''
+    Gera o arquivo .xlsx de um dataframe em memória.
+
+    Args:
+        df (dataframe): Dataframe a ser exportado.
+
+    Returns:
+        content (bytes): Conteúdo do arquivo .xlsx.
+    '''
+
+    buffer = io.BytesIO()
+    df.to_excel(buffer, index = False)
+
+    return buffer.getvalue()
+
+def dxf_bytes(doc):
+    '''
+    Serializa um projeto do ezdxf em memória.
+
+    Args:
+        doc (Drawing): Projeto .dxf do ezdxf.
+
+    Returns:
+        content (bytes): Conteúdo do arquivo .dxf.
+    '''
+
+    stream = io.StringIO()
+    doc.write(stream)
+
+    return stream.getvalue().encode(doc.output_encoding)
@@ -1,8 +1,61 @@
-from pyproj import Transformer, CRS
-from geopy.distance import geodesic
-import requests
+from pyproj import Transformer, CRS, Geod
+from elevation import make_elevation_provider, dem_provider
+from functools import lru_cache
+import numpy as np
+import paths
 import math
 
+# Elipsoide WGS-84 usado no cálculo das distâncias geodésicas
+wgs84_geod = Geod(ellps = 'WGS84')
+
+@lru_cache(maxsize = None)
+def utm_transformer(zone, south, default_crs = 'EPSG:4326'):
+    '''
+    Retorna o transformador para uma zona UTM, construído uma única vez por processo.
+
+    Args:
+        zone (int): Zona UTM de destino.
+        south (bool): Indica se a zona está no hemisfério sul.
+        default_crs (str): O CRS padrão para latitude e longitude em graus (`default = EPSG:4326`).
+
+    Returns:
+        transformer (Transformer): Transformador de coordenadas do pyproj.
+    '''
+
+    hemisphere = '+south' if south else ''
+    utm_crs = CRS.from_user_input(f"+proj=utm +zone={zone} {hemisphere}")
+
+    return Transformer.from_crs(default_crs, utm_crs, always_xy=True)
+
+@lru_cache(maxsize = None)
+def default_elevation_provider(yaml_file = 'interface/config.yaml'):
+    '''
+    Retorna a fonte de altitudes configurada no arquivo .yaml, com o cache persistente, construída uma única vez por processo.
+
+    Args:
+        yaml_file (str): Caminho do arquivo .yaml de configuração da interface.
+
+    Returns:
+        provider (elevation_provider): Fonte de altitudes configurada.
+    '''
+
+    return make_elevation_provider(paths.return_elevation_config(yaml_file = yaml_file))
+
+@lru_cache(maxsize = None)
+def default_terrain_provider(yaml_file = 'interface/config.yaml'):
+    '''
+    Retorna a fonte de altitudes do terreno apenas do DEM local configurado no arquivo .yaml, sem consultas à API,
+    construída uma única vez por processo para que os tiles carregados sejam reaproveitados.
+
+    Args:
+        yaml_file (str): Caminho do arquivo .yaml de configuração da interface.
+
+    Returns:
+        provider (dem_provider): Fonte de altitudes do DEM local.
+    '''
+
+    return dem_provider(dem_dir = paths.return_elevation_config(yaml_file = yaml_file)['dem_dir'])
+
 class coords_analysis:
     '''
     Classe de manipulação de coordenadas geoespaciais.
@@ -53,12 +106,69 @@ class coords_analysis:
             utm_y (float): Retorna a coordenada cartesiana y em UTM.
         '''
 
-        utm_crs = self.get_utm_zone(latitude = latitude, longitude = longitude)
-        transformer = Transformer.from_crs(default_crs, utm_crs, always_xy=True)
+        zone = int((longitude + 180) / 6) + 1
+        transformer = utm_transformer(zone, bool(latitude < 0), default_crs)
         utm_x, utm_y = transformer.transform(longitude, latitude)
 
         return utm_x, utm_y
 
+    def get_utm_zones(self, latitudes, longitudes):
+        '''
+        Retorna as zonas UTM e os hemisférios de um conjunto de coordenadas.
+
+        Args:
+            latitudes (array): Coordenadas de latitude.
+            longitudes (array): Coordenadas de longitude.
+
+        Returns:
+            zones (array): Zonas UTM de cada ponto, `0` quando a coordenada é inválida.
+            south (array): Indica se cada ponto está no hemisfério sul.
+        '''
+
+        latitudes = np.asarray(latitudes, dtype = 'float64')
+        longitudes = np.asarray(longitudes, dtype = 'float64')
+
+        valid = np.isfinite(latitudes) & np.isfinite(longitudes) & (np.abs(longitudes) <= 180)
+        zones = np.zeros(latitudes.shape, dtype = 'int64')
+        zones[valid] = np.minimum((longitudes[valid] + 180) // 6 + 1, 60).astype('int64')
+        south = np.zeros(latitudes.shape, dtype = bool)
+        south[valid] = latitudes[valid] < 0
+
+        return zones, south
+
+    def get_coords_utm_batch(self, latitudes, longitudes, default_crs = 'EPSG:4326'):
+        '''
+        Obtenção das coordenadas UTM de um conjunto de pontos. Os pontos são agrupados por zona e 
+        hemisfério e cada grupo é projetado em uma única chamada do transformador.
+
+        Args:
+            latitudes (array): Coordenadas de latitude.
+            longitudes (array): Coordenadas de longitude.
+            default_crs (str): O CRS padrão para latitude e longitude em graus (`default = EPSG:4326`).
+
+        Returns:
+            utm_x (array): Coordenadas cartesianas x em UTM, `nan` para coordenadas inválidas.
+            utm_y (array): Coordenadas cartesianas y em UTM, `nan` para coordenadas inválidas.
+            zones (array): Zonas UTM de cada ponto, `0` quando a coordenada é inválida.
+            south (array): Indica se cada ponto está no hemisfério sul.
+        '''
+
+        latitudes = np.asarray(latitudes, dtype = 'float64')
+        longitudes = np.asarray(longitudes, dtype = 'float64')
+        zones, south = self.get_utm_zones(latitudes, longitudes)
+
+        utm_x = np.full(latitudes.shape, np.nan)
+        utm_y = np.full(latitudes.shape, np.nan)
+
+        # Uma transformação vetorizada por combinação de zona e hemisfério
+        keys = zones * 2 + south
+        for key in np.unique(keys[zones > 0]):
+            mask = keys == key
+            transformer = utm_transformer(int(key // 2), bool(key % 2), default_crs)
+            utm_x[mask], utm_y[mask] = transformer.transform(longitudes[mask], latitudes[mask])
+
+        return utm_x, utm_y, zones, south
+
     def utm_to_latlon(self, utm_x, utm_y, zone, hemisphere):
         '''
         Converte coordenadas UTM para coordenadas de latitude e longitude.
@@ -88,20 +198,47 @@ class coords_analysis:
         Args:
             coords1 (list): Coordenada (lat, lon) do primeiro ponto.
             coords2 (list): Coordenada (lat, lon) do segundo ponto.
-            is_same_zone (bool): Indica se os pontos pertencem a uma mesma zona UTM.
         
         returns:
             distance (float): Distância em metros dos dois pontos.
+            is_same_zone (bool): Indica se os pontos pertencem a uma mesma zona UTM.
         '''
 
-        distance = geodesic(coords1, coords2).meters
-        
-        zone1 = self.get_utm_zone(latitude = coords1[0], longitude = coords1[1])
-        zone2 = self.get_utm_zone(latitude = coords2[0], longitude = coords2[1])
+        distances, same_zone = self.geodesic_distance_batch([coords1[0]], [coords1[1]], [coords2[0]], [coords2[1]])
+
+        return float(distances[0]), bool(same_zone[0])
+
+    def geodesic_distance_batch(self, latitudes1, longitudes1, latitudes2, longitudes2):
+        '''
+        Obtém as distâncias geodésicas em metros de vários pares de pontos em uma única chamada.
 
-        is_same_zone = zone1 == zone2
+        Args:
+            latitudes1 (array): Latitudes do primeiro ponto de cada par.
+            longitudes1 (array): Longitudes do primeiro ponto de cada par.
+            latitudes2 (array): Latitudes do segundo ponto de cada par.
+            longitudes2 (array): Longitudes do segundo ponto de cada par.
+
+        Returns:
+            distances (array): Distâncias em metros de cada par, `nan` para coordenadas inválidas.
+            same_zone (array): Indica se os pontos de cada par pertencem a uma mesma zona UTM.
+        '''
 
-        return distance, is_same_zone
+        latitudes1 = np.asarray(latitudes1, dtype = 'float64')
+        longitudes1 = np.asarray(longitudes1, dtype = 'float64')
+        latitudes2 = np.asarray(latitudes2, dtype = 'float64')
+        longitudes2 = np.asarray(longitudes2, dtype = 'float64')
+
+        _, _, distances = wgs84_geod.inv(longitudes1, latitudes1, longitudes2, latitudes2)
+        distances = np.asarray(distances, dtype = 'float64')
+
+        zones1, south1 = self.get_utm_zones(latitudes1, longitudes1)
+        zones2, south2 = self.get_utm_zones(latitudes2, longitudes2)
+        same_zone = (zones1 > 0) & (zones1 == zones2) & (south1 == south2)
+
+        # Pares com coordenadas inválidas não possuem distância
+        distances[(zones1 == 0) | (zones2 == 0)] = np.nan
+
+        return distances, same_zone
     
     def utm_distance_same_zone(self, coords1, coords2):
         '''
@@ -120,23 +257,23 @@ class coords_analysis:
 
         return math.sqrt((x2 - x1)**2 + (y2 - y1)**2)
     
-    def get_altitude_ort(self, latitude, longitude):
+    def get_altitude_ort(self, latitude, longitude, provider = None):
         '''
         Retorna a altitude ortométrica baseado em coordenadas de latitude e longitude.
 
         Args:
             latitude (float): Coordenada precisa da latitude.
             longitude (float): Coordenada precisa da longitude.
+            provider (elevation_provider): Fonte das altitudes. Caso não seja informada, usa as fontes da configuração,
+            que consultam primeiro o cache persistente.
         
         Returns:
             altitude (float): Altitude ortométrica para a coordenada de referência.
         '''
-      
-        url = f"https://api.opentopodata.org/v1/srtm30m?locations={latitude},{longitude}"
-        response = requests.get(url)
-        data = response.json()
-        altitude = data['results'][0]['elevation']
-        
-        return altitude
 
-    
\ No newline at end of file
+        if provider is None:
+            provider = default_elevation_provider()
+
+        altitude = provider.get_altitudes([latitude], [longitude])[0]
+        
+        return float(altitude)
@@ -0,0 +1,110 @@
+from collections import OrderedDict
+import threading
+
+class line_cache:
+    '''
+    Memoização dos resultados calculados por conjunto de linhas, com limite de tamanho (LRU).
+    Independente do Streamlit, pode ser usada também pelos comandos de linha de comando.
+    '''
+
+    def __init__(self, max_entries = 16):
+        '''
+        Construtor da classe.
+
+        Args:
+            max_entries (int): Quantidade máxima de resultados mantidos em memória.
+
+        Returns:
+            None
+        '''
+
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get_or_compute(self, key, compute):
+        '''
+        Retorna o resultado salvo para a chave ou o calcula e salva caso não exista.
+
+        Args:
+            key (tuple): Chave do resultado, ex.: `(rótulo da linha, versão dos dados)`.
+            compute (function): Função sem argumentos que calcula o resultado.
+
+        Returns:
+            result (object): Resultado salvo ou recém calculado.
+        '''
+
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+            self.misses += 1
+
+        # O cálculo é feito fora da trava para não bloquear as outras sessões
+        result = compute()
+
+        with self.lock:
+            self.entries[key] = result
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last = False)
+
+        return result
+
+    def invalidate(self, label = None):
+        '''
+        Descarta os resultados salvos.
+
+        Args:
+            label (str): Rótulo da linha a ser descartada. Caso não seja informado, descarta todos os resultados.
+
+        Returns:
+            None
+        '''
+
+        with self.lock:
+            if label is None:
+                self.entries.clear()
+            else:
+                for key in [key for key in self.entries if key[0] == label]:
+                    del self.entries[key]
+
+    def __len__(self):
+        '''
+        Retorna a quantidade de resultados salvos.
+
+        Args:
+            None
+
+        Returns:
+            entries (int): Quantidade de resultados em memória.
+        '''
+
+        return len(self.entries)
+
+# Instância compartilhada pelo processo
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+def shared_line_cache(max_entries = 16):
+    '''
+    Retorna a instância única da memoização de resultados do processo. O script do Streamlit é
+    reexecutado a cada interação, mas os módulos importados permanecem carregados.
+
+    Args:
+        max_entries (int): Quantidade máxima de resultados, usada apenas na criação da instância.
+
+    Returns:
+        cache (line_cache): Memoização de resultados compartilhada.
+    '''
+
+    global _shared_cache
+
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = line_cache(max_entries = max_entries)
+
+    return _shared_cache
@@ -0,0 +1,307 @@
+from geo_coords import coords_analysis, utm_transformer
+import pandas as pd
+import numpy as np
+import ezdxf
+import re
+
+def get_df_template():
+    '''
+    Retorna um template dos atributos da tabela com as informações gerais.
+
+    Args:
+        None
+    
+    Returns:
+        data (dict): Dicionário com o template dos atributos de cada elemento da tabela.
+    '''
+
+    data = {'EST1_SAP': '', 'EST1_ALT_ORT': '', 'EST1_LAT': '', 'EST1_LON': '', 'EST1_UTM_X': '', 'EST1_UTM_Y': '',
+            'EST1_ID': '', 'EST1_ALTURA': '', 'EST1_TIPO': '', 'EST1_CARACT1': '', 'EST1_CARACT2': '',
+            'EST2_SAP': '', 'EST2_ALT_ORT': '', 'EST2_LAT': '', 'EST2_LON': '', 'EST2_UTM_X': '', 'EST2_UTM_Y': '',
+            'EST2_ID': '', 'EST2_ALTURA': '', 'EST2_TIPO': '', 'EST2_CARACT1': '', 'EST2_CARACT2': '',
+            'NOME_LT': '', 'SAP_LT': '', 'DIS_M': '', 'VAO_CENTRO_LAT': '', 'VAO_CENTRO_LONG': '', 'VAO_CENTRO_ALT_ORT': ''}
+    
+    return data
+
+def sequence_spans(df):
+    '''
+    Encadeia os vãos a partir de um índice de adjacência `EST1_SAP` -> vãos, em tempo linear.
+    Os segmentos começam pelos pórticos (`PORT`), seguidos das derivações encontradas em cada segmento,
+    dos trechos desconectados e, por fim, de vãos restantes em ciclos.
+
+    Args:
+        df (dataframe): Dataframe pandas sem ordenação de conexões entre as linhas.
+    
+    Returns:
+        segments (list): Lista de segmentos, cada um com as posições (`iloc`) dos vãos em ordem.
+    '''
+
+    est1 = df['EST1_SAP'].tolist()
+    est2 = df['EST2_SAP'].tolist()
+
+    # Índice de adjacência: estrutura inicial -> vãos que partem dela
+    adjacency = dict()
+    for pos, code in enumerate(est1):
+        adjacency.setdefault(code, list()).append(pos)
+
+    # Candidatos a início de segmento, em ordem de prioridade
+    ends = set(est2)
+    ports = [pos for pos, code in enumerate(est1) if isinstance(code, str) and code.startswith('PORT')]
+    roots = [pos for pos, code in enumerate(est1) if code not in ends]
+    candidates = ports + roots + list(range(len(est1)))
+
+    visited = [False] * len(est1)
+    segments = list()
+    stack = list(reversed(candidates))
+    while stack:
+        pos = stack.pop()
+        if visited[pos]:
+            continue
+
+        # Percorre o segmento seguindo o primeiro vão não visitado de cada estrutura final
+        segment, branches = list(), list()
+        while pos is not None:
+            visited[pos] = True
+            segment.append(pos)
+            children = [child for child in adjacency.get(est2[pos], list()) if not visited[child]]
+            pos = children[0] if children else None
+            branches.extend(children[1:])
+
+        segments.append(segment)
+        # As derivações do segmento são percorridas logo em seguida
+        stack.extend(reversed(branches))
+
+    return segments
+
+def reorganize_csv(df):
+    '''
+    Reorganiza o dataframe para as linhas ficarem em ordem com as conexões. Todos os segmentos
+    encadeados são mantidos, em sequência, sem descartar derivações ou trechos desconectados.
+
+    Args:
+        df (dataframe): Dataframe pandas sem ordenação de conexões entre as linhas.
+    
+    Returns:
+        df (dataframe): Dataframe pandas com ordenação de conexões entre as linhas.
+    '''
+
+    # Identificar a linha inicial (primeiro port alfabeticamente)
+    df = df.sort_values(by=["EST1_SAP"]) 
+    segments = sequence_spans(df)
+
+    # Criar o novo dataframe reordenado
+    positions = [pos for segment in segments for pos in segment]
+    new_df = df.iloc[positions]
+
+    return new_df
+
+def split_segments(df):
+    '''
+    Separa um dataframe ordenado por `reorganize_csv` nos seus segmentos encadeados.
+
+    Args:
+        df (dataframe): Dataframe pandas com ordenação de conexões entre as linhas.
+    
+    Returns:
+        segments (list): Lista de dataframes, um por segmento contínuo de vãos.
+    '''
+
+    est1 = df['EST1_SAP'].to_numpy()
+    est2 = df['EST2_SAP'].to_numpy()
+
+    # Um novo segmento começa quando o vão não parte da estrutura final do vão anterior
+    breaks = [0] + [pos for pos in range(1, len(df)) if est1[pos] != est2[pos - 1]] + [len(df)]
+
+    return [df.iloc[start:end] for start, end in zip(breaks[:-1], breaks[1:]) if end > start]
+
+def make_dataset(label, values_towers, values_conexions, coords_towers):
+    '''
+    Agrupa os dados do conjunto de linhas em uma tabela estruturada. Os vãos são unidos às estruturas
+    por `COD_ESTRUTURA_SAP` e as projeções e distâncias são calculadas de uma vez para todos os vãos.
+
+    Args:
+        label (str): Rótulo da linha.
+        values_towers (dataframe): Dataframe das estruturas.
+        values_conexions (dataframe): Dataframe dos vãos entre estruturas.
+        coords_towers (dict): Informações sobre as torres de transmissão. 
+    
+    Returns:
+        df (dataframe): Dataframe estruturado dos conjuntos de linhas.
+        df_integrity (bool): Informa se todos os dados foram coletados.
+    '''
+
+    geo_conversor = coords_analysis()
+
+    spans = pd.DataFrame(values_conexions).reset_index(drop = True)
+
+    # Coordenadas e informações extras das estruturas, mantendo a primeira ocorrência de cada código
+    towers_latlon = pd.DataFrame(values_towers, columns = ['COD_ESTRUTURA_SAP', 'NUM_LATITUDE', 'NUM_LONGITUDE'])
+    towers_latlon = towers_latlon.drop_duplicates(subset = 'COD_ESTRUTURA_SAP')
+    towers_info = pd.DataFrame(coords_towers, columns = ['structure', 'num_id', 'val_alt', 'est_type', 'character1', 'character2'])
+    towers_info = towers_info.drop_duplicates(subset = 'structure')
+
+    data = pd.DataFrame(index = spans.index)
+    missing_towers = pd.Series(False, index = spans.index)
+
+    for i in range(1,3):
+        ref = 'INI' if i == 1 else 'FIM' 
+        codes = spans[f'COD_ESTRUTURA_{ref}_SAP']
+
+        span_coords = pd.DataFrame({'LAT': spans[f'NUM_LATITUDE_ESTRUTURA_{ref}'].astype('float64'),
+                                    'LON': spans[f'NUM_LONGITUDE_ESTRUTURA_{ref}'].astype('float64')})
+        tower_coords = pd.merge(codes.rename('COD_ESTRUTURA_SAP').to_frame(), towers_latlon, how = 'left', on = 'COD_ESTRUTURA_SAP')
+        tower_coords = tower_coords.rename(columns = {'NUM_LATITUDE': 'LAT', 'NUM_LONGITUDE': 'LON'})[['LAT', 'LON']]
+
+        # Caso os campos de (lat, lon) sejam faltantes, completa com as coordenadas da tabela de estruturas
+        is_nan = span_coords.isna().any(axis = 1)
+        found = codes.isin(towers_latlon['COD_ESTRUTURA_SAP'])
+        replace = is_nan & found
+        coords = span_coords.where(~replace, other = tower_coords)
+        missing_towers |= is_nan & ~found
+
+        data[f'EST{i}_SAP'] = codes
+        data[f'EST{i}_ALT_ORT'] = spans[f'NUM_ALTITUDE_ORT_ESTRUTURA_{ref}']
+        data[f'EST{i}_LAT'] = coords['LAT']
+        data[f'EST{i}_LON'] = coords['LON']
+
+        # Extraíndo informações extras sobre a torre de outro dataframe
+        info = pd.merge(codes.rename('structure').to_frame(), towers_info, how = 'left', on = 'structure')
+        data[f'EST{i}_ID'] = info['num_id']
+        data[f'EST{i}_ALTURA'] = info['val_alt']
+        data[f'EST{i}_TIPO'] = info['est_type']
+        data[f'EST{i}_CARACT1'] = info['character1']
+        data[f'EST{i}_CARACT2'] = info['character2']
+
+    # Projeção UTM e distâncias de todos os vãos em lote
+    for i in range(1,3):
+        utm_x, utm_y, _, _ = geo_conversor.get_coords_utm_batch(data[f'EST{i}_LAT'], data[f'EST{i}_LON'])
+        data[f'EST{i}_UTM_X'] = utm_x
+        data[f'EST{i}_UTM_Y'] = utm_y
+
+    distances_latlon, same_zone = geo_conversor.geodesic_distance_batch(data['EST1_LAT'], data['EST1_LON'],
+                                                                        data['EST2_LAT'], data['EST2_LON'])
+    distances_utm = np.hypot(data['EST2_UTM_X'] - data['EST1_UTM_X'], data['EST2_UTM_Y'] - data['EST1_UTM_Y'])
+    data['DIS_M'] = np.where(same_zone, distances_utm, distances_latlon)
+
+    data['NOME_LT'] = label
+    data['SAP_LT'] = spans['COD_LT_SAP']
+    data['VAO_CENTRO_LAT'] = spans['NUM_LATITUDE_PONTO_CENTRAL']
+    data['VAO_CENTRO_LONG'] = spans['NUM_LONGITUDE_PONTO_CENTRAL']
+    data['VAO_CENTRO_ALT_ORT'] = spans['NUM_ALTITUDE_ORT_PONTO_CENTRAL']
+
+    # Variável para monitorar a integridade do dataset
+    df_integrity = not missing_towers.any()
+
+    df = data[list(get_df_template().keys())]
+
+    # Estrutura a ordem do .csv de acordo com a numeração do conjunto de estrutruas
+    df = reorganize_csv(df)
+
+    return df, df_integrity
+
+def dxf_layer_name(label):
+    '''
+    Converte o nome de um conjunto de linhas em um nome de camada válido no .dxf.
+
+    Args:
+        label (str): Nome do conjunto de linhas.
+    
+    Returns:
+        name (str): Nome da camada, sem os caracteres não permitidos pelo formato.
+    '''
+
+    name = re.sub(r'[<>/\\":;?*|=`]', '', str(label)).strip()
+
+    return name if name else 'Lines'
+
+def utm_dxf_doc(df, scale_factor = 1000, attributes = False):
+    '''
+    Monta o projeto .dxf com a visualização das coordenadas UTM. Cada estrutura é desenhada uma única vez, como
+    referência ao bloco `ESTRUTURA` com os atributos SAP, ID, tipo e altura, e cada segmento encadeado de vãos
+    como uma única polilinha. Cada conjunto de linhas (`NOME_LT`) fica em uma camada própria, então o projeto
+    de vários conjuntos ou de toda a rede pode ser montado a partir das tabelas concatenadas. Todas as estruturas
+    são projetadas na zona UTM predominante do projeto, registrada na variável `UTM_ZONE` do cabeçalho.
+
+    Args:
+        df (dataframe): Dataframe de referência com as conexões, ordenado por `reorganize_csv` em cada conjunto.
+        scale_factor (int): Fator de multiplicação da escala de renderização.
+        attributes (bool): Inclui os atributos ocultos ID, tipo e altura, que praticamente dobram o tamanho do arquivo.
+    
+    Returns:
+        doc (Drawing): Projeto .dxf do ezdxf.
+    '''
+
+    doc = ezdxf.new()
+    msp = doc.modelspace()
+
+    # Bloco da estrutura: círculo e código SAP visível, demais atributos ocultos
+    block = doc.blocks.new(name = 'ESTRUTURA')
+    block.add_circle((0, 0), radius = 200, dxfattribs = {'color': 0})
+    block.add_attdef('SAP', insert = (0, 0), dxfattribs = {'height': 3000, 'color': 7})
+    tags = ['ID', 'TIPO', 'ALTURA'] if attributes else list()
+    for tag in tags:
+        block.add_attdef(tag, insert = (0, 0), dxfattribs = {'height': 3000, 'color': 7, 'flags': ezdxf.const.ATTRIB_INVISIBLE})
+
+    # Uma camada por conjunto de linhas
+    labels = df['NOME_LT'].fillna('').astype(str).to_numpy()
+    layers = dict()
+    for i, label in enumerate(pd.unique(labels)):
+        layers[label] = dxf_layer_name(label)
+        if layers[label] not in doc.layers:
+            doc.layers.add(layers[label], color = i % 6 + 1)
+
+    # As colunas `EST*_UTM_*` estão na zona de cada estrutura: conjuntos em zonas diferentes, ou que cruzam o
+    # limite entre zonas, são projetados novamente em uma única zona, a predominante entre as estruturas
+    latitudes = {i: pd.to_numeric(df[f'EST{i}_LAT'], errors = 'coerce').to_numpy(dtype = 'float64') for i in range(1,3)}
+    longitudes = {i: pd.to_numeric(df[f'EST{i}_LON'], errors = 'coerce').to_numpy(dtype = 'float64') for i in range(1,3)}
+    zones, south = coords_analysis().get_utm_zones(np.concatenate([latitudes[1], latitudes[2]]), np.concatenate([longitudes[1], longitudes[2]]))
+    keys = zones * 2 + south
+    key = int(np.bincount(keys[zones > 0]).argmax()) if (zones > 0).any() else 23 * 2 + 1
+    transformer = utm_transformer(key // 2, bool(key % 2))
+    doc.header.custom_vars.append('UTM_ZONE', f"{key // 2}{'S' if key % 2 else 'N'}")
+
+    # Coordenadas arredondadas ao milímetro, reduzindo o texto de cada entidade no arquivo
+    coords = dict()
+    for i in range(1,3):
+        utm_x, utm_y = transformer.transform(longitudes[i], latitudes[i])
+        coords[f'X{i}'] = np.round(np.asarray(utm_x, dtype = 'float64') * 1000) * scale_factor / 1000
+        coords[f'Y{i}'] = np.round(np.asarray(utm_y, dtype = 'float64') * 1000) * scale_factor / 1000
+
+    # Estruturas das duas pontas dos vãos, desenhadas uma única vez por código SAP
+    towers = pd.concat([pd.DataFrame({'SAP': df[f'EST{i}_SAP'].to_numpy(), 'X': coords[f'X{i}'], 'Y': coords[f'Y{i}'],
+                                      'ID': df[f'EST{i}_ID'].to_numpy(), 'TIPO': df[f'EST{i}_TIPO'].to_numpy(),
+                                      'ALTURA': df[f'EST{i}_ALTURA'].to_numpy(), 'LAYER': [layers[label] for label in labels]})
+                        for i in range(1,3)], ignore_index = True)
+    towers = towers.dropna(subset = ['X', 'Y'])
+    towers = towers[~towers['SAP'].duplicated() | towers['SAP'].isna()]
+    for column in ['SAP', 'ID', 'TIPO', 'ALTURA']:
+        towers[column] = towers[column].astype(object).where(towers[column].notna(), '').astype(str)
+    for column in ['ID', 'ALTURA']:
+        values = pd.to_numeric(towers[column], errors = 'coerce')
+        towers[column] = towers[column].where(values.isna(), values.map('{:g}'.format))
+
+    # Atributos criados diretamente na posição da estrutura, na camada do conjunto. Os ocultos só são criados
+    # quando preenchidos
+    for sap, x, y, tower_id, tower_type, height, layer in towers[['SAP', 'X', 'Y', 'ID', 'TIPO', 'ALTURA', 'LAYER']].itertuples(index = False):
+        insert = msp.add_blockref('ESTRUTURA', (x, y), dxfattribs = {'layer': layer})
+        insert.add_attrib('SAP', sap, (x, y), dxfattribs = {'height': 3000, 'color': 7, 'layer': layer})
+        for tag, value in [('ID', tower_id), ('TIPO', tower_type), ('ALTURA', height)]:
+            if value and attributes:
+                insert.add_attrib(tag, value, (x, y), dxfattribs = {'height': 3000, 'flags': ezdxf.const.ATTRIB_INVISIBLE})
+
+    # Uma polilinha por segmento encadeado de vãos de cada conjunto
+    positions = pd.Series(np.arange(len(df)))
+    for label, group in positions.groupby(labels, sort = False):
+        for segment in split_segments(df.iloc[group.to_numpy()].assign(POS = group.to_numpy())):
+            pos = segment['POS'].to_numpy()
+            x1, y1, x2, y2 = coords['X1'][pos], coords['Y1'][pos], coords['X2'][pos], coords['Y2'][pos]
+
+            # Vãos sem coordenadas interrompem a polilinha
+            valid = np.isfinite(x1) & np.isfinite(y1) & np.isfinite(x2) & np.isfinite(y2)
+            edges = np.flatnonzero(np.diff(np.concatenate([[0], valid.astype('int64'), [0]])))
+            for start, end in zip(edges[::2], edges[1::2]):
+                points = np.column_stack([np.concatenate([x1[start:start + 1], x2[start:end]]),
+                                          np.concatenate([y1[start:start + 1], y2[start:end]])])
+                msp.add_lwpolyline(points, dxfattribs = {'layer': layers[label]})
+
+    return doc
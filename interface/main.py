@@ -1,30 +1,73 @@
 from data_manipulation import render_data
-from matplotlib import pyplot as plt
-from geo_coords import coords_analysis
+from table_store import shared_store
+from line_cache import shared_line_cache
+from table_cache import table_cache
+from line_dataset import make_dataset, utm_dxf_doc
+import exports
+import map_layers
+from spatial_index import shared_spatial_index
+from profiling import profiler
+from terrain_profile import sample_spans, lttb
+from matplotlib.figure import Figure
+from geo_coords import coords_analysis, utm_transformer, default_elevation_provider, default_terrain_provider
 import plotly.graph_objects as go
 import streamlit as st
-from math import isnan
 import pandas as pd
-import simplekml
-import folium
 import paths
-import ezdxf
-import os
 
 # Configurações da visualização da página
 st.set_page_config(
     page_title='Trixel - SW Torres',
     page_icon='⚡')
 
-# Módulos para renderização dos dados na interface
-data_modules = render_data()
-# Módulos para estimação de distância de coordenadas
-geo_conversor = coords_analysis()
-
 # Caminhos das tabelas e colunas de referência para acesso dos dados do GEO BDIT
 df_paths = paths.return_data_paths(yaml_file = 'interface/config.yaml')
 columns_names = paths.return_columns_ref(yaml_file = 'interface/config.yaml')
 
+# Tabelas mantidas em memória e indexadas uma única vez por processo
+cache = table_cache(cache_dir = paths.return_cache_dir(yaml_file = 'interface/config.yaml'))
+store = shared_store(index_columns = paths.return_index_columns(yaml_file = 'interface/config.yaml'), cache = cache)
+# Salva também em `out_data` os arquivos exportados
+save_out_data = paths.return_save_out_data(yaml_file = 'interface/config.yaml')
+# Atributos ocultos das estruturas no .dxf
+dxf_tower_attributes = paths.return_dxf_tower_attributes(yaml_file = 'interface/config.yaml')
+# Modo de renderização dos mapas: `geojson` ou `markers`
+map_mode = paths.return_map_render_mode(yaml_file = 'interface/config.yaml')
+# Resultados calculados por conjunto de linhas, reaproveitados entre as execuções do script
+results_cache = shared_line_cache(max_entries = paths.return_line_cache_size(yaml_file = 'interface/config.yaml'))
+
+# Instrumentação das etapas da execução, desativada por padrão
+profiler.configure(**paths.return_profiling_config(yaml_file = 'interface/config.yaml'))
+profiler.add_gauge('transformer_constructions', lambda: utm_transformer.cache_info().misses)
+profiler.add_gauge('results_cache_hits', lambda: results_cache.hits)
+profiler.add_gauge('results_cache_misses', lambda: results_cache.misses)
+profiler.start()
+
+# Descarta as tabelas e os resultados salvos caso as tabelas tratadas tenham mudado
+data_version = cache.data_version(df_paths)
+# Versões por conjunto de linhas, alteradas apenas para os conjuntos afetados por atualizações incrementais
+line_versions = cache.read_line_versions()
+if store.refresh(data_version):
+    # Após uma atualização incremental, os resultados dos conjuntos não afetados continuam válidos
+    if line_versions is None or line_versions['data_version'] != data_version:
+        results_cache.invalidate()
+        exports.export_cache.invalidate()
+with profiler.stage('load_tables'):
+    store.preload(df_paths)
+
+# Módulos para renderização dos dados na interface. A fonte de altitudes, com o seu limite de requisições e
+# cache persistente, é única por processo e compartilhada entre as execuções do script e as sessões
+elevation_config = paths.return_elevation_config(yaml_file = 'interface/config.yaml')
+elevation = default_elevation_provider(yaml_file = 'interface/config.yaml')
+data_modules = render_data(store = store, elevation = elevation)
+# Terreno amostrado entre as estruturas apenas do DEM local, sem consultas à API, com os tiles mantidos entre execuções
+terrain_config = paths.return_terrain_config(yaml_file = 'interface/config.yaml')
+terrain = default_terrain_provider(yaml_file = 'interface/config.yaml')
+# Pontos e rótulos exibidos no gráfico do perfil longitudinal
+profile_plot_config = paths.return_profile_plot_config(yaml_file = 'interface/config.yaml')
+# Módulos para estimação de distância de coordenadas
+geo_conversor = coords_analysis()
+
 def folium_map_data(label):
     '''
     Renderiza torres e distâncias de vãos por conjuntos de vãos.
@@ -39,239 +82,89 @@ def folium_map_data(label):
         coords (dict): Informações sobre as torres de transmissão. 
         zone_utm_problem (bool): Indica se há problemas de diferentes zonas UTM.
     '''
-    
-    # Variável para verificar se há mudanças de zona UTM
-    zone_utm_problem = False
 
-    values_towers, coords, values_conexions = data_modules.separate_conj_data(df_paths = df_paths, columns_names = columns_names, label = label) 
+    with profiler.stage('separate_conj_data') as info:
+        values_towers, coords, values_conexions = data_modules.separate_conj_data(df_paths = df_paths, columns_names = columns_names, label = label) 
+        info['rows'] = len(values_towers) + len(values_conexions)
+
+    # Calcula as distâncias de todos os vãos de uma vez
+    with profiler.stage('span_geometry', rows = len(values_conexions)):
+        spans = data_modules.span_geometry(values_conexions, coords)
 
-    # Configurando o exportador do projeto para kml
-    kml = simplekml.Kml()
+    # Informe se há mudança de zona nas coordenadas UTM
+    zone_utm_problem = any(not span['is_same_zone'] for span in spans)
 
     # Configura a visualização do mapa via frame do folium
-    center = len(coords) // 2
-    map_center = (coords[center]['lat'], coords[center]['long'])
-    m = folium.Map(location = map_center, zoom_start = 12)
-
-    # Adicionando a visualização com imagem de satélite
-    folium.TileLayer(
-    tiles='https://server.arcgisonline.com/ArcGIS/rest/services/World_Imagery/MapServer/tile/{z}/{y}/{x}',
-    attr='Esri',
-    name='Esri Satellite',
-    overlay=True).add_to(m)
-
-    # Adiciona as estruturas do conjunto de linhas no mapa
-    for coord in coords:
-        popup_text = f'''
-        <b>Cod. Torre</b>: {coord['structure']}<br>
-        <b>ID</b>: {coord['num_id']}<br>
-        <b>Tipo</b>: {coord['est_type']}<br>
-        <b>Altura</b>: {coord['val_alt']} <br>
-        <b>Caracter. 1</b>: {coord['character1']}<br>
-        <b>Caracter. 2</b>:  {coord['character2']}<br>
-        <b>Alt. Ortométrica</b>: {coord['alt_ort']}
-        '''
-
-        folium.Marker(location = (coord['lat'], coord['long']), popup = folium.Popup(popup_text, max_width = 300), 
-                    icon=folium.Icon(color = 'green')).add_to(m)
-        
-        # Adicionando as informações ao exportador do projeto para .kml
-        pnt = kml.newpoint(name = coord['num_id'], coords = [(coord['long'], coord['lat'])])  # KML usa (lon, lat)
-        pnt.description = popup_text
-    
-    # Adiciona as conexões entre vãos e a mensuração de distância entre as torres
-    for conexion in values_conexions:
-        try:
-            coord1 = [conexion['NUM_LATITUDE_ESTRUTURA_INI'], conexion['NUM_LONGITUDE_ESTRUTURA_INI']]
-            name1 = conexion['COD_ESTRUTURA_INI_SAP']
-            coord2 = [conexion['NUM_LATITUDE_ESTRUTURA_FIM'], conexion['NUM_LONGITUDE_ESTRUTURA_FIM']]
-            name2 = conexion['COD_ESTRUTURA_FIM_SAP']
-            
-            # Caso não tenha as coordenadas dos vãos, recompor os dados pela coordenadas das estruturas
-            is_nan = any(isnan(item) for subcoord in [coord1, coord2] for item in subcoord)
-            if is_nan: 
-                data1 = [element for element in coords if element['structure'] == conexion['COD_ESTRUTURA_INI_SAP']]
-                coord1 = (data1[0]['lat'], data1[0]['long'])
-                data2 = [element for element in coords if element['structure'] == conexion['COD_ESTRUTURA_FIM_SAP']]
-                coord2 = (data2[0]['lat'], data2[0]['long']) 
-
-            # Calcula a distância geodésica dos vãos
-            distance_latlon, is_same_zone = geo_conversor.geodesic_distance_latlon(coord1, coord2)
-
-            # Informe se há mudança de zona nas coordenadas UTM
-            if is_same_zone:
-                # Calcula a distância por coordenadas UTM
-                utm1_x, utm1_y = geo_conversor.get_coords_utm(coord1[0], coord1[1])
-                utm2_x, utm2_y = geo_conversor.get_coords_utm(coord2[0], coord2[1])
-                distance_utm = geo_conversor.utm_distance_same_zone((utm1_x, utm1_y), (utm2_x, utm2_y))
-            else: 
-                # Adiciona a distância geodésica caso a distância por coordenadas UTM não seja válida
-                zone_utm_problem = True
-                distance_utm = distance_latlon
-
-            popup_text = f'''
-            <b>{conexion['COD_ESTRUTURA_INI_SAP']}</b> e <b>{conexion['COD_ESTRUTURA_FIM_SAP']}</b><br>
-            <b>Dist. Geodésica</b>: {round(distance_latlon, 2)} m<br>
-            <b>Dist. UTM</b>: {round(distance_utm, 2)} m
-            '''
-            
-            folium.PolyLine([coord1, coord2], color = "red", weight = 4, opacity = 1,
-                            popup = folium.Popup(popup_text, max_width = 300)).add_to(m)
-            
-            # exportando os dados para o projeto em .kml
-            line = kml.newlinestring(
-                coords=[
-                    (coord1[1], coord1[0]),  # KML usa (lon, lat)
-                    (coord2[1], coord2[0]),
-                ]
-            )
-            line.name = f'{name1} | {name2}',
-            line.description = popup_text
-
-        except Exception as e:
-            print(f'Erro ao renderizar: {e}')
-    
-    kml_file = f'out_data/{label}.kml'
-    kml.save(kml_file)
+    with profiler.stage('folium_map', rows = len(coords) + len(spans)):
+        m = map_layers.line_map(coords, spans, mode = map_mode)
     
     return m, values_towers, values_conexions, coords, zone_utm_problem
 
-def get_df_template():
+def line_version(label):
     '''
-    Retorna um template dos atributos da tabela com as informações gerais.
+    Retorna a versão dos dados de um conjunto de linhas.
 
     Args:
-        None
+        label (str): Atributo com o nome do conjunto de linha.
     
     Returns:
-        data (dict): Dicionário com o template dos atributos de cada elemento da tabela.
+        version (str): Versão do conjunto, alterada apenas quando os seus dados mudam.
     '''
 
-    data = {'EST1_SAP': '', 'EST1_ALT_ORT': '', 'EST1_LAT': '', 'EST1_LON': '', 'EST1_UTM_X': '', 'EST1_UTM_Y': '',
-            'EST1_ID': '', 'EST1_ALTURA': '', 'EST1_TIPO': '', 'EST1_CARACT1': '', 'EST1_CARACT2': '',
-            'EST2_SAP': '', 'EST2_ALT_ORT': '', 'EST2_LAT': '', 'EST2_LON': '', 'EST2_UTM_X': '', 'EST2_UTM_Y': '',
-            'EST2_ID': '', 'EST2_ALTURA': '', 'EST2_TIPO': '', 'EST2_CARACT1': '', 'EST2_CARACT2': '',
-            'NOME_LT': '', 'SAP_LT': '', 'DIS_M': '', 'VAO_CENTRO_LAT': '', 'VAO_CENTRO_LONG': '', 'VAO_CENTRO_ALT_ORT': ''}
-    
-    return data
+    values_lines = data_modules.search_values_attributes(csv_path = df_paths['df_path_lines'], column_name = columns_names['column_name_lines'],
+                                                         search_value = label)
 
-def reorganize_csv(df):
+    return cache.line_token(data_version, values_lines[columns_names['column_sap_lines']], line_versions)
+
+def line_results(label, version):
     '''
-    Reorganiza o dataframe para as linhas ficarem em ordem com as conexões.
+    Retorna os resultados calculados de um conjunto de linhas, reaproveitando-os enquanto a seleção
+    e a versão dos dados não mudarem.
 
     Args:
-        df (dataframe): Dataframe pandas sem ordenação de conexões entre as linhas.
+        label (str): Atributo com o nome do conjunto de linha.
+        version (str): Versão dos dados do conjunto, retornada por `line_version`.
     
     Returns:
-        df (dataframe): Dataframe pandas com ordenação de conexões entre as linhas.
+        results (dict): Resultados do conjunto: `map` objeto do Folium, `map_html` mapa renderizado, `values_towers`,
+        `values_conexions` e `coords` dados das estruturas e vãos, `dataframe` tabela estruturada, `df_integrity`
+        integridade dos dados, `zone_utm_problem` mudança de zonas UTM e `utm_fig` gráfico das coordenadas UTM.
     '''
 
-    # Identificar a linha inicial (primeiro port alfabeticamente)
-    df = df.sort_values(by=["EST1_SAP"]) 
-    start_row = df[df["EST1_SAP"].str.startswith("PORT")].iloc[0]
-    current_link = start_row["EST2_SAP"]
-
-    # Criar nova ordem
-    ordered_rows = [start_row]
-    while True:
-        # Buscar a próxima linha
-        next_row = df[df["EST1_SAP"] == current_link]
-         # Se não há mais conexões, encerra
-        if next_row.empty:
-            break 
-        # Seleciona a primeira correspondência
-        next_row = next_row.iloc[0]  
-        ordered_rows.append(next_row)
-        current_link = next_row["EST2_SAP"]
-
-    # Criar o novo dataframe reordenado
-    new_df = pd.DataFrame(ordered_rows)
-
-    return new_df
-
-def make_dataset(label, values_towers, values_conexions, coords_towers):
+    def compute():
+        m, values_towers, values_conexions, coords, zone_utm_problem = folium_map_data(label)
+        with profiler.stage('map_html'):
+            map_html = m._repr_html_()
+        with profiler.stage('make_dataset', rows = len(values_conexions)):
+            dataframe, df_integrity = make_dataset(label, values_towers, values_conexions, coords)
+        with profiler.stage('utm_plot', rows = len(dataframe)):
+            utm_fig = utm_plot(df = dataframe, label = label)
+
+        return {'map': m, 'map_html': map_html, 'values_towers': values_towers, 'values_conexions': values_conexions,
+                'coords': coords, 'dataframe': dataframe, 'df_integrity': df_integrity, 'zone_utm_problem': zone_utm_problem,
+                'utm_fig': utm_fig}
+
+    return results_cache.get_or_compute((label, version), compute)
+
+def network_map_html(version):
     '''
-    Agrupa os dados do conjunto de linhas em uma tabela estruturada.
+    Retorna o mapa de toda a rede renderizado, reaproveitando-o enquanto a versão dos dados não mudar.
 
     Args:
-        label (str): Rótulo da linha.
-        values_towers (dataframe): Dataframe das estruturas.
-        values_conexions (dataframe): Dataframe dos vãos entre estruturas.
-        coords_towers (dict): Informações sobre as torres de transmissão. 
+        version (str): Versão dos dados de origem.
     
     Returns:
-        df (dataframe): Dataframe estruturado dos conjuntos de linhas.
-        df_integrity (bool): Informa se todos os dados foram coletados.
+        map_html (str): Mapa de toda a rede em html.
     '''
 
-    # Variável para monitorar a integridade do dataset
-    df_integrity = True
-
-    geo_conversor = coords_analysis()
-    all_data = list()
-
-     # Agrupamento dos dados
-    for conexion in values_conexions:
-        data = get_df_template()
-        coords = list()
-
-        for i in range(1,3):
-            ref = 'INI' if i == 1 else 'FIM' 
-
-            data[f'EST{i}_SAP'] = conexion[f'COD_ESTRUTURA_{ref}_SAP']
-            data[f'EST{i}_ALT_ORT'] = conexion[f'NUM_ALTITUDE_ORT_ESTRUTURA_{ref}']
-            data[f'EST{i}_LAT'] = conexion[f'NUM_LATITUDE_ESTRUTURA_{ref}']
-            data[f'EST{i}_LON'] = conexion[f'NUM_LONGITUDE_ESTRUTURA_{ref}']
-            
-            # Caso os campos de (lat, lon) sejam faltantes, pesquisa na tabela de estruturas
-            is_nan = any(isnan(item) for subcoord in [[data[f'EST{i}_LAT']], [data[f'EST{i}_LON']]] for item in subcoord)
-            if is_nan:
-                key_ref, value_ref = 'COD_ESTRUTURA_SAP', data[f'EST{i}_SAP']
-                result = [d for d in values_towers if d.get(key_ref) == value_ref]
-                if len(result) != 0:
-                    data[f'EST{i}_LAT'] = result[0]['NUM_LATITUDE']
-                    data[f'EST{i}_LON'] = result[0]['NUM_LONGITUDE']
-                else:
-                    df_integrity = False
-            
-            if not isnan(data[f'EST{i}_LAT']) and not isnan(data[f'EST{i}_LON']):
-                utm_x, utm_y = geo_conversor.get_coords_utm(data[f'EST{i}_LAT'], data[f'EST{i}_LON'])
-                coords.append([utm_x, utm_y])
-                data[f'EST{i}_UTM_X'] = utm_x
-                data[f'EST{i}_UTM_Y'] = utm_y
-
-            # Extraíndo informações extras sobre a torre de outro dataframe
-            tower_info = [element for element in coords_towers if element['structure'] == conexion[f'COD_ESTRUTURA_{ref}_SAP']]
-            if len(tower_info) != 0:
-                data[f'EST{i}_ID'] = tower_info[0]['num_id']
-                data[f'EST{i}_ALTURA'] = tower_info[0]['val_alt']
-                data[f'EST{i}_TIPO'] = tower_info[0]['est_type']
-                data[f'EST{i}_CARACT1'] = tower_info[0]['character1']
-                data[f'EST{i}_CARACT2'] = tower_info[0]['character2']
-        
-        data['NOME_LT'] = label
-        data['SAP_LT'] =  conexion['COD_LT_SAP']
-        
-        if len(coords) == 2:
-            distance_latlon, is_same_zone = geo_conversor.geodesic_distance_latlon([data['EST1_LAT'], data['EST1_LON']], [data['EST2_LAT'], data['EST2_LON']])
-            if is_same_zone == True:
-                distance = geo_conversor.utm_distance_same_zone(coords[0], coords[1])
-                data['DIS_M'] = distance
-            else:
-                data['DIS_M'] = distance_latlon
-
-        data['VAO_CENTRO_LAT'] = conexion['NUM_LATITUDE_PONTO_CENTRAL']
-        data['VAO_CENTRO_LONG'] = conexion['NUM_LONGITUDE_PONTO_CENTRAL']
-        data['VAO_CENTRO_ALT_ORT'] = conexion['NUM_ALTITUDE_ORT_PONTO_CENTRAL']
-    
-        all_data.append(data)
-    
-    df = pd.DataFrame(all_data)
+    def compute():
+        lines = store.load_table(df_paths['df_path_lines'])
+        line_names = dict(zip(lines[columns_names['column_sap_lines']].astype(str), lines[columns_names['column_name_lines']]))
+        points = shared_spatial_index(store, df_paths, version).points
 
-    # Estrutura a ordem do .csv de acordo com a numeração do conjunto de estrutruas
-    df = reorganize_csv(df)
+        return map_layers.network_map(points, line_names)._repr_html_()
 
-    return df, df_integrity
+    return results_cache.get_or_compute(('__rede__', version), compute)
 
 def convert_df_to_csv(df):
     '''
@@ -286,19 +179,49 @@ def convert_df_to_csv(df):
     
     return df.to_csv().encode("utf-8")
 
-def convert_df_to_xlsx(df, label):
+def convert_df_to_xlsx(df, label, version):
     '''
-    Salva um dataframe em um arquivo .xlsx.
+    Gera o arquivo .xlsx de um dataframe em memória, salvando também em `out_data` caso configurado.
 
     Args:
         df (dataframe): Dataframe a ser salvo.
         label (str): Nome do arquivo a ser salvo.
+        version (str): Versão dos dados do conjunto.
     
     Returns:
-        None
+        content (bytes): Conteúdo do arquivo .xlsx.
+    '''
+    
+    def build():
+        with profiler.stage('convert_df_to_xlsx', rows = len(df)):
+            return exports.xlsx_bytes(df)
+
+    save_path = f'out_data/{label}.xlsx' if save_out_data else None
+
+    return exports.cached_export((label, version, 'xlsx'), build, save_path = save_path)
+
+def convert_to_kml(results, label, version):
     '''
+    Gera o projeto .kml do conjunto de linhas em memória, salvando também em `out_data` caso configurado.
+
+    Args:
+        results (dict): Resultados do conjunto retornados por `line_results`.
+        label (str): Nome do arquivo a ser salvo.
+        version (str): Versão dos dados do conjunto.
     
-    return df.to_excel(f'out_data/{label}.xlsx', index = False)
+    Returns:
+        content (bytes): Conteúdo do arquivo .kml.
+    '''
+
+    def build():
+        with profiler.stage('convert_to_kml', rows = len(results['values_conexions'])):
+            spans = data_modules.span_geometry(results['values_conexions'], results['coords'])
+
+            return exports.kml_bytes(results['coords'], spans)
+
+    save_path = f'out_data/{label}.kml' if save_out_data else None
+
+    return exports.cached_export((label, version, 'kml'), build, save_path = save_path)
 
 def utm_plot(df, label):
     '''
@@ -312,19 +235,21 @@ def utm_plot(df, label):
         fig (matplotlib object): Objeto com os detalhes de plotagem gráfica.
     '''
 
-    fig, ax = plt.subplots(figsize=(10, 10))
+    # Figura fora do registro do pyplot: é liberada quando sai do cache de resultados
+    fig = Figure(figsize = (10, 10))
+    ax = fig.subplots()
 
     for index, row in df.iterrows():
         x1, y1 = row['EST1_UTM_X'], row['EST1_UTM_Y'] 
         x2, y2 = row['EST2_UTM_X'], row['EST2_UTM_Y']
 
-        if all([x1, y1, x2, y2]):
+        if pd.notna([x1, y1, x2, y2]).all():
             ax.plot([x1, x2], [y1, y2], color = 'red', lw = 2)
 
-        if all([x1, y1]):
+        if pd.notna([x1, y1]).all():
             ax.scatter(x1, y1, color = 'black', zorder = 5)
         
-        if all([x2, y2]):
+        if pd.notna([x2, y2]).all():
             ax.scatter(x2, y2, color = 'black', zorder = 5)
 
     ax.set_xlabel('Coordenada UTM (X)')
@@ -333,73 +258,80 @@ def utm_plot(df, label):
 
     return fig
 
-def utm_data_dxf(df, label, scale_factor = 1000):
+def utm_data_dxf(df, label, version, scale_factor = 1000):
     '''
-    Exporta a visualização das coordenadas UTM para um projeto .dxf.
+    Exporta a visualização das coordenadas UTM para um projeto .dxf, gerado em memória e salvo também 
+    em `out_data` caso configurado.
 
     Args:
         df (dataframe): Dataframe de referência com as conexões.
         label (str): rótulo do arquivo a ser salvo.
+        version (str): Versão dos dados do conjunto.
         scale_factor (int): Fator de multiplicação da escala de renderização.
     
     Returns:
-        None
+        content (bytes): Conteúdo do arquivo .dxf.
     '''
 
-    doc = ezdxf.new()
-    msp = doc.modelspace()
+    def build():
+        with profiler.stage('utm_data_dxf', rows = len(df)):
+            return exports.dxf_bytes(utm_dxf_doc(df, scale_factor, attributes = dxf_tower_attributes))
 
-    for index, row in df.iterrows():
-        x1, y1 = row['EST1_UTM_X'] * scale_factor, row['EST1_UTM_Y'] * scale_factor
-        x2, y2 = row['EST2_UTM_X'] * scale_factor, row['EST2_UTM_Y'] * scale_factor
-        
-        if all([x1, y1, x2, y2]):
-            msp.add_line((x1, y1), (x2, y2), dxfattribs={'layer': 'Lines', 'color': 1})
+    save_path = f'out_data/utm-{label}.dxf' if save_out_data else None
 
-        if all([x1, y1]):
-            msp.add_circle((x1, y1), radius = 200, dxfattribs = {'color': 0})
-            msp.add_text(row['EST1_SAP'], dxfattribs = {'insert': (x1, y1), 'height': 3000, 'color': 7})
-        
-        if all([x2, y2]):
-            msp.add_circle((x2, y2), radius = 200, dxfattribs={'color': 0})
-            msp.add_text(row['EST2_SAP'], dxfattribs = {'insert': (x2, y2), 'height': 3000, 'color': 7})
+    return exports.cached_export((label, version, 'dxf'), build, save_path = save_path)
 
-    doc.saveas(f'out_data/utm-{label}.dxf')
-
-def plot_profile_long(profile_df, label):
+def plot_profile_long(profile_df, label, terrain_df = None, window = None, max_points = 5000, max_labels = 300):
     '''
-    Configura os dados do gráfico para visualização no streamlit.
+    Configura os dados do gráfico para visualização no streamlit. As séries são desenhadas em WebGL e reduzidas
+    a `max_points` pontos no trecho exibido, e os códigos das estruturas formam uma única série de texto.
 
     Args:
         profile_df (dataframe): Dataframe com os dados para visualização do perfil longitudinal.
         label (str): Rótulo do gráfico a partir do conjunto de linhas.
+        terrain_df (dataframe): Amostras do terreno no trecho exibido (`DIS_CUM_KM`, `ALT_TERRENO`). Opcional.
+        window (tuple): Distâncias inicial e final do trecho exibido em km. Caso não seja informado, todo o perfil.
+        max_points (int): Quantidade máxima de estruturas desenhadas no trecho, selecionadas por LTTB.
+        max_labels (int): Quantidade máxima de rótulos das estruturas. Acima dela, os códigos aparecem apenas no cursor.
     '''
 
     fig = go.Figure()
 
-    fig.add_trace(go.Scatter(x = profile_df['DIS_CUM_KM'], y = profile_df['ALT_ORT'], mode = 'lines+markers',  
-                  line = dict(color='blue'), marker = dict(symbol = 'circle', size = 8)))
+    if terrain_df is not None:
+        fig.add_trace(go.Scattergl(x = terrain_df['DIS_CUM_KM'], y = terrain_df['ALT_TERRENO'], mode = 'lines', name = 'Terreno',
+                                   line = dict(color = 'saddlebrown', width = 1), fill = 'tozeroy', fillcolor = 'rgba(139, 69, 19, 0.15)'))
+
+    if window is not None:
+        profile_df = profile_df[profile_df['DIS_CUM_KM'].between(window[0], window[1])]
+    profile_df = profile_df.iloc[lttb(profile_df['DIS_CUM_KM'], profile_df['ALT_ORT'], max_points)]
 
-    for i, row in profile_df.iterrows():
-        fig.add_annotation(x = row['DIS_CUM_KM'], y = row['ALT_ORT'], text = row['EST_SAP'],
-                           showarrow = True, arrowhead = 1, ax = 0, ay = -20, font = dict(size = 12))
+    fig.add_trace(go.Scattergl(x = profile_df['DIS_CUM_KM'], y = profile_df['ALT_ORT'], mode = 'lines+markers', name = 'Estruturas',
+                               line = dict(color = 'blue'), marker = dict(symbol = 'circle', size = 8), text = profile_df['EST_SAP'],
+                               hovertemplate = '%{text}<br>%{x:.3f} km<br>%{y:.1f} m<extra></extra>'))
+
+    if len(profile_df) <= max_labels:
+        fig.add_trace(go.Scattergl(x = profile_df['DIS_CUM_KM'], y = profile_df['ALT_ORT'], mode = 'text', text = profile_df['EST_SAP'],
+                                   textposition = 'top center', textfont = dict(size = 12), hoverinfo = 'skip', showlegend = False))
 
     fig.update_layout(title = f'{label}', xaxis_title = 'Distância Cumulativa (km)',
                       yaxis_title = 'Altitude Ortométrica', template = 'plotly_white',  
-                      xaxis = dict(tickangle = 45, rangeslider = dict(visible = True), showgrid = True, range = [0, 1]),
+                      xaxis = dict(tickangle = 45, showgrid = True, range = list(window) if window is not None else None),
                       yaxis = dict(showgrid = True), height = 800)
 
     return fig
 
 def main():
 
-    # Cria uma pasta com os dados de saída caso não exista
-    folder_name = 'out_data'
-    if not os.path.exists(folder_name):
-        os.makedirs(folder_name)
-
     st.title('Trixel - Dados GEO BDIT')
 
+    network_view = st.expander(label = 'Visualização de toda a rede', expanded = False)
+
+    with network_view:
+        # O mapa de toda a rede é montado apenas quando solicitado
+        if st.checkbox('Carregar mapa de todos os conjuntos de linhas'):
+            with profiler.stage('network_map'):
+                st.components.v1.html(network_map_html(data_version), height = 500, scrolling = False)
+
     # Extraí os nomes dos conjuntos de linhas disponíveis
     lines_values = data_modules.extract_csv_attributes(csv_path = df_paths['df_path_lines'],
                                                   column_name = columns_names['column_name_lines'])
@@ -409,10 +341,14 @@ def main():
     label = st.selectbox(label = 'Escolha o conjunto de linhas:', options = lines_values)
     label = label.split(': ')[1]
     label = label.replace('/', '')
+    profiler.annotate(label = label)
     
     # Realiza a extração dos dados e renderização no mapa
     try:
-        m, values_towers, values_conexions, coords, zone_utm_problem = folium_map_data(label)
+        with profiler.stage('line_version'):
+            version = line_version(label)
+        with profiler.stage('line_results'):
+            results = line_results(label, version)
     except:
         info_text = '''
                     Há alguns problemas ao plotar essa linha de transmissão, 
@@ -422,19 +358,20 @@ def main():
 
         return 0
 
+    dataframe, df_integrity = results['dataframe'], results['df_integrity']
+    zone_utm_problem = results['zone_utm_problem']
+
     # Botão para fazer o download das informações estruturadas em um arquivo .csv ou .xlsx
     col1, col2, col3 = st.columns([0.5, 0.25, 0.25])
-    dataframe, df_integrity = make_dataset(label, values_towers, values_conexions, coords)
     with col1:
         st.warning('Baixe a tabela de conexões:')
     with col2:
-        csv = convert_df_to_csv(dataframe)
+        with profiler.stage('convert_df_to_csv', rows = len(dataframe)):
+            csv = convert_df_to_csv(dataframe)
         is_download = st.download_button(label = 'Baixar arquivo CSV', data = csv, file_name = f'{label}.csv')
     with col3:
-        xlsx = convert_df_to_xlsx(dataframe, label)
-        excel_file = f'out_data/{label}.xlsx'
-        with open(excel_file, 'rb') as file:
-            st.download_button(label = 'Baixar arquivo XLSX', data = file, file_name = f'{label}.xlsx')
+        # Arquivo gerado apenas quando o download é solicitado
+        st.download_button(label = 'Baixar arquivo XLSX', data = lambda: convert_df_to_xlsx(dataframe, label, version), file_name = f'{label}.xlsx')
     
     # Informa se o dataset tem dados faltantes
     if df_integrity is not True:
@@ -453,11 +390,10 @@ def main():
             st.warning('Baixe o projeto para Google Earth:')
         with col2:
             # opção para exportar os dados em .kml
-            kml_file = f'out_data/{label}.kml'
-            with open(kml_file, "rb") as file:
-                st.download_button(label = 'Baixar dados KML', data = file, file_name = f'{label}.kml')
+            st.download_button(label = 'Baixar dados KML', data = lambda: convert_to_kml(results, label, version), file_name = f'{label}.kml')
         # Componente para visualização do mapa no streamlit
-        st.components.v1.html(m._repr_html_(), height = 400, scrolling = False)
+        with profiler.stage('render_map'):
+            st.components.v1.html(results['map_html'], height = 400, scrolling = False)
 
     utm_plot_view = st.expander(label = 'Visualização das coordenadas UTM', expanded = False)
 
@@ -467,10 +403,7 @@ def main():
             st.warning('Baixe a visualização em CAD:')
         with col2:
             # opção para exportar os dados em .dxf
-            utm_data_dxf(df = dataframe, label = label)
-            dxf_file = f'out_data/utm-{label}.dxf'
-            with open(dxf_file, "rb") as file:
-                st.download_button(label = 'Baixar dados DXF', data = file, file_name = f'utm-{label}.dxf')
+            st.download_button(label = 'Baixar dados DXF', data = lambda: utm_data_dxf(df = dataframe, label = label, version = version), file_name = f'utm-{label}.dxf')
         
         if zone_utm_problem:
             error_text = '''
@@ -480,8 +413,8 @@ def main():
                          '''
             st.error(error_text, icon = '🚨')
         # Exibindo o gráfico de coordenadas UTM
-        fig = utm_plot(df = dataframe, label = label)
-        st.pyplot(fig)
+        with profiler.stage('st.pyplot', rows = len(dataframe)):
+            st.pyplot(results['utm_fig'])
 
     
     if df_integrity:
@@ -489,12 +422,19 @@ def main():
 
         with profile_plot_view: 
             
+            sample_terrain = st.checkbox(f"Amostrar o terreno entre as estruturas a cada {terrain_config['spacing']:g} m (DEM local)")
+
             if st.button('Gerar Perfil Longitudinal'):
+                # O perfil continua exibido nas próximas execuções, ex.: ao mudar o trecho exibido
+                st.session_state['profile_label'] = label
                 st.warning('Aguarde... Alguns dados de altitude estão sendo requeridos em uma API.')
 
+            if st.session_state.get('profile_label') == label:
                 col1, col2, col3 = st.columns([0.5, 0.25, 0.25])
                 # Visualizando um gráfico interativo do perfil longitudinal
-                profile_df = data_modules.longitudinal_profile_csv(dataframe)
+                with profiler.stage('longitudinal_profile_csv', rows = len(dataframe)):
+                    profile_df = results_cache.get_or_compute((label, version, 'profile'),
+                                                              lambda: data_modules.longitudinal_profile_csv(dataframe))
                 with col1:
                     st.warning('Baixe os dados do perfil longitudinal:')
                 with col2:
@@ -502,8 +442,33 @@ def main():
                     is_download = st.download_button(label = 'Baixar arquivo CSV', data = csv_profile, file_name = f'profile-{label}.csv')
                 with col3:
                     st.button('.dxf [Em Breve]')
-                fig = plot_profile_long(profile_df = profile_df, label = label)
-                st.plotly_chart(fig, use_container_width = True)
+
+                # Trecho exibido: as séries são reduzidas aos pontos visíveis nesse intervalo
+                total_km = float(profile_df['DIS_CUM_KM'].max()) if len(profile_df) else 0.0
+                window = None
+                if total_km > 0:
+                    window = st.slider('Trecho exibido (km)', min_value = 0.0, max_value = total_km, value = (0.0, total_km))
+
+                terrain_df = None
+                if sample_terrain:
+                    with profiler.stage('sample_spans', rows = len(dataframe)) as info:
+                        ground = results_cache.get_or_compute((label, version, 'terrain', terrain_config['spacing']),
+                                                              lambda: sample_spans(dataframe, terrain, spacing = terrain_config['spacing'],
+                                                                                   max_points = terrain_config['max_points']))
+                        info['rows'] = len(ground)
+                    if ground.coverage() < 1:
+                        st.warning(f'O DEM local cobre {ground.coverage():.0%} das amostras do terreno. '
+                                   f"Adicione os arquivos SRTM em `{elevation_config['dem_dir']}`.")
+                    st.download_button(label = 'Baixar terreno amostrado (CSV)', data = lambda: convert_df_to_csv(ground.to_dataframe()),
+                                       file_name = f'terrain-{label}.csv')
+                    # Apenas os extremos de cada faixa e as estruturas do trecho são exibidos no gráfico
+                    start, end = (window[0] * 1000, window[1] * 1000) if window is not None else (None, None)
+                    terrain_df = ground.to_dataframe(ground.downsample(profile_plot_config['max_points'], start, end))
+                with profiler.stage('plot_profile_long', rows = len(profile_df)):
+                    fig = plot_profile_long(profile_df = profile_df, label = label, terrain_df = terrain_df, window = window,
+                                            max_points = profile_plot_config['max_points'], max_labels = profile_plot_config['max_labels'])
+                with profiler.stage('st.plotly_chart'):
+                    st.plotly_chart(fig, use_container_width = True)
     else:
         info_text = '''
                     Por problema com dados faltantes. Não conseguimos plotar a visualização do perfil longitudinal.
@@ -511,8 +476,35 @@ def main():
                     '''
         st.error(info_text, icon = '🚨')
 
+def show_diagnostics():
+    '''
+    Exibe os tempos e contadores da execução em um painel de diagnóstico e os registra no log, caso configurado.
+
+    Args:
+        None
+    
+    Returns:
+        None
+    '''
+
+    report = profiler.report()
+    if report is None:
+        return
+
+    profiler.write_log(report)
+
+    with st.expander(label = 'Diagnóstico de desempenho', expanded = False):
+        st.caption(f"Tempo total da execução: {report['total'] * 1000:.0f} ms")
+        stages = pd.DataFrame({'Etapa': ['· ' * stage['depth'] + stage['stage'] for stage in report['stages']],
+                               'Tempo (ms)': [round(stage['elapsed'] * 1000, 1) for stage in report['stages']],
+                               'Linhas': [stage['rows'] for stage in report['stages']]})
+        st.dataframe(stages, hide_index = True, use_container_width = True)
+        counters = pd.DataFrame({'Contador': list(report['counters']), 'Valor': list(report['counters'].values())})
+        st.dataframe(counters, hide_index = True, use_container_width = True)
+
 if __name__ == "__main__":
     main()
+    show_diagnostics()
 
     st.markdown(
     """
@@ -0,0 +1,229 @@
+from folium.plugins import FastMarkerCluster
+from spatial_index import valid_coordinates
+import exports
+import folium
+import math
+
+# Campos exibidos nos popups das camadas GeoJSON, montados no navegador a partir das propriedades
+tower_fields = {'structure': 'Cod. Torre', 'num_id': 'ID', 'est_type': 'Tipo', 'val_alt': 'Altura',
+                'character1': 'Caracter. 1', 'character2': 'Caracter. 2', 'alt_ort': 'Alt. Ortométrica'}
+span_fields = {'ini': 'Estrutura inicial', 'fim': 'Estrutura final', 'distance_latlon': 'Dist. Geodésica (m)',
+               'distance_utm': 'Dist. UTM (m)'}
+
+def add_satellite_layer(m):
+    '''
+    Adiciona a visualização com imagem de satélite ao mapa.
+
+    Args:
+        m (folium object): Mapa do Folium.
+
+    Returns:
+        None
+    '''
+
+    folium.TileLayer(
+    tiles='https://server.arcgisonline.com/ArcGIS/rest/services/World_Imagery/MapServer/tile/{z}/{y}/{x}',
+    attr='Esri',
+    name='Esri Satellite',
+    overlay=True).add_to(m)
+
+def json_value(value):
+    '''
+    Converte um valor das tabelas para um tipo aceito no GeoJSON.
+
+    Args:
+        value (object): Valor da tabela.
+
+    Returns:
+        value (object): Valor convertido, `None` para dados faltantes.
+    '''
+
+    if value is None:
+        return None
+    if hasattr(value, 'item'):
+        value = value.item()
+    if isinstance(value, float) and math.isnan(value):
+        return None
+
+    return value
+
+def towers_geojson(coords):
+    '''
+    Agrupa as estruturas de um conjunto de linhas em uma coleção de pontos GeoJSON.
+
+    Args:
+        coords (dict): Informações sobre as torres de transmissão.
+
+    Returns:
+        geojson (dict): Coleção de pontos com as informações das estruturas como propriedades.
+    '''
+
+    features = list()
+    for coord in coords:
+        lat, lon = json_value(coord['lat']), json_value(coord['long'])
+        if lat is None or lon is None:
+            continue
+
+        properties = {field: json_value(coord[field]) for field in tower_fields}
+        features.append({'type': 'Feature', 'geometry': {'type': 'Point', 'coordinates': [lon, lat]}, 'properties': properties})
+
+    return {'type': 'FeatureCollection', 'features': features}
+
+def spans_geojson(spans):
+    '''
+    Agrupa os vãos de um conjunto de linhas em uma coleção de segmentos GeoJSON.
+
+    Args:
+        spans (list): Vãos retornados por `render_data.span_geometry`.
+
+    Returns:
+        geojson (dict): Coleção de segmentos com as distâncias dos vãos como propriedades.
+    '''
+
+    features = list()
+    for span in spans:
+        coord1, coord2 = span['coord1'], span['coord2']
+        properties = {'ini': json_value(span['conexion']['COD_ESTRUTURA_INI_SAP']),
+                      'fim': json_value(span['conexion']['COD_ESTRUTURA_FIM_SAP']),
+                      'distance_latlon': round(span['distance_latlon'], 2), 'distance_utm': round(span['distance_utm'], 2)}
+        geometry = {'type': 'LineString', 'coordinates': [[float(coord1[1]), float(coord1[0])], [float(coord2[1]), float(coord2[0])]]}
+        features.append({'type': 'Feature', 'geometry': geometry, 'properties': properties})
+
+    return {'type': 'FeatureCollection', 'features': features}
+
+def markers_map(m, coords, spans):
+    '''
+    Renderização original: um marcador e uma linha por elemento, com os popups montados no servidor.
+
+    Args:
+        m (folium object): Mapa do Folium.
+        coords (dict): Informações sobre as torres de transmissão.
+        spans (list): Vãos retornados por `render_data.span_geometry`.
+
+    Returns:
+        None
+    '''
+
+    # Adiciona as estruturas do conjunto de linhas no mapa
+    for coord in coords:
+        folium.Marker(location = (coord['lat'], coord['long']), popup = folium.Popup(exports.tower_popup(coord), max_width = 300),
+                    icon=folium.Icon(color = 'green')).add_to(m)
+
+    # Adiciona as conexões entre vãos e a mensuração de distância entre as torres
+    for span in spans:
+        folium.PolyLine([span['coord1'], span['coord2']], color = "red", weight = 4, opacity = 1,
+                        popup = folium.Popup(exports.span_popup(span), max_width = 300)).add_to(m)
+
+def geojson_map(m, coords, spans):
+    '''
+    Renderização em duas camadas GeoJSON desenhadas em canvas, com popups vinculados no navegador
+    apenas quando o elemento é clicado.
+
+    Args:
+        m (folium object): Mapa do Folium.
+        coords (dict): Informações sobre as torres de transmissão.
+        spans (list): Vãos retornados por `render_data.span_geometry`.
+
+    Returns:
+        None
+    '''
+
+    folium.GeoJson(spans_geojson(spans), name = 'Vãos',
+                   style_function = lambda feature: {'color': 'red', 'weight': 4, 'opacity': 1},
+                   popup = folium.GeoJsonPopup(fields = list(span_fields), aliases = list(span_fields.values()))).add_to(m)
+
+    folium.GeoJson(towers_geojson(coords), name = 'Estruturas',
+                   marker = folium.CircleMarker(radius = 5, color = 'darkgreen', fill = True, fill_color = 'lime', fill_opacity = 1),
+                   popup = folium.GeoJsonPopup(fields = list(tower_fields), aliases = list(tower_fields.values()))).add_to(m)
+
+def line_map(coords, spans, mode = 'geojson'):
+    '''
+    Monta o mapa de um conjunto de linhas.
+
+    Args:
+        coords (dict): Informações sobre as torres de transmissão.
+        spans (list): Vãos retornados por `render_data.span_geometry`.
+        mode (str): Modo de renderização: `geojson` (camadas únicas em canvas) ou `markers` (um marcador por elemento).
+
+    Returns:
+        m (folium object): Objeto com os atributos de renderização do mapa no Folium.
+    '''
+
+    if mode not in ('geojson', 'markers'):
+        raise ValueError(f'Modo de renderização do mapa "{mode}" desconhecido.')
+
+    # Configura a visualização do mapa via frame do folium
+    center = len(coords) // 2
+    map_center = (coords[center]['lat'], coords[center]['long'])
+    m = folium.Map(location = map_center, zoom_start = 12, prefer_canvas = mode == 'geojson')
+    add_satellite_layer(m)
+
+    if mode == 'geojson':
+        geojson_map(m, coords, spans)
+    else:
+        markers_map(m, coords, spans)
+
+    return m
+
+def network_geojson(points, line_names):
+    '''
+    Agrupa os vãos de toda a rede em uma feição GeoJSON por conjunto de linhas.
+
+    Args:
+        points (dataframe): Pontos da rede retornados por `spatial_index.network_points`.
+        line_names (dict): Dicionário de código SAP para nome do conjunto de linhas.
+
+    Returns:
+        geojson (dict): Coleção com uma feição `MultiLineString` por conjunto de linhas.
+    '''
+
+    spans = points[points['TIPO'] == 'vao']
+    spans = spans[valid_coordinates(spans['LAT_INI'], spans['LON_INI']) & valid_coordinates(spans['LAT_FIM'], spans['LON_FIM'])]
+
+    features = list()
+    for code, group in spans.groupby('COD_LT_SAP', sort = True):
+        segments = [[[lon1, lat1], [lon2, lat2]] for lat1, lon1, lat2, lon2 in
+                    zip(group['LAT_INI'].round(6), group['LON_INI'].round(6), group['LAT_FIM'].round(6), group['LON_FIM'].round(6))]
+        properties = {'name': line_names.get(code, code), 'code': code, 'spans': len(group)}
+        features.append({'type': 'Feature', 'geometry': {'type': 'MultiLineString', 'coordinates': segments}, 'properties': properties})
+
+    return {'type': 'FeatureCollection', 'features': features}
+
+def network_map(points, line_names):
+    '''
+    Monta o mapa de toda a rede: uma camada GeoJSON com os conjuntos de linhas, estruturas agrupadas
+    em clusters montados no navegador e subestações.
+
+    Args:
+        points (dataframe): Pontos da rede retornados por `spatial_index.network_points`.
+        line_names (dict): Dicionário de código SAP para nome do conjunto de linhas.
+
+    Returns:
+        m (folium object): Objeto com os atributos de renderização do mapa no Folium.
+    '''
+
+    # Centro, limites e clusters calculados apenas sobre coordenadas válidas
+    located = points[valid_coordinates(points['LAT'], points['LON'])]
+    m = folium.Map(location = (located['LAT'].mean(), located['LON'].mean()), zoom_start = 7, prefer_canvas = True)
+    add_satellite_layer(m)
+
+    folium.GeoJson(network_geojson(located, line_names), name = 'Linhas',
+                   style_function = lambda feature: {'color': 'red', 'weight': 3, 'opacity': 0.9},
+                   highlight_function = lambda feature: {'color': 'yellow', 'weight': 5},
+                   tooltip = folium.GeoJsonTooltip(fields = ['name'], aliases = ['Linha'])).add_to(m)
+
+    # Estruturas agrupadas em clusters, apenas com as coordenadas enviadas ao navegador
+    towers = located[located['TIPO'] == 'estrutura']
+    FastMarkerCluster(data = towers[['LAT', 'LON']].round(6).to_numpy().tolist(), name = 'Estruturas', show = False).add_to(m)
+
+    substations = located[located['TIPO'] == 'subestacao']
+    substations_layer = folium.FeatureGroup(name = 'Subestações')
+    for _, row in substations.iterrows():
+        folium.CircleMarker(location = (row['LAT'], row['LON']), radius = 7, color = 'blue', fill = True,
+                            fill_opacity = 1, tooltip = row['NOME']).add_to(substations_layer)
+    substations_layer.add_to(m)
+
+    folium.LayerControl().add_to(m)
+    m.fit_bounds([[located['LAT'].min(), located['LON'].min()], [located['LAT'].max(), located['LON'].max()]])
+
+    return m
@@ -9,15 +9,16 @@ def return_data_paths(yaml_file):
     
     Returns:
         df_paths (dict): Dicionário com os caminhos de referência: `df_path_lines` para o
-        dataframe das linhas, `df_path_towers` para o dataframe das estruturas e `df_path_conexions`
-        para o dataframe das conexões.
+        dataframe das linhas, `df_path_towers` para o dataframe das estruturas, `df_path_conexions`
+        para o dataframe das conexões e `df_path_substations` para o dataframe das subestações.
     '''
     
     data = load_yaml(file_path = yaml_file)
 
     df_paths = {'df_path_lines': data['df_path_lines'],
                 'df_path_towers': data['df_path_towers'],
-                'df_path_conexions': data['df_path_conexions']}
+                'df_path_conexions': data['df_path_conexions'],
+                'df_path_substations': data['df_path_substations']}
 
     return df_paths
 
@@ -41,4 +42,206 @@ def return_columns_ref(yaml_file):
                    'column_sap_lines': data['column_sap_lines'],
                    'column_name_towers': data['column_name_towers']}
 
-    return columns_ref
\ No newline at end of file
+    return columns_ref
+
+def return_index_columns(yaml_file):
+    '''
+    Retorna as colunas indexadas em memória para busca nas tabelas.
+
+    Args:
+        yaml_file (str): Caminho do arquivo .yaml com a localização dos dataframes.
+    
+    Returns:
+        index_columns (list): Lista com o nome das colunas indexadas.
+    '''
+
+    data = load_yaml(file_path = yaml_file)
+
+    return list(data.get('index_columns', list()))
+
+
+def return_cache_dir(yaml_file):
+    '''
+    Retorna a pasta do cache colunar das tabelas tratadas.
+
+    Args:
+        yaml_file (str): Caminho do arquivo .yaml com a localização dos dataframes.
+    
+    Returns:
+        cache_dir (str): Caminho da pasta onde as tabelas em cache são salvas.
+    '''
+
+    data = load_yaml(file_path = yaml_file)
+
+    return data['cache_dir']
+
+
+def return_elevation_config(yaml_file):
+    '''
+    Retorna as configurações das fontes de altitude ortométrica.
+
+    Args:
+        yaml_file (str): Caminho do arquivo .yaml com a localização dos dataframes.
+    
+    Returns:
+        elevation_config (dict): Dicionário com as configurações. `elevation_providers` para a lista
+        de fontes em ordem de consulta, `dem_dir` para a pasta dos arquivos SRTM locais e
+        `elevation_api_url` para o endereço da API remota, `elevation_api_batch_size`, `elevation_api_rate` e
+        `elevation_api_max_workers` para os limites de uso da API. `elevation_cache_path`, `elevation_cache_resolution`
+        e `elevation_cache_max_entries` para o arquivo, a resolução em segundos de arco e o limite de pontos
+        do cache persistente das altitudes.
+    '''
+
+    data = load_yaml(file_path = yaml_file)
+
+    elevation_config = {'elevation_providers': data['elevation_providers'],
+                        'dem_dir': data['dem_dir'],
+                        'elevation_api_url': data['elevation_api_url'],
+                        'elevation_api_batch_size': data.get('elevation_api_batch_size', 100),
+                        'elevation_api_rate': data.get('elevation_api_rate', 1),
+                        'elevation_api_max_workers': data.get('elevation_api_max_workers', 4),
+                        'elevation_cache_path': data.get('elevation_cache_path'),
+                        'elevation_cache_resolution': data.get('elevation_cache_resolution', 1),
+                        'elevation_cache_max_entries': data.get('elevation_cache_max_entries', 1000000)}
+
+    return elevation_config
+
+def return_line_cache_size(yaml_file):
+    '''
+    Retorna a quantidade de conjuntos de linhas com resultados mantidos em memória.
+
+    Args:
+        yaml_file (str): Caminho do arquivo .yaml com a localização dos dataframes.
+    
+    Returns:
+        max_entries (int): Quantidade máxima de resultados salvos.
+    '''
+
+    data = load_yaml(file_path = yaml_file)
+
+    return data.get('line_cache_max_entries', 16)
+
+def return_save_out_data(yaml_file):
+    '''
+    Retorna se os arquivos exportados também devem ser salvos na pasta `out_data`.
+
+    Args:
+        yaml_file (str): Caminho do arquivo .yaml com a localização dos dataframes.
+    
+    Returns:
+        save_out_data (bool): Indica se os arquivos exportados são salvos em disco.
+    '''
+
+    data = load_yaml(file_path = yaml_file)
+
+    return bool(data.get('save_out_data', False))
+
+def return_map_render_mode(yaml_file):
+    '''
+    Retorna o modo de renderização dos mapas.
+
+    Args:
+        yaml_file (str): Caminho do arquivo .yaml com a localização dos dataframes.
+    
+    Returns:
+        map_mode (str): `geojson` para camadas GeoJSON em canvas ou `markers` para um marcador por elemento.
+    '''
+
+    data = load_yaml(file_path = yaml_file)
+
+    return data.get('map_render_mode', 'geojson')
+
+def return_profiling_config(yaml_file):
+    '''
+    Retorna as configurações da instrumentação das etapas da interface.
+
+    Args:
+        yaml_file (str): Caminho do arquivo .yaml com a localização dos dataframes.
+    
+    Returns:
+        profiling_config (dict): Dicionário com as configurações. `enabled` ativa o registro das etapas e
+        `log_path` arquivo JSON lines onde as execuções são registradas, `None` para não registrar.
+    '''
+
+    data = load_yaml(file_path = yaml_file)
+
+    profiling_config = {'enabled': bool(data.get('profiling_enabled', False)),
+                        'log_path': data.get('profiling_log_path') or None}
+
+    return profiling_config
+
+
+def return_cable_config(yaml_file):
+    '''
+    Retorna as configurações da análise de flecha e distância ao solo dos cabos.
+
+    Args:
+        yaml_file (str): Caminho do arquivo .yaml com a localização dos dataframes.
+    
+    Returns:
+        cable_config (dict): Dicionário com as configurações. `cables_dir` pasta com as tabelas de cabos por
+        conjunto de linhas, `model` curva do cabo (`catenary` ou `parabola`), `clearance_base` distância básica
+        ao solo em metros e `kv_factor` acréscimo da distância mínima por kV.
+    '''
+
+    data = load_yaml(file_path = yaml_file)
+
+    cable_config = {'cables_dir': data.get('cables_dir', 'data/unprocessed-tables/cabos-lts/por-linhas'),
+                    'model': data.get('cable_model', 'catenary'),
+                    'clearance_base': data.get('cable_clearance_base', 6.0),
+                    'kv_factor': data.get('cable_clearance_kv_factor', 0.01)}
+
+    return cable_config
+
+def return_terrain_config(yaml_file):
+    '''
+    Retorna as configurações do perfil longitudinal com o terreno amostrado entre as estruturas.
+
+    Args:
+        yaml_file (str): Caminho do arquivo .yaml com a localização dos dataframes.
+    
+    Returns:
+        terrain_config (dict): Dicionário com as configurações. `spacing` espaçamento das amostras em metros
+        e `max_points` limite de amostras por perfil.
+    '''
+
+    data = load_yaml(file_path = yaml_file)
+
+    terrain_config = {'spacing': float(data.get('terrain_spacing_m', 10)),
+                      'max_points': int(data.get('terrain_max_points', 300000))}
+
+    return terrain_config
+
+def return_profile_plot_config(yaml_file):
+    '''
+    Retorna as configurações do gráfico do perfil longitudinal.
+
+    Args:
+        yaml_file (str): Caminho do arquivo .yaml com a localização dos dataframes.
+    
+    Returns:
+        profile_plot_config (dict): Dicionário com as configurações. `max_points` pontos exibidos por série no
+        trecho selecionado e `max_labels` quantidade máxima de rótulos das estruturas.
+    '''
+
+    data = load_yaml(file_path = yaml_file)
+
+    profile_plot_config = {'max_points': int(data.get('profile_plot_points', 5000)),
+                           'max_labels': int(data.get('profile_max_labels', 300))}
+
+    return profile_plot_config
+
+def return_dxf_tower_attributes(yaml_file):
+    '''
+    Retorna se os blocos das estruturas do .dxf incluem os atributos ocultos ID, tipo e altura.
+
+    Args:
+        yaml_file (str): Caminho do arquivo .yaml com a localização dos dataframes.
+    
+    Returns:
+        dxf_tower_attributes (bool): Indica se os atributos ocultos são incluídos.
+    '''
+
+    data = load_yaml(file_path = yaml_file)
+
+    return bool(data.get('dxf_tower_attributes', False))
\ No newline at end of file
@@ -0,0 +1,223 @@
+from contextlib import contextmanager
+import threading
+import datetime
+import json
+import time
+import os
+
+class stage_profiler:
+    '''
+    Instrumentação leve das etapas de uma execução do script: tempo de cada etapa, linhas processadas
+    e contadores (requisições HTTP, bytes gerados, transformadores construídos, ...). Desativada por padrão,
+    quando cada chamada apenas retorna. Os registros de uma execução ficam por thread, já que cada sessão
+    do Streamlit executa o script na sua própria thread.
+    '''
+
+    def __init__(self, enabled = False, log_path = None):
+        '''
+        Construtor da classe.
+
+        Args:
+            enabled (bool): Ativa o registro das etapas.
+            log_path (str): Arquivo JSON lines onde cada execução é acrescentada. Caso não seja informado, não registra.
+
+        Returns:
+            None
+        '''
+
+        self.enabled = enabled
+        self.log_path = log_path
+        self.gauges = dict()
+        self.local = threading.local()
+        self.lock = threading.Lock()
+
+    def configure(self, enabled = False, log_path = None):
+        '''
+        Altera a configuração da instrumentação.
+
+        Args:
+            enabled (bool): Ativa o registro das etapas.
+            log_path (str): Arquivo JSON lines das execuções. Caso não seja informado, não registra.
+
+        Returns:
+            None
+        '''
+
+        self.enabled = enabled
+        self.log_path = log_path or None
+
+    def add_gauge(self, name, read):
+        '''
+        Registra um contador acumulado do processo, ex.: `utm_transformer.cache_info().misses`. A execução
+        reporta a diferença entre o valor ao final e o valor no início.
+
+        Args:
+            name (str): Nome do contador.
+            read (function): Função sem argumentos que retorna o valor atual.
+
+        Returns:
+            None
+        '''
+
+        self.gauges[name] = read
+
+    def read_gauges(self):
+        '''
+        Lê o valor atual dos contadores acumulados.
+
+        Args:
+            None
+
+        Returns:
+            values (dict): Valor de cada contador registrado.
+        '''
+
+        return {name: read() for name, read in self.gauges.items()}
+
+    def current(self):
+        '''
+        Retorna os registros da execução em andamento na thread atual.
+
+        Args:
+            None
+
+        Returns:
+            run (dict): Registros da execução, `None` caso nenhuma tenha sido iniciada.
+        '''
+
+        return getattr(self.local, 'run', None)
+
+    def start(self, **context):
+        '''
+        Inicia os registros de uma nova execução na thread atual.
+
+        Args:
+            context (dict): Informações da execução, ex.: `label` conjunto de linhas selecionado.
+
+        Returns:
+            None
+        '''
+
+        if not self.enabled:
+            self.local.run = None
+            return
+
+        self.local.run = {'context': dict(context), 'stages': list(), 'counters': dict(), 'depth': 0,
+                          'gauges': self.read_gauges(), 'start': time.perf_counter(),
+                          'timestamp': datetime.datetime.now().isoformat(timespec = 'seconds')}
+
+    def annotate(self, **context):
+        '''
+        Acrescenta informações à execução em andamento.
+
+        Args:
+            context (dict): Informações da execução.
+
+        Returns:
+            None
+        '''
+
+        run = self.current()
+        if run is not None:
+            run['context'].update(context)
+
+    @contextmanager
+    def stage(self, name, rows = None):
+        '''
+        Mede o tempo de uma etapa. Etapas podem ser aninhadas. Fora de uma execução iniciada (ex.: arquivos
+        gerados apenas no clique de download), a etapa é registrada diretamente no arquivo de log.
+
+        Args:
+            name (str): Nome da etapa.
+            rows (int): Quantidade de linhas processadas, se conhecida antes da etapa.
+
+        Returns:
+            info (dict): Registro da etapa, onde `rows` pode ser preenchido durante a etapa.
+        '''
+
+        if not self.enabled:
+            yield dict()
+            return
+
+        run = self.current()
+        info = {'stage': name, 'rows': rows, 'depth': run['depth'] if run is not None else 0}
+        if run is not None:
+            run['stages'].append(info)
+            run['depth'] += 1
+
+        start = time.perf_counter()
+        try:
+            yield info
+        finally:
+            info['elapsed'] = time.perf_counter() - start
+            if run is not None:
+                run['depth'] -= 1
+            else:
+                self.write_log({'timestamp': datetime.datetime.now().isoformat(timespec = 'seconds'), 'context': dict(),
+                                'stages': [info], 'counters': dict()})
+
+    def count(self, name, value = 1):
+        '''
+        Incrementa um contador da execução em andamento.
+
+        Args:
+            name (str): Nome do contador, ex.: `http_calls` ou `bytes_written`.
+            value (int): Valor acrescentado.
+
+        Returns:
+            None
+        '''
+
+        run = self.current()
+        if run is not None:
+            run['counters'][name] = run['counters'].get(name, 0) + value
+
+    def report(self):
+        '''
+        Resume a execução em andamento.
+
+        Args:
+            None
+
+        Returns:
+            report (dict): `timestamp`, `context`, `total` tempo desde o início em segundos, `stages` lista de etapas
+            (`stage`, `elapsed`, `rows`, `depth`) e `counters` contadores da execução e diferenças dos contadores
+            acumulados. `None` caso a instrumentação esteja desativada.
+        '''
+
+        run = self.current()
+        if run is None:
+            return None
+
+        counters = dict(run['counters'])
+        for name, value in self.read_gauges().items():
+            counters[name] = value - run['gauges'].get(name, 0)
+
+        return {'timestamp': run['timestamp'], 'context': run['context'], 'total': time.perf_counter() - run['start'],
+                'stages': [dict(stage) for stage in run['stages']], 'counters': counters}
+
+    def write_log(self, report):
+        '''
+        Acrescenta um resumo de execução ao arquivo JSON lines, caso configurado.
+
+        Args:
+            report (dict): Resumo retornado por `report`.
+
+        Returns:
+            None
+        '''
+
+        if self.log_path is None or report is None:
+            return
+
+        folder = os.path.dirname(self.log_path)
+        if folder:
+            os.makedirs(folder, exist_ok = True)
+
+        line = json.dumps(report, ensure_ascii = False, default = str)
+        with self.lock:
+            with open(self.log_path, 'a', encoding = 'utf-8') as file:
+                file.write(line + '\n')
+
+# Instrumentação compartilhada pelos módulos do processo, configurada pela interface
+profiler = stage_profiler()
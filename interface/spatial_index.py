@@ -0,0 +1,392 @@
+from geo_coords import wgs84_geod
+import pandas as pd
+import numpy as np
+import threading
+
+# Metros por grau de latitude (valor mínimo no elipsoide) e de longitude no equador
+meters_per_degree_lat = 110574.0
+meters_per_degree_lon = 111320.0
+
+class spatial_index:
+    '''
+    Índice espacial em grade regular de latitude e longitude sobre pontos da rede (estruturas, centros
+    de vãos e subestações), com consultas de vizinhos mais próximos, raio e retângulo envolvente.
+    '''
+
+    def __init__(self, points, cell_size = 0.01):
+        '''
+        Construtor da classe. O índice é construído uma única vez sobre todos os pontos.
+
+        Args:
+            points (dataframe): Pontos indexados, com as colunas `TIPO`, `CODIGO`, `COD_LT_SAP`, `LAT` e `LON`.
+            Colunas extras são mantidas e retornadas nas consultas. Pontos sem coordenadas são descartados.
+            cell_size (float): Tamanho das células da grade em graus.
+
+        Returns:
+            None
+        '''
+
+        points = points.dropna(subset = ['LAT', 'LON']).reset_index(drop = True)
+
+        self.points = points
+        self.cell_size = cell_size
+        self.lats = points['LAT'].to_numpy(dtype = 'float64')
+        self.lons = points['LON'].to_numpy(dtype = 'float64')
+        self.kinds = points['TIPO'].to_numpy()
+
+        # Grade: célula (linha, coluna) -> posições dos pontos
+        rows = np.floor(self.lats / cell_size).astype('int64')
+        cols = np.floor(self.lons / cell_size).astype('int64')
+        order = np.lexsort((cols, rows))
+        cells = np.stack([rows[order], cols[order]], axis = 1)
+        starts = np.flatnonzero(np.r_[True, np.any(cells[1:] != cells[:-1], axis = 1)])[:len(order)]
+        ends = np.r_[starts[1:], len(order)]
+        self.cells = {(int(cells[start, 0]), int(cells[start, 1])): order[start:end] for start, end in zip(starts, ends)}
+
+        # Latitudes ordenadas para as consultas por retângulo envolvente
+        self.lat_order = np.argsort(self.lats, kind = 'stable')
+        self.sorted_lats = self.lats[self.lat_order]
+
+        # Maior alcance de faixa de servidão a partir do centro de um vão, usado na busca de invasões
+        self.max_reach = 0.0
+        if 'LARGURA_MAX' in points.columns and 'MEIO_VAO_M' in points.columns:
+            reach = points['MEIO_VAO_M'] + points['LARGURA_MAX']
+            self.max_reach = float(np.nanmax(reach)) if reach.notna().any() else 0.0
+
+    def __len__(self):
+        '''
+        Retorna a quantidade de pontos indexados.
+
+        Args:
+            None
+
+        Returns:
+            size (int): Quantidade de pontos.
+        '''
+
+        return len(self.points)
+
+    def cell_candidates(self, min_lat, min_lon, max_lat, max_lon):
+        '''
+        Retorna as posições dos pontos das células que interceptam um retângulo em graus.
+
+        Args:
+            min_lat, min_lon, max_lat, max_lon (float): Limites do retângulo.
+
+        Returns:
+            positions (array): Posições dos pontos candidatos.
+        '''
+
+        row_min, row_max = int(np.floor(min_lat / self.cell_size)), int(np.floor(max_lat / self.cell_size))
+        col_min, col_max = int(np.floor(min_lon / self.cell_size)), int(np.floor(max_lon / self.cell_size))
+
+        # Percorre as células do retângulo ou, se forem mais numerosas, as células ocupadas
+        if (row_max - row_min + 1) * (col_max - col_min + 1) <= len(self.cells):
+            keys = ((row, col) for row in range(row_min, row_max + 1) for col in range(col_min, col_max + 1))
+            blocks = [self.cells[key] for key in keys if key in self.cells]
+        else:
+            blocks = [positions for (row, col), positions in self.cells.items()
+                      if row_min <= row <= row_max and col_min <= col <= col_max]
+
+        return np.concatenate(blocks) if blocks else np.array([], dtype = 'int64')
+
+    def filter_kinds(self, positions, kinds):
+        '''
+        Mantém apenas as posições dos tipos de ponto informados.
+
+        Args:
+            positions (array): Posições dos pontos.
+            kinds (list): Tipos mantidos (`estrutura`, `vao` ou `subestacao`). Caso não seja informado, mantém todos.
+
+        Returns:
+            positions (array): Posições filtradas.
+        '''
+
+        if kinds is None:
+            return positions
+
+        return positions[np.isin(self.kinds[positions], list(kinds))]
+
+    def distances(self, latitude, longitude, positions):
+        '''
+        Distâncias geodésicas de uma coordenada até os pontos informados.
+
+        Args:
+            latitude (float): Latitude de referência.
+            longitude (float): Longitude de referência.
+            positions (array): Posições dos pontos.
+
+        Returns:
+            distances (array): Distâncias em metros.
+        '''
+
+        size = len(positions)
+        _, _, distances = wgs84_geod.inv(np.full(size, longitude), np.full(size, latitude),
+                                         self.lons[positions], self.lats[positions])
+
+        return np.asarray(distances, dtype = 'float64')
+
+    def result(self, positions, distances = None):
+        '''
+        Monta o dataframe de resposta das consultas.
+
+        Args:
+            positions (array): Posições dos pontos encontrados.
+            distances (array): Distâncias até a coordenada de referência, quando houver.
+
+        Returns:
+            df (dataframe): Pontos encontrados, com a coluna `DIST_M` quando há distâncias.
+        '''
+
+        df = self.points.iloc[positions]
+        if distances is not None:
+            df = df.assign(DIST_M = distances)
+
+        return df
+
+    def radius(self, latitude, longitude, radius_m, kinds = None):
+        '''
+        Busca os pontos a até uma distância de uma coordenada.
+
+        Args:
+            latitude (float): Latitude de referência.
+            longitude (float): Longitude de referência.
+            radius_m (float): Raio de busca em metros.
+            kinds (list): Tipos de ponto considerados. Caso não seja informado, considera todos.
+
+        Returns:
+            df (dataframe): Pontos encontrados, ordenados pela distância (`DIST_M`).
+        '''
+
+        # Retângulo em graus que contém o círculo de busca
+        delta_lat = radius_m / meters_per_degree_lat
+        max_abs_lat = min(abs(latitude) + delta_lat, 89.9)
+        delta_lon = min(radius_m / (meters_per_degree_lon * np.cos(np.radians(max_abs_lat))), 180.0)
+
+        positions = self.cell_candidates(latitude - delta_lat, longitude - delta_lon, latitude + delta_lat, longitude + delta_lon)
+        positions = self.filter_kinds(positions, kinds)
+
+        distances = self.distances(latitude, longitude, positions)
+        inside = distances <= radius_m
+        positions, distances = positions[inside], distances[inside]
+        order = np.argsort(distances, kind = 'stable')
+
+        return self.result(positions[order], distances[order])
+
+    def knn(self, latitude, longitude, k = 5, kinds = None):
+        '''
+        Busca os `k` pontos mais próximos de uma coordenada.
+
+        Args:
+            latitude (float): Latitude de referência.
+            longitude (float): Longitude de referência.
+            k (int): Quantidade de pontos retornados.
+            kinds (list): Tipos de ponto considerados. Caso não seja informado, considera todos.
+
+        Returns:
+            df (dataframe): Pontos mais próximos, ordenados pela distância (`DIST_M`).
+        '''
+
+        total = len(self.filter_kinds(np.arange(len(self.points)), kinds))
+        k = min(k, total)
+        if k <= 0:
+            return self.result(np.array([], dtype = 'int64'), np.array([]))
+
+        # Amplia o raio de busca até encontrar `k` pontos, a busca por raio é exata
+        radius_m = self.cell_size * meters_per_degree_lat
+        while True:
+            df = self.radius(latitude, longitude, radius_m, kinds = kinds)
+            if len(df) >= k or radius_m > 2.1e7:
+                return df.iloc[:k]
+            radius_m *= 2
+
+    def bbox(self, min_lat, min_lon, max_lat, max_lon, kinds = None):
+        '''
+        Busca os pontos dentro de um retângulo envolvente.
+
+        Args:
+            min_lat, min_lon (float): Canto inferior esquerdo do retângulo.
+            max_lat, max_lon (float): Canto superior direito do retângulo.
+            kinds (list): Tipos de ponto considerados. Caso não seja informado, considera todos.
+
+        Returns:
+            df (dataframe): Pontos encontrados.
+        '''
+
+        start = np.searchsorted(self.sorted_lats, min_lat, side = 'left')
+        end = np.searchsorted(self.sorted_lats, max_lat, side = 'right')
+        positions = self.lat_order[start:end]
+        positions = positions[(self.lons[positions] >= min_lon) & (self.lons[positions] <= max_lon)]
+        positions = self.filter_kinds(np.sort(positions), kinds)
+
+        return self.result(positions)
+
+    def right_of_way(self, latitude, longitude):
+        '''
+        Busca os vãos cuja faixa de servidão contém uma coordenada. A distância ao eixo do vão é medida em
+        um plano local e comparada à largura da faixa do lado (esquerdo ou direito) em que o ponto se encontra,
+        no sentido da estrutura inicial para a final.
+
+        Args:
+            latitude (float): Latitude do ponto avaliado.
+            longitude (float): Longitude do ponto avaliado.
+
+        Returns:
+            df (dataframe): Vãos com a faixa invadida, com a distância ao eixo (`DIST_EIXO_M`) e o lado (`LADO`).
+        '''
+
+        spans = self.radius(latitude, longitude, self.max_reach, kinds = ['vao'])
+        spans = spans.dropna(subset = ['LAT_INI', 'LON_INI', 'LAT_FIM', 'LON_FIM'])
+
+        axis_distance, left = axis_offset(latitude, longitude, spans['LAT_INI'].to_numpy(), spans['LON_INI'].to_numpy(),
+                                          spans['LAT_FIM'].to_numpy(), spans['LON_FIM'].to_numpy())
+        width = np.where(left, spans['LARGURA_ESQ'].to_numpy(), spans['LARGURA_DIR'].to_numpy())
+        inside = axis_distance <= width
+
+        return spans.assign(DIST_EIXO_M = axis_distance, LADO = np.where(left, 'esquerdo', 'direito'))[inside]
+
+def valid_coordinates(latitudes, longitudes):
+    '''
+    Identifica as coordenadas geográficas válidas: finitas, com latitude entre -90 e 90 e longitude entre -180 e 180.
+
+    Args:
+        latitudes (array): Latitudes em graus.
+        longitudes (array): Longitudes em graus.
+
+    Returns:
+        valid (array): Máscara das coordenadas válidas.
+    '''
+
+    latitudes, longitudes = np.asarray(latitudes, dtype = 'float64'), np.asarray(longitudes, dtype = 'float64')
+    with np.errstate(invalid = 'ignore'):
+        return (np.abs(latitudes) <= 90) & (np.abs(longitudes) <= 180)
+
+def axis_offset(latitude, longitude, lat_ini, lon_ini, lat_fim, lon_fim):
+    '''
+    Distância de pontos ao eixo dos vãos (segmento entre as estruturas), medida em um plano local centrado
+    em cada ponto, e o lado do eixo em que cada ponto se encontra, no sentido da estrutura inicial para a final.
+
+    Args:
+        latitude, longitude (float ou array): Coordenadas dos pontos avaliados.
+        lat_ini, lon_ini, lat_fim, lon_fim (array): Coordenadas das estruturas de cada vão.
+
+    Returns:
+        distance (array): Distância ao eixo em metros.
+        left (array): Verdadeiro quando o ponto está à esquerda do eixo.
+    '''
+
+    # Plano local centrado no ponto avaliado
+    scale_lon = meters_per_degree_lon * np.cos(np.radians(latitude))
+    ax = (lon_ini - longitude) * scale_lon
+    ay = (lat_ini - latitude) * meters_per_degree_lat
+    bx = (lon_fim - longitude) * scale_lon
+    by = (lat_fim - latitude) * meters_per_degree_lat
+
+    # Ponto mais próximo do segmento em relação à origem
+    dx, dy = bx - ax, by - ay
+    length2 = dx ** 2 + dy ** 2
+    with np.errstate(invalid = 'ignore', divide = 'ignore'):
+        t = np.clip(np.where(length2 > 0, -(ax * dx + ay * dy) / length2, 0.0), 0.0, 1.0)
+    distance = np.hypot(ax + t * dx, ay + t * dy)
+
+    # Produto vetorial positivo indica o ponto à esquerda do sentido do vão
+    left = (dx * -ay - dy * -ax) > 0
+
+    return distance, left
+
+def network_points(store, df_paths):
+    '''
+    Reúne as estruturas, os centros dos vãos e as subestações em um único dataframe de pontos.
+
+    Args:
+        store (table_store): Armazenamento das tabelas em memória.
+        df_paths (dict): Dicionário com os caminhos das tabelas: `df_path_towers`, `df_path_conexions`
+        e `df_path_substations`.
+
+    Returns:
+        points (dataframe): Pontos da rede no formato esperado por `spatial_index`.
+    '''
+
+    # Códigos faltantes continuam faltantes, em vez do texto 'nan' compartilhado por todos eles
+    as_code = lambda column: column.astype(str).where(column.notna())
+
+    towers = store.load_table(df_paths['df_path_towers'])
+    towers = pd.DataFrame({'TIPO': 'estrutura', 'CODIGO': as_code(towers['COD_ESTRUTURA_SAP']),
+                           'COD_LT_SAP': as_code(towers['COD_LT_SAP']),
+                           'LAT': towers['NUM_LATITUDE'].astype('float64'), 'LON': towers['NUM_LONGITUDE'].astype('float64')})
+    towers = towers[valid_coordinates(towers['LAT'], towers['LON'])]
+
+    # Coordenadas das extremidades dos vãos, completadas pela tabela de estruturas quando faltantes ou inválidas
+    known = towers.dropna(subset = ['CODIGO']).drop_duplicates(subset = 'CODIGO').set_index('CODIGO')
+    tower_lat, tower_lon = known['LAT'], known['LON']
+    spans = store.load_table(df_paths['df_path_conexions'])
+    ends = dict()
+    for ref in ['INI', 'FIM']:
+        codes = as_code(spans[f'COD_ESTRUTURA_{ref}_SAP'])
+        lat = spans[f'NUM_LATITUDE_ESTRUTURA_{ref}'].astype('float64')
+        lon = spans[f'NUM_LONGITUDE_ESTRUTURA_{ref}'].astype('float64')
+        valid = valid_coordinates(lat, lon)
+        ends[f'LAT_{ref}'] = lat.where(valid).fillna(codes.map(tower_lat))
+        ends[f'LON_{ref}'] = lon.where(valid).fillna(codes.map(tower_lon))
+    lat_ini, lon_ini, lat_fim, lon_fim = [ends[name].to_numpy() for name in ['LAT_INI', 'LON_INI', 'LAT_FIM', 'LON_FIM']]
+    spans = pd.DataFrame({'TIPO': 'vao', 'CODIGO': as_code(spans['COD_VAO_SAP']), 'COD_LT_SAP': as_code(spans['COD_LT_SAP']),
+                          'LAT': spans['NUM_LATITUDE_PONTO_CENTRAL'].astype('float64'),
+                          'LON': spans['NUM_LONGITUDE_PONTO_CENTRAL'].astype('float64'),
+                          'LAT_INI': lat_ini, 'LON_INI': lon_ini, 'LAT_FIM': lat_fim, 'LON_FIM': lon_fim,
+                          'LARGURA_ESQ': spans['VAL_LARGURA_FAIXA_ESQ'], 'LARGURA_DIR': spans['VAL_LARGURA_FAIXA_DIR']})
+    spans['LARGURA_MAX'] = spans[['LARGURA_ESQ', 'LARGURA_DIR']].max(axis = 1)
+
+    # Centro cadastrado fora do intervalo válido (ex.: latitude e longitude trocadas ou coordenadas UTM) ou fora
+    # da faixa de servidão do eixo é substituído pelo ponto médio da geodésica entre as estruturas
+    azimuth, _, span_length = wgs84_geod.inv(lon_ini, lat_ini, lon_fim, lat_fim)
+    mid_lon, mid_lat, _ = wgs84_geod.fwd(lon_ini, lat_ini, azimuth, span_length / 2)
+    has_ends = valid_coordinates(lat_ini, lon_ini) & valid_coordinates(lat_fim, lon_fim)
+    center_lat, center_lon = spans['LAT'].to_numpy(), spans['LON'].to_numpy()
+    stored = valid_coordinates(center_lat, center_lon)
+    offset, _ = axis_offset(np.where(stored, center_lat, 0.0), np.where(stored, center_lon, 0.0), lat_ini, lon_ini, lat_fim, lon_fim)
+    replace = has_ends & (~stored | ~(offset <= np.fmax(spans['LARGURA_MAX'].fillna(0).to_numpy(), 1.0)))
+    spans['LAT'] = np.where(replace, mid_lat, center_lat)
+    spans['LON'] = np.where(replace, mid_lon, center_lon)
+
+    # Alcance do centro até a estrutura mais distante: metade do vão quando o centro é o ponto médio
+    _, _, to_ini = wgs84_geod.inv(spans['LON'].to_numpy(), spans['LAT'].to_numpy(), lon_ini, lat_ini)
+    _, _, to_fim = wgs84_geod.inv(spans['LON'].to_numpy(), spans['LAT'].to_numpy(), lon_fim, lat_fim)
+    spans['MEIO_VAO_M'] = np.where(has_ends, np.fmax(to_ini, to_fim), np.nan)
+
+    substations = store.load_table(df_paths['df_path_substations'])
+    substations = pd.DataFrame({'TIPO': 'subestacao', 'CODIGO': as_code(substations['COD_SE_SAP']),
+                                'NOME': substations['NOM_SE_SAP'], 'LAT': substations['NUM_LATITUDE'],
+                                'LON': substations['NUM_LONGITUDE']})
+
+    points = pd.concat([towers, spans, substations], ignore_index = True)
+    points[['LAT', 'LON']] = points[['LAT', 'LON']].astype('float64')
+
+    # Pontos sem coordenadas geográficas válidas não são indexados
+    return points[valid_coordinates(points['LAT'], points['LON'])].reset_index(drop = True)
+
+# Instância compartilhada pelo processo, reconstruída quando a versão dos dados muda
+_shared_index = None
+_shared_version = None
+_shared_lock = threading.Lock()
+
+def shared_spatial_index(store, df_paths, version):
+    '''
+    Retorna o índice espacial da rede, construído uma única vez por versão dos dados.
+
+    Args:
+        store (table_store): Armazenamento das tabelas em memória.
+        df_paths (dict): Dicionário com os caminhos das tabelas.
+        version (str): Versão atual dos dados de origem.
+
+    Returns:
+        index (spatial_index): Índice espacial de toda a rede.
+    '''
+
+    global _shared_index, _shared_version
+
+    with _shared_lock:
+        if _shared_index is None or _shared_version != version:
+            _shared_index = spatial_index(network_points(store, df_paths))
+            _shared_version = version
+
+    return _shared_index
@@ -0,0 +1,325 @@
+import pandas as pd
+import hashlib
+import json
+import os
+
+class table_cache:
+    '''
+    Cache colunar (.parquet) das tabelas do GEO BDIT tratadas, reconstruído apenas quando o .csv de origem muda.
+    '''
+
+    def __init__(self, cache_dir):
+        '''
+        Construtor da classe.
+
+        Args:
+            cache_dir (str): Pasta onde os arquivos em cache e seus manifestos são salvos.
+
+        Returns:
+            None
+        '''
+
+        self.cache_dir = cache_dir
+
+    def cache_name(self, csv_path):
+        '''
+        Retorna o nome dos arquivos em cache de um .csv: o nome do arquivo seguido do hash do caminho absoluto,
+        para que tabelas com o mesmo nome em pastas diferentes não compartilhem o cache.
+
+        Args:
+            csv_path (str): Caminho para o arquivo .csv de origem.
+
+        Returns:
+            name (str): Nome sem extensão, ex.: `estruturas-3f2a9c1b7d04`.
+        '''
+
+        name = os.path.splitext(os.path.basename(csv_path))[0]
+        digest = hashlib.sha256(os.path.abspath(csv_path).encode('utf-8')).hexdigest()[:12]
+
+        return f'{name}-{digest}'
+
+    def cache_path(self, csv_path):
+        '''
+        Retorna o caminho do arquivo colunar correspondente a um .csv.
+
+        Args:
+            csv_path (str): Caminho para o arquivo .csv de origem.
+
+        Returns:
+            path (str): Caminho do arquivo .parquet em cache.
+        '''
+
+        return os.path.join(self.cache_dir, f'{self.cache_name(csv_path)}.parquet')
+
+    def manifest_path(self, csv_path):
+        '''
+        Retorna o caminho do manifesto com a assinatura do .csv usado no cache.
+
+        Args:
+            csv_path (str): Caminho para o arquivo .csv de origem.
+
+        Returns:
+            path (str): Caminho do manifesto .json.
+        '''
+
+        return os.path.join(self.cache_dir, f'{self.cache_name(csv_path)}.json')
+
+    def file_hash(self, file_path, chunk_size = 1 << 20):
+        '''
+        Calcula o hash sha256 do conteúdo de um arquivo.
+
+        Args:
+            file_path (str): Caminho do arquivo.
+            chunk_size (int): Tamanho dos blocos de leitura em bytes.
+
+        Returns:
+            digest (str): Hash hexadecimal do arquivo.
+        '''
+
+        sha = hashlib.sha256()
+        with open(file_path, 'rb') as file:
+            for chunk in iter(lambda: file.read(chunk_size), b''):
+                sha.update(chunk)
+
+        return sha.hexdigest()
+
+    def source_signature(self, csv_path):
+        '''
+        Retorna a assinatura rápida do arquivo de origem, sem leitura do conteúdo.
+
+        Args:
+            csv_path (str): Caminho para o arquivo .csv de origem.
+
+        Returns:
+            signature (dict): Dicionário com `mtime_ns` e `size` do arquivo.
+        '''
+
+        stat = os.stat(csv_path)
+
+        return {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size}
+
+    def data_version(self, df_paths):
+        '''
+        Retorna a versão dos dados de origem, alterada sempre que algum dos .csv é modificado.
+
+        Args:
+            df_paths (dict): Dicionário com os caminhos das tabelas.
+
+        Returns:
+            version (str): Identificador curto da versão dos dados.
+        '''
+
+        sha = hashlib.sha256()
+        for csv_path in sorted(df_paths.values()):
+            signature = self.source_signature(csv_path)
+            sha.update(f"{csv_path}:{signature['mtime_ns']}:{signature['size']};".encode('utf-8'))
+
+        return sha.hexdigest()[:16]
+
+    def line_versions_path(self):
+        '''
+        Retorna o caminho do registro das versões por conjunto de linhas.
+
+        Args:
+            None
+
+        Returns:
+            path (str): Caminho do arquivo .json.
+        '''
+
+        return os.path.join(self.cache_dir, 'line_versions.json')
+
+    def read_line_versions(self):
+        '''
+        Lê o registro das versões por conjunto de linhas, mantido pelas atualizações incrementais.
+
+        Args:
+            None
+
+        Returns:
+            line_versions (dict): `data_version` versão dos dados do registro, `epoch` versão base e `lines`
+            quantidade de atualizações por código SAP do conjunto. `None` caso não exista.
+        '''
+
+        try:
+            with open(self.line_versions_path(), 'r') as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+
+    def bump_line_versions(self, previous_version, version, line_codes):
+        '''
+        Registra uma atualização incremental: apenas os conjuntos de linhas afetados mudam de versão.
+
+        Args:
+            previous_version (str): Versão dos dados antes da atualização.
+            version (str): Versão dos dados depois da atualização.
+            line_codes (list): Códigos SAP dos conjuntos de linhas afetados.
+
+        Returns:
+            None
+        '''
+
+        line_versions = self.read_line_versions()
+
+        # Caso os dados tenham mudado por outro meio, as versões por conjunto recomeçam
+        if line_versions is None or line_versions['data_version'] != previous_version:
+            line_versions = {'epoch': previous_version, 'lines': dict()}
+
+        for code in line_codes:
+            line_versions['lines'][code] = line_versions['lines'].get(code, 0) + 1
+        line_versions['data_version'] = version
+
+        os.makedirs(self.cache_dir, exist_ok = True)
+        path = self.line_versions_path()
+        with open(f'{path}.tmp', 'w') as file:
+            json.dump(line_versions, file)
+        os.replace(f'{path}.tmp', path)
+
+    def line_token(self, version, line_code, line_versions = None):
+        '''
+        Retorna a versão de um conjunto de linhas, usada como chave dos resultados e exportações por conjunto.
+        Após uma atualização incremental, muda apenas para os conjuntos afetados.
+
+        Args:
+            version (str): Versão atual dos dados de origem.
+            line_code (str): Código SAP do conjunto de linhas.
+            line_versions (dict): Registro já lido por `read_line_versions`. Caso não seja informado, é lido do disco.
+
+        Returns:
+            token (str): Versão do conjunto de linhas.
+        '''
+
+        if line_versions is None:
+            line_versions = self.read_line_versions()
+
+        if line_versions is None or line_versions['data_version'] != version:
+            return f'{version}:0'
+
+        return f"{line_versions['epoch']}:{line_versions['lines'].get(line_code, 0)}"
+
+    def read_manifest(self, csv_path):
+        '''
+        Lê o manifesto do cache de uma tabela.
+
+        Args:
+            csv_path (str): Caminho para o arquivo .csv de origem.
+
+        Returns:
+            manifest (dict): Dados do manifesto ou `None` caso não exista.
+        '''
+
+        try:
+            with open(self.manifest_path(csv_path), 'r') as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+
+    def write_manifest(self, csv_path, manifest):
+        '''
+        Salva o manifesto do cache de forma atômica.
+
+        Args:
+            csv_path (str): Caminho para o arquivo .csv de origem.
+            manifest (dict): Dados do manifesto.
+
+        Returns:
+            None
+        '''
+
+        path = self.manifest_path(csv_path)
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w') as file:
+            json.dump(manifest, file)
+        os.replace(tmp_path, path)
+
+    def is_valid(self, csv_path):
+        '''
+        Verifica se o cache ainda corresponde ao .csv de origem. Caso apenas o mtime tenha mudado,
+        o conteúdo é comparado pelo hash antes de invalidar o cache.
+
+        Args:
+            csv_path (str): Caminho para o arquivo .csv de origem.
+
+        Returns:
+            valid (bool): Indica se o arquivo em cache pode ser utilizado.
+        '''
+
+        manifest = self.read_manifest(csv_path)
+        if manifest is None or not os.path.exists(self.cache_path(csv_path)):
+            return False
+
+        signature = self.source_signature(csv_path)
+        if signature['mtime_ns'] == manifest['mtime_ns'] and signature['size'] == manifest['size']:
+            return True
+
+        if signature['size'] != manifest['size'] or self.file_hash(csv_path) != manifest['sha256']:
+            return False
+
+        # Conteúdo idêntico com mtime diferente, apenas atualiza o manifesto
+        manifest.update(signature)
+        self.write_manifest(csv_path, manifest)
+
+        return True
+
+    def typed_dataframe(self, df):
+        '''
+        Aplica os tipos das colunas: coordenadas e altitudes em float64 e códigos SAP como categóricos.
+
+        Args:
+            df (dataframe): Dataframe lido do .csv.
+
+        Returns:
+            df (dataframe): Dataframe com os tipos aplicados.
+        '''
+
+        for column in df.columns:
+            if column.startswith(('NUM_LATITUDE', 'NUM_LONGITUDE', 'NUM_ALTITUDE')):
+                df[column] = pd.to_numeric(df[column], errors = 'coerce').astype('float64')
+            elif column.startswith(('COD_', 'CODIGO_SAP')):
+                df[column] = df[column].astype('category')
+
+        return df
+
+    def build(self, csv_path):
+        '''
+        Converte o .csv para o arquivo colunar tipado e registra o manifesto.
+
+        Args:
+            csv_path (str): Caminho para o arquivo .csv de origem.
+
+        Returns:
+            df (dataframe): Dataframe tipado salvo no cache.
+        '''
+
+        os.makedirs(self.cache_dir, exist_ok = True)
+
+        signature = self.source_signature(csv_path)
+        df = self.typed_dataframe(pd.read_csv(csv_path))
+
+        # Escreve em arquivo temporário para não expor um cache incompleto
+        path = self.cache_path(csv_path)
+        tmp_path = f'{path}.tmp'
+        df.to_parquet(tmp_path, index = False)
+        os.replace(tmp_path, path)
+
+        manifest = {'source': csv_path, 'sha256': self.file_hash(csv_path), **signature}
+        self.write_manifest(csv_path, manifest)
+
+        return df
+
+    def read_table(self, csv_path):
+        '''
+        Retorna a tabela a partir do cache, reconstruindo-o caso o .csv tenha mudado.
+
+        Args:
+            csv_path (str): Caminho para o arquivo .csv de origem.
+
+        Returns:
+            df (dataframe): Dataframe tipado da tabela.
+        '''
+
+        if not self.is_valid(csv_path):
+            return self.build(csv_path)
+
+        return pd.read_parquet(self.cache_path(csv_path))
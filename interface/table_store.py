@@ -0,0 +1,201 @@
+import pandas as pd
+import threading
+
+class table_store:
+    '''
+    Armazena em memória as tabelas do GEO BDIT com índices de busca por coluna.
+    '''
+
+    def __init__(self, index_columns = None, cache = None):
+        '''
+        Construtor da classe.
+
+        Args:
+            index_columns (list): Colunas que recebem índice de busca assim que a tabela é carregada.
+            cache (table_cache): Cache colunar das tabelas. Caso não seja informado, lê diretamente do .csv.
+
+        Returns:
+            None
+        '''
+
+        self.cache = cache
+        self.index_columns = list(index_columns) if index_columns is not None else list()
+        self.tables = dict()
+        self.indexes = dict()
+        self.version = None
+        self.lock = threading.RLock()
+
+    def read_table(self, csv_path):
+        '''
+        Lê a tabela do disco. Executado apenas no primeiro acesso a cada caminho.
+
+        Args:
+            csv_path (str): Caminho para o arquivo .csv.
+
+        Returns:
+            df (dataframe): Dataframe com os dados da tabela.
+        '''
+
+        if self.cache is not None:
+            return self.cache.read_table(csv_path)
+
+        return pd.read_csv(csv_path)
+
+    def load_table(self, csv_path):
+        '''
+        Retorna a tabela em memória, carregando e indexando no primeiro acesso.
+
+        Args:
+            csv_path (str): Caminho para o arquivo .csv.
+
+        Returns:
+            df (dataframe): Dataframe com os dados da tabela.
+        '''
+
+        df = self.tables.get(csv_path)
+        if df is not None:
+            return df
+
+        with self.lock:
+            if csv_path not in self.tables:
+                df = self.read_table(csv_path)
+                self.tables[csv_path] = df
+
+                # Indexa as colunas de referência presentes na tabela
+                for column_name in self.index_columns:
+                    if column_name in df.columns:
+                        self.build_index(csv_path, column_name)
+
+            return self.tables[csv_path]
+
+    def preload(self, df_paths):
+        '''
+        Carrega de uma vez todas as tabelas configuradas.
+
+        Args:
+            df_paths (dict): Dicionário com os caminhos das tabelas.
+
+        Returns:
+            None
+        '''
+
+        for csv_path in df_paths.values():
+            self.load_table(csv_path)
+
+    def build_index(self, csv_path, column_name):
+        '''
+        Cria um índice hash de valor para posições das linhas de uma coluna.
+
+        Args:
+            csv_path (str): Caminho para o arquivo .csv.
+            column_name (str): Nome da coluna a ser indexada.
+
+        Returns:
+            index (dict): Dicionário com as posições das linhas para cada valor da coluna.
+        '''
+
+        with self.lock:
+            key = (csv_path, column_name)
+            if key not in self.indexes:
+                df = self.load_table(csv_path)
+                self.indexes[key] = df.groupby(column_name, sort = False, observed = True).indices
+
+            return self.indexes[key]
+
+    def get_rows(self, csv_path, column_name, search_value):
+        '''
+        Busca as linhas em que a coluna possui o valor pesquisado.
+
+        Args:
+            csv_path (str): Caminho para o arquivo .csv.
+            column_name (str): Nome da coluna onde será feita a pesquisa.
+            search_value (str): Valor a ser pesquisado na coluna.
+
+        Returns:
+            rows (dataframe): Dataframe com as linhas encontradas, vazio caso não existam.
+        '''
+
+        df = self.load_table(csv_path)
+
+        if column_name not in df.columns:
+            raise ValueError(f'A coluna "{column_name}" não foi encontrada no arquivo.')
+
+        index = self.indexes.get((csv_path, column_name))
+        if index is None:
+            index = self.build_index(csv_path, column_name)
+
+        positions = index.get(search_value)
+        if positions is None:
+            return df.iloc[0:0]
+
+        return df.iloc[positions]
+
+    def clear(self):
+        '''
+        Descarta as tabelas e índices em memória.
+
+        Args:
+            None
+
+        Returns:
+            None
+        '''
+
+        with self.lock:
+            self.tables.clear()
+            self.indexes.clear()
+
+    def refresh(self, version):
+        '''
+        Descarta as tabelas em memória caso a versão dos dados de origem tenha mudado.
+
+        Args:
+            version (str): Versão atual dos dados de origem.
+
+        Returns:
+            changed (bool): Indica se a versão mudou e as tabelas foram descartadas.
+        '''
+
+        with self.lock:
+            if version == self.version:
+                return False
+
+            self.clear()
+            self.version = version
+
+            return True
+
+# Instância compartilhada pelo processo
+_shared_store = None
+_shared_lock = threading.Lock()
+
+def shared_store(index_columns = None, cache = None):
+    '''
+    Retorna a instância única do armazenamento de tabelas do processo. As chamadas seguintes à criação
+    podem omitir os parâmetros, mas não podem informar valores diferentes dos usados na criação.
+
+    Args:
+        index_columns (list): Colunas indexadas, usadas apenas na criação da instância.
+        cache (table_cache): Cache colunar das tabelas, usado apenas na criação da instância.
+
+    Returns:
+        store (table_store): Armazenamento de tabelas compartilhado.
+    '''
+
+    global _shared_store
+
+    with _shared_lock:
+        if _shared_store is None:
+            _shared_store = table_store(index_columns = index_columns, cache = cache)
+            return _shared_store
+
+        # O cache é comparado pela pasta, pois a interface cria uma nova instância a cada execução do script
+        cache_dir = lambda item: getattr(item, 'cache_dir', None)
+        if index_columns is not None and list(index_columns) != _shared_store.index_columns:
+            raise ValueError(f'O armazenamento compartilhado já foi criado com as colunas indexadas '
+                             f'{_shared_store.index_columns}, diferentes de {list(index_columns)}.')
+        if cache is not None and (_shared_store.cache is None or cache_dir(cache) != cache_dir(_shared_store.cache)):
+            raise ValueError(f'O armazenamento compartilhado já foi criado com outro cache colunar '
+                             f'({cache_dir(_shared_store.cache)}).')
+
+    return _shared_store
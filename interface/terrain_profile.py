@@ -0,0 +1,227 @@
+from geo_coords import wgs84_geod
+import pandas as pd
+import numpy as np
+
+class terrain_profile:
+    '''
+    Perfil longitudinal com o terreno amostrado entre as estruturas, mantido em vetores numpy:
+    distância cumulativa e altitude do terreno de cada amostra, e as posições das estruturas nesses vetores.
+    '''
+
+    def __init__(self, distances, ground, tower_index, tower_codes, tower_altitudes):
+        '''
+        Construtor da classe.
+
+        Args:
+            distances (array): Distância cumulativa de cada amostra em metros.
+            ground (array): Altitude do terreno de cada amostra, `nan` quando o DEM não cobre o ponto.
+            tower_index (array): Posição de cada estrutura nos vetores das amostras.
+            tower_codes (array): Código SAP de cada estrutura.
+            tower_altitudes (array): Altitude ortométrica cadastrada de cada estrutura.
+
+        Returns:
+            None
+        '''
+
+        self.distances = np.asarray(distances, dtype = 'float64')
+        self.ground = np.asarray(ground, dtype = 'float32')
+        self.tower_index = np.asarray(tower_index, dtype = 'int64')
+        self.tower_codes = np.asarray(tower_codes, dtype = object)
+        self.tower_altitudes = np.asarray(tower_altitudes, dtype = 'float64')
+
+    def __len__(self):
+
+        return len(self.distances)
+
+    def coverage(self):
+        '''
+        Fração das amostras com altitude do terreno disponível.
+
+        Args:
+            None
+
+        Returns:
+            coverage (float): Valor entre 0 e 1.
+        '''
+
+        return float(np.mean(np.isfinite(self.ground))) if len(self) else 0.0
+
+    def downsample(self, max_points, start = None, end = None):
+        '''
+        Reduz as amostras para a plotagem, mantendo em cada faixa da distância os pontos de menor e maior
+        altitude (min/max) e sempre as posições das estruturas.
+
+        Args:
+            max_points (int): Quantidade aproximada de amostras mantidas.
+            start (float): Distância inicial do trecho exibido em metros. Caso não seja informada, início do perfil.
+            end (float): Distância final do trecho exibido em metros. Caso não seja informada, fim do perfil.
+
+        Returns:
+            positions (array): Posições ordenadas das amostras mantidas.
+        '''
+
+        # Trecho exibido, com uma amostra além de cada extremo para a continuidade da linha
+        first = 0 if start is None else max(int(np.searchsorted(self.distances, start, side = 'left')) - 1, 0)
+        last = len(self) if end is None else min(int(np.searchsorted(self.distances, end, side = 'right')) + 1, len(self))
+        n = last - first
+        if n <= max_points:
+            return np.arange(first, last)
+
+        # Duas amostras por faixa: os vetores são completados até um múltiplo da largura da faixa
+        buckets = max(max_points // 2, 1)
+        width = int(np.ceil(n / buckets))
+        padded = np.full(buckets * width, np.nan)
+        padded[:n] = self.ground[first:last]
+        padded = padded.reshape(buckets, width)
+
+        offsets = first + np.arange(buckets) * width
+        lows = offsets + np.argmin(np.where(np.isnan(padded), np.inf, padded), axis = 1)
+        highs = offsets + np.argmax(np.where(np.isnan(padded), -np.inf, padded), axis = 1)
+
+        towers = self.tower_index[(self.tower_index >= first) & (self.tower_index < last)]
+        positions = np.concatenate([lows, highs, towers, [first, last - 1]])
+
+        return np.unique(positions[positions < last])
+
+    def to_dataframe(self, positions = None):
+        '''
+        Converte as amostras em um dataframe, com a estrutura de cada posição quando houver.
+
+        Args:
+            positions (array): Posições das amostras a converter, ex.: retornadas por `downsample`. Caso não
+            sejam informadas, converte todas.
+
+        Returns:
+            df (dataframe): Dataframe com `DIS_CUM_KM`, `ALT_TERRENO` e `EST_SAP`.
+        '''
+
+        if positions is None:
+            positions = np.arange(len(self))
+
+        codes = np.full(len(self), None, dtype = object)
+        codes[self.tower_index] = self.tower_codes
+
+        return pd.DataFrame({'DIS_CUM_KM': self.distances[positions] / 1000, 'ALT_TERRENO': self.ground[positions].astype('float64'),
+                             'EST_SAP': codes[positions]})
+
+    def towers(self):
+        '''
+        Retorna as estruturas do perfil.
+
+        Args:
+            None
+
+        Returns:
+            df (dataframe): Dataframe com `EST_SAP`, `DIS_CUM_KM`, `ALT_ORT` altitude cadastrada e `ALT_TERRENO`
+            altitude do terreno amostrada na posição da estrutura.
+        '''
+
+        return pd.DataFrame({'EST_SAP': self.tower_codes, 'DIS_CUM_KM': self.distances[self.tower_index] / 1000,
+                             'ALT_ORT': self.tower_altitudes, 'ALT_TERRENO': self.ground[self.tower_index].astype('float64')})
+
+def lttb(x, y, max_points):
+    '''
+    Seleciona os pontos de uma série para a plotagem pelo algoritmo Largest-Triangle-Three-Buckets: em cada
+    faixa, o ponto que forma o maior triângulo com o ponto escolhido na faixa anterior e a média da faixa seguinte.
+
+    Args:
+        x (array): Valores ordenados do eixo horizontal.
+        y (array): Valores do eixo vertical. Valores `nan` não são escolhidos quando há alternativa na faixa.
+        max_points (int): Quantidade de pontos mantidos, incluindo o primeiro e o último.
+
+    Returns:
+        positions (array): Posições ordenadas dos pontos mantidos.
+    '''
+
+    x = np.asarray(x, dtype = 'float64')
+    y = np.asarray(y, dtype = 'float64')
+    n = len(x)
+    if n <= max_points or max_points < 3:
+        return np.arange(n)
+
+    # Faixas dos pontos internos e médias de cada faixa, com as altitudes faltantes ignoradas
+    edges = np.linspace(1, n - 1, max_points - 1).astype('int64')
+    valid = np.isfinite(y)
+    filled = np.where(valid, y, 0.0)
+    counts = np.diff(edges)
+    mean_x = np.add.reduceat(x[:n - 1], edges[:-1]) / counts
+    valid_counts = np.add.reduceat(valid[:n - 1].astype('int64'), edges[:-1])
+    mean_y = np.add.reduceat(filled[:n - 1], edges[:-1]) / np.maximum(valid_counts, 1)
+    mean_x = np.append(mean_x[1:], x[-1])
+    mean_y = np.append(mean_y[1:], filled[-1] if valid[-1] else mean_y[-1])
+
+    positions = np.empty(max_points, dtype = 'int64')
+    positions[0], positions[-1] = 0, n - 1
+    a = 0
+    for i in range(max_points - 2):
+        lo, hi = edges[i], edges[i + 1]
+        area = np.abs((x[a] - mean_x[i]) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (mean_y[i] - y[a]))
+        area = np.where(np.isfinite(area), area, -1.0)
+        a = lo + int(np.argmax(area))
+        positions[i + 1] = a
+
+    return positions
+
+def sample_spans(df, provider, spacing = 10.0, max_points = 300000, batch_size = 100000):
+    '''
+    Amostra o terreno ao longo da geodésica de cada vão, a cada `spacing` metros. Todas as coordenadas são
+    calculadas de uma vez e as altitudes consultadas na fonte em lotes. Caso o total de amostras ultrapasse
+    `max_points`, o espaçamento é aumentado na mesma proporção, mantendo ao menos as estruturas de cada vão.
+
+    Args:
+        df (dataframe): Dataframe ordenado dos vãos (`make_dataset`), com `EST1_*`, `EST2_*` e `DIS_M`.
+        provider (elevation_provider): Fonte das altitudes do terreno, ex.: `dem_provider`.
+        spacing (float): Espaçamento entre as amostras em metros.
+        max_points (int): Quantidade máxima de amostras do perfil.
+        batch_size (int): Quantidade de pontos por consulta à fonte de altitudes.
+
+    Returns:
+        profile (terrain_profile): Perfil com as amostras do terreno e as estruturas.
+    '''
+
+    numeric = lambda column: pd.to_numeric(df[column], errors = 'coerce').to_numpy(dtype = 'float64')
+    lat1, lon1, lat2, lon2 = numeric('EST1_LAT'), numeric('EST1_LON'), numeric('EST2_LAT'), numeric('EST2_LON')
+    lengths = np.nan_to_num(numeric('DIS_M'))
+    est1, est2 = df['EST1_SAP'].to_numpy(), df['EST2_SAP'].to_numpy()
+
+    if len(df) == 0:
+        return terrain_profile(np.empty(0), np.empty(0), np.empty(0), np.empty(0), np.empty(0))
+
+    # A estrutura inicial de um vão só é repetida quando ele não continua a partir do vão anterior
+    include_start = np.ones(len(df), dtype = bool)
+    include_start[1:] = est1[1:] != est2[:-1]
+
+    # Quantidade de intervalos por vão, com o espaçamento ajustado ao limite de amostras
+    intervals = np.maximum(np.ceil(lengths / spacing), 1).astype('int64')
+    total = int(intervals.sum() + include_start.sum())
+    if total > max_points:
+        intervals = np.maximum(np.ceil(lengths / (spacing * total / max_points)), 1).astype('int64')
+
+    # Frações de cada vão: 0 (estrutura inicial, quando incluída) até 1 (estrutura final)
+    counts = intervals + include_start
+    span_of = np.repeat(np.arange(len(df)), counts)
+    starts = np.cumsum(counts) - counts
+    step = np.arange(len(span_of)) - starts[span_of] + (~include_start[span_of])
+    fractions = step / intervals[span_of]
+
+    # Pontos sobre a geodésica de cada vão
+    azimuths, _, geodesic = wgs84_geod.inv(lon1, lat1, lon2, lat2)
+    lons, lats, _ = wgs84_geod.fwd(lon1[span_of], lat1[span_of], azimuths[span_of], geodesic[span_of] * fractions)
+
+    # Distância cumulativa pelas distâncias dos vãos da tabela, como no perfil por estruturas
+    span_start = np.concatenate([[0.0], np.cumsum(lengths)[:-1]])
+    distances = span_start[span_of] + lengths[span_of] * fractions
+
+    ground = np.full(len(lats), np.nan)
+    for start in range(0, len(lats), batch_size):
+        ground[start:start + batch_size] = provider.get_altitudes(lats[start:start + batch_size], lons[start:start + batch_size])
+
+    # Estruturas: inicial dos vãos que iniciam um trecho e final de todos os vãos
+    first = starts[include_start]
+    last = starts + counts - 1
+    tower_index = np.concatenate([first, last])
+    tower_codes = np.concatenate([est1[include_start], est2])
+    tower_altitudes = np.concatenate([numeric('EST1_ALT_ORT')[include_start], numeric('EST2_ALT_ORT')])
+    order = np.argsort(tower_index, kind = 'stable')
+
+    return terrain_profile(distances, ground, tower_index[order], tower_codes[order], tower_altitudes[order])
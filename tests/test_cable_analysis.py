@@ -0,0 +1,36 @@
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'interface'))
+
+from cable_analysis import catenary_parameter, cable_altitude, fit_parabola
+import numpy as np
+
+# Cabos sintéticos com fixações e flechas conhecidas, medidos em três pontos do vão
+rng = np.random.default_rng(0)
+n = 1000
+lengths = rng.uniform(100, 800, n)
+z_ini, z_fim = rng.uniform(700, 900, n), rng.uniform(700, 900, n)
+sags = lengths * rng.uniform(0.01, 0.05, n)
+positions = np.column_stack([np.full(n, 0.5), rng.uniform(0.1, 0.4, n), rng.uniform(0.6, 0.95, n)])
+altitudes = cable_altitude(positions, lengths, z_ini, z_fim, sags)
+
+fitted_ini, fitted_fim, fitted_sags, fit = fit_parabola(positions, altitudes, np.ones_like(positions, dtype = bool),
+                                                        z_ini - 20, z_fim - 20, lengths)
+assert (fit == 'completo').all()
+assert np.allclose(fitted_ini, z_ini) and np.allclose(fitted_fim, z_fim) and np.allclose(fitted_sags, sags)
+
+# Com os pontos coincidentes, o ajuste supõe as fixações na mesma altura sobre as estruturas
+coincident = positions.copy()
+coincident[:, 1] = 0.5
+altitudes = cable_altitude(coincident, lengths, z_ini, z_fim, sags)
+_, _, fitted_sags, fit = fit_parabola(coincident, altitudes, np.ones_like(positions, dtype = bool), z_ini - 20, z_fim - 20, lengths)
+assert (fit == 'simetrico').all() and np.allclose(fitted_sags, sags)
+
+# A catenária ajustada mantém a flecha e passa pelas fixações
+parameters = catenary_parameter(lengths, sags)
+assert np.allclose(parameters * (np.cosh(lengths / (2 * parameters)) - 1), sags)
+ends = cable_altitude(np.column_stack([np.zeros(n), np.ones(n)]), lengths, z_ini, z_fim, sags, parameters)
+assert np.allclose(ends[:, 0], z_ini) and np.allclose(ends[:, 1], z_fim)
+
+print('Análise dos cabos: ok')
@@ -0,0 +1,56 @@
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'interface'))
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from elevation import opentopodata_provider
+import numpy as np
+import threading
+import json
+import time
+
+# Servidor local que imita a API do opentopodata: altitude = latitude + longitude
+requests_received = list()
+
+class stub_handler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        locations = parse_qs(urlparse(self.path).query)['locations'][0].split('|')
+        requests_received.append(len(locations))
+        results = [{'elevation': sum(float(value) for value in location.split(','))} for location in locations]
+        body = json.dumps({'results': results, 'status': 'OK'}).encode('utf-8')
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+server = ThreadingHTTPServer(('127.0.0.1', 0), stub_handler)
+threading.Thread(target = server.serve_forever, daemon = True).start()
+url = f'http://127.0.0.1:{server.server_address[1]}/v1/srtm30m'
+
+#############################
+
+latitudes = np.random.uniform(-20, -19, 250)
+longitudes = np.random.uniform(-44, -43, 250)
+# Repete todos os pontos para simular estruturas compartilhadas
+latitudes, longitudes = np.tile(latitudes, 2), np.tile(longitudes, 2)
+
+provider = opentopodata_provider(url = url, batch_size = 100, rate = 20, burst = 1, max_workers = 4)
+start = time.perf_counter()
+altitudes = provider.get_altitudes(latitudes, longitudes)
+elapsed = time.perf_counter() - start
+
+server.shutdown()
+
+print(f'Pontos consultados: {len(latitudes)}')
+print(f'Requisições: {len(requests_received)} com {requests_received} coordenadas')
+print(f'Tempo: {elapsed:.3f} s')
+
+assert np.allclose(altitudes, latitudes + longitudes)
+assert sorted(requests_received) == [50, 100, 100]
@@ -0,0 +1,38 @@
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'interface'))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'cli-commands'))
+
+from ingest_update import tables
+from bdit_data import data_analysis
+import pandas as pd
+import tempfile
+import paths
+import yaml
+
+# Uma exportação sem alterações, tratada como no ETL, não gera nenhuma alteração para qualquer chave aceita
+with open('cli-commands/etl_spec.yaml', 'r') as file:
+    spec = yaml.safe_load(file)['tables']
+df_paths = paths.return_data_paths(yaml_file = 'interface/config.yaml')
+data = data_analysis()
+
+for table, reference in tables.items():
+    options = spec[table]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        new_path = os.path.join(tmp_dir, f'{table}.csv')
+        data.edit_csv_stream(options['source'], dst_path = new_path, drop_duplicates = options.get('drop_duplicates', False),
+                             dedup_keys = options.get('dedup_keys') or None, drop_columns = options.get('drop_columns'),
+                             sanitize_column_names = options.get('sanitize_column_names', False),
+                             infer_types = options.get('infer_types', False))
+
+        for key in [reference['key'], 'OBJECTID']:
+            summary = data.incremental_update(df_paths[reference['path_key']], new_path, key, apply = False)
+            assert summary['changes'].empty, f"{table} ({key}): {summary['inserts']} inclusões, {summary['updates']} alterações, {summary['deletes']} exclusões"
+            print(f'{table} ({key}): nenhuma alteração.')
+
+# Chaves numéricas com formatação diferente são a mesma chave
+current = pd.DataFrame({'OBJECTID': ['1605037.0', '12'], 'COD_LT_SAP': ['A', 'B'], 'VAL': ['152.0', 'x']})
+new = pd.DataFrame({'OBJECTID': ['1605037', '12.0'], 'COD_LT_SAP': ['A', 'B'], 'VAL': ['152', 'x']})
+assert data.diff_tables(current, new, 'OBJECTID').empty
+print('Chaves numéricas conferidas.')
@@ -0,0 +1,58 @@
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'interface'))
+
+from spatial_index import spatial_index, network_points
+from table_store import table_store
+from geo_coords import wgs84_geod
+import numpy as np
+import paths
+import time
+
+# Compara as consultas do índice com a busca completa sobre todos os pontos
+df_paths = paths.return_data_paths(yaml_file = 'interface/config.yaml')
+points = network_points(table_store(), df_paths)
+
+start = time.perf_counter()
+index = spatial_index(points)
+print(f'Pontos indexados: {len(index)} em {time.perf_counter() - start:.3f} s')
+
+rng = np.random.default_rng(0)
+queries = index.points.sample(20, random_state = 0)[['LAT', 'LON']].to_numpy() + rng.normal(0, 0.05, (20, 2))
+
+for lat, lon in queries:
+    _, _, all_distances = wgs84_geod.inv(np.full(len(index), lon), np.full(len(index), lat), index.lons, index.lats)
+
+    found = index.radius(lat, lon, 5000)
+    assert set(found.index) == set(np.flatnonzero(all_distances <= 5000))
+
+    nearest = index.knn(lat, lon, k = 10)
+    assert np.allclose(nearest['DIST_M'].to_numpy(), np.sort(all_distances)[:10])
+
+    box = index.bbox(lat - 0.05, lon - 0.05, lat + 0.05, lon + 0.05, kinds = ['estrutura'])
+    expected = (np.abs(index.lats - lat) <= 0.05) & (np.abs(index.lons - lon) <= 0.05) & (index.kinds == 'estrutura')
+    assert set(box.index) == set(np.flatnonzero(expected))
+
+start = time.perf_counter()
+for lat, lon in queries:
+    index.knn(lat, lon, k = 10)
+    index.radius(lat, lon, 2000)
+print(f'Tempo médio por consulta: {(time.perf_counter() - start) / (2 * len(queries)) * 1000:.2f} ms')
+
+# Pontos fora do intervalo de coordenadas válidas não são indexados
+assert (np.abs(index.lats) <= 90).all() and (np.abs(index.lons) <= 180).all()
+
+# Todo vão com as duas estruturas e faixa de servidão é encontrado no ponto médio do seu próprio eixo
+spans = index.points[(index.kinds == 'vao')].dropna(subset = ['LAT_INI', 'LON_INI', 'LAT_FIM', 'LON_FIM'])
+spans = spans[spans['LARGURA_MAX'] > 0]
+azimuths, _, lengths = wgs84_geod.inv(spans['LON_INI'].to_numpy(), spans['LAT_INI'].to_numpy(),
+                                      spans['LON_FIM'].to_numpy(), spans['LAT_FIM'].to_numpy())
+mid_lons, mid_lats, _ = wgs84_geod.fwd(spans['LON_INI'].to_numpy(), spans['LAT_INI'].to_numpy(), azimuths, lengths / 2)
+
+start = time.perf_counter()
+missing = [code for code, lat, lon in zip(spans['CODIGO'], mid_lats, mid_lons)
+           if code not in set(index.right_of_way(lat, lon)['CODIGO'])]
+assert not missing, f'Vãos não encontrados no próprio ponto médio: {missing[:10]}'
+print(f'Vãos encontrados no próprio ponto médio: {len(spans)} em {time.perf_counter() - start:.1f} s')
+print('Consultas conferidas com a busca completa.')